@@ -1,7 +1,9 @@
 import logging
+import os
 from functools import wraps
 
-from dredis import config
+from dredis import __version__, compaction, config, gc, persistence, stats
+from dredis.db import NUMBER_OF_REDIS_DATABASES
 from dredis.exceptions import AuthenticationRequiredError, CommandNotFound, DredisSyntaxError, DredisError
 from dredis.utils import to_float
 
@@ -70,17 +72,38 @@ def cmd_command(keyspace):
     return result
 
 
+def _is_async_flush(args):
+    if not args:
+        return False
+    elif len(args) == 1 and args[0].upper() in ('ASYNC', 'SYNC'):
+        return args[0].upper() == 'ASYNC'
+    else:
+        raise DredisSyntaxError()
+
+
 @command('FLUSHALL', arity=-1, flags=CMD_WRITE)
 def cmd_flushall(keyspace, *args):
-    # TODO: we don't support ASYNC flushes
-    keyspace.flushall()
+    keyspace.flushall(asynchronous=_is_async_flush(args))
     return SimpleString('OK')
 
 
 @command('FLUSHDB', arity=-1, flags=CMD_WRITE)
 def cmd_flushdb(keyspace, *args):
-    # TODO: we don't support ASYNC flushes
-    keyspace.flushdb()
+    keyspace.flushdb(asynchronous=_is_async_flush(args))
+    return SimpleString('OK')
+
+
+@command('SWAPDB', arity=3, flags=CMD_WRITE)
+def cmd_swapdb(keyspace, index1, index2):
+    db_ids = []
+    for index, name in [(index1, 'first'), (index2, 'second')]:
+        try:
+            db_ids.append(int(index))
+        except ValueError:
+            raise DredisError('invalid {} DB index'.format(name))
+    if not all(0 <= db_id < NUMBER_OF_REDIS_DATABASES for db_id in db_ids):
+        raise DredisError('DB index is out of range')
+    keyspace.swapdb(*db_ids)
     return SimpleString('OK')
 
 
@@ -95,6 +118,60 @@ def cmd_save(keyspace):
     return SimpleString('OK')
 
 
+@command('BGSAVE', arity=-1, flags=CMD_READONLY)
+def cmd_bgsave(keyspace, *args):
+    # `SCHEDULE` waits for AOF rewrites in redis, dredis doesn't have them
+    if args and (len(args) > 1 or args[0].upper() != 'SCHEDULE'):
+        raise DredisSyntaxError()
+    keyspace.bgsave()
+    return SimpleString('Background saving started')
+
+
+@command('LASTSAVE', arity=1, flags=CMD_READONLY)
+def cmd_lastsave(keyspace):
+    return keyspace.lastsave()
+
+
+@command('COMPACT', arity=-1, flags=CMD_READONLY)
+def cmd_compact(keyspace, *args):
+    if not args:
+        keyspace.compact()
+    elif len(args) == 1 and args[0].upper() == 'ALL':
+        keyspace.compact(all_dbs=True)
+    else:
+        raise DredisSyntaxError()
+    return SimpleString('Background compaction scheduled')
+
+
+def _get_server_info():
+    return [
+        ('dredis_version', __version__),
+        ('process_id', os.getpid()),
+    ]
+
+
+INFO_SECTIONS = [
+    ('Server', _get_server_info),
+    ('Persistence', persistence.get_info),
+    ('Stats', stats.get_info),
+    ('GC', gc.get_info),
+    ('Compaction', compaction.get_info),
+]
+
+
+@command('INFO', arity=-1, flags=CMD_READONLY)
+def cmd_info(keyspace, *sections):
+    sections = set(section.lower() for section in sections) - {'all', 'default', 'everything'}
+    lines = []
+    for name, get_info in INFO_SECTIONS:
+        if not sections or name.lower() in sections:
+            if lines:
+                lines.append('')
+            lines.append('# {}'.format(name))
+            lines.extend('{}:{}'.format(field, value) for field, value in get_info())
+    return ''.join(line + '\r\n' for line in lines)
+
+
 @command('CONFIG', arity=-2, flags=CMD_WRITE)
 def cmd_config(keyspace, action, *params):
     if action.lower() == 'help':
@@ -136,6 +213,12 @@ def cmd_keys(keyspace, pattern):
     return keyspace.keys(pattern)
 
 
+@command('SCAN', arity=-2, flags=CMD_READONLY)
+def cmd_scan(keyspace, cursor, *args):
+    cursor, count, match, key_type = _validate_scan_params(args, cursor, allow_type=True)
+    return keyspace.scan(cursor, match, count, key_type)
+
+
 @command('EXISTS', arity=-2, flags=CMD_READONLY)
 def cmd_exists(keyspace, *keys):
     return keyspace.exists(*keys)
@@ -158,6 +241,38 @@ def cmd_restore(keyspace, key, ttl, payload, *args):
     return SimpleString('OK')
 
 
+@command('MIGRATE', arity=-6, flags=CMD_WRITE)
+def cmd_migrate(keyspace, host, port, key, destination_db, timeout, *args):
+    copy = False
+    replace = False
+    keys = [key]
+    args = list(args)
+    while args:
+        arg = args.pop(0).lower()
+        if arg == 'copy':
+            copy = True
+        elif arg == 'replace':
+            replace = True
+        elif arg == 'keys':
+            if key != '':
+                raise DredisError('When using MIGRATE KEYS option, the key argument must be set to the empty string')
+            keys = args
+            break
+        else:
+            raise DredisSyntaxError()
+    try:
+        port, destination_db, timeout = int(port), int(destination_db), int(timeout)
+    except ValueError:
+        raise DredisError("value is not an integer or out of range")
+    if timeout <= 0:
+        # same as redis, the default timeout is 1 second
+        timeout = 1000
+    if keyspace.migrate(host, port, keys, destination_db, timeout, copy, replace):
+        return SimpleString('OK')
+    else:
+        return SimpleString('NOKEY')
+
+
 @command('RENAME', arity=3, flags=CMD_WRITE)
 def cmd_rename(keyspace, old_name, new_name):
     keyspace.rename(old_name, new_name)
@@ -226,6 +341,26 @@ def cmd_get(keyspace, key):
     return keyspace.get(key)
 
 
+@command('MGET', arity=-2, flags=CMD_READONLY)
+def cmd_mget(keyspace, *keys):
+    return keyspace.mget(keys)
+
+
+@command('MSET', arity=-3, flags=CMD_WRITE)
+def cmd_mset(keyspace, *pairs):
+    if len(pairs) % 2 != 0:
+        raise DredisSyntaxError("wrong number of arguments for 'mset' command")
+    keyspace.mset(zip(pairs[0::2], pairs[1::2]))
+    return SimpleString('OK')
+
+
+@command('MSETNX', arity=-3, flags=CMD_WRITE)
+def cmd_msetnx(keyspace, *pairs):
+    if len(pairs) % 2 != 0:
+        raise DredisSyntaxError("wrong number of arguments for 'msetnx' command")
+    return keyspace.msetnx(zip(pairs[0::2], pairs[1::2]))
+
+
 @command('INCR', arity=2, flags=CMD_WRITE)
 def cmd_incr(keyspace, key):
     return keyspace.incrby(key, 1)
@@ -250,10 +385,12 @@ def cmd_getrange(keyspace, key, start, end):
 
 @command('SADD', arity=-3, flags=CMD_WRITE)
 def cmd_sadd(keyspace, key, *values):
-    count = 0
-    for value in values:
-        count += keyspace.sadd(key, value)
-    return count
+    return keyspace.sadd(key, *values)
+
+
+@command('SREM', arity=-3, flags=CMD_WRITE)
+def cmd_srem(keyspace, key, *values):
+    return keyspace.srem(key, *values)
 
 
 @command('SMEMBERS', arity=2, flags=CMD_READONLY)
@@ -271,6 +408,72 @@ def cmd_sismember(keyspace, key, value):
     return int(keyspace.sismember(key, value))
 
 
+@command('SSCAN', arity=-3, flags=CMD_READONLY)
+def cmd_sscan(keyspace, key, cursor, *args):
+    cursor, count, match, _ = _validate_scan_params(args, cursor)
+    return keyspace.sscan(key, cursor, match, count)
+
+
+@command('SMISMEMBER', arity=-3, flags=CMD_READONLY)
+def cmd_smismember(keyspace, key, *values):
+    return [int(is_member) for is_member in keyspace.smismember(key, values)]
+
+
+@command('SINTER', arity=-2, flags=CMD_READONLY)
+def cmd_sinter(keyspace, *keys):
+    return keyspace.sinter(keys)
+
+
+@command('SINTERSTORE', arity=-3, flags=CMD_WRITE)
+def cmd_sinterstore(keyspace, destination, *keys):
+    return keyspace.sinterstore(destination, keys)
+
+
+@command('SINTERCARD', arity=-3, flags=CMD_READONLY)
+def cmd_sintercard(keyspace, numkeys, *args):
+    try:
+        numkeys = int(numkeys)
+    except ValueError:
+        raise DredisError("numkeys should be greater than 0")
+    if numkeys <= 0:
+        raise DredisError("numkeys should be greater than 0")
+    if numkeys > len(args):
+        raise DredisError("Number of keys can't be greater than number of args")
+    keys = args[:numkeys]
+    args = args[numkeys:]
+    limit = 0
+    if len(args) == 2 and args[0].lower() == 'limit':
+        try:
+            limit = int(args[1])
+        except ValueError:
+            raise DredisError("LIMIT can't be negative")
+        if limit < 0:
+            raise DredisError("LIMIT can't be negative")
+    elif args:
+        raise DredisSyntaxError()
+    return keyspace.sintercard(keys, limit)
+
+
+@command('SUNION', arity=-2, flags=CMD_READONLY)
+def cmd_sunion(keyspace, *keys):
+    return keyspace.sunion(keys)
+
+
+@command('SUNIONSTORE', arity=-3, flags=CMD_WRITE)
+def cmd_sunionstore(keyspace, destination, *keys):
+    return keyspace.sunionstore(destination, keys)
+
+
+@command('SDIFF', arity=-2, flags=CMD_READONLY)
+def cmd_sdiff(keyspace, *keys):
+    return keyspace.sdiff(keys)
+
+
+@command('SDIFFSTORE', arity=-3, flags=CMD_WRITE)
+def cmd_sdiffstore(keyspace, destination, *keys):
+    return keyspace.sdiffstore(destination, keys)
+
+
 """
 **********************
 * Scripting commands *
@@ -315,23 +518,57 @@ def cmd_zadd(keyspace, key, *args):
     if len(args) % 2 != 0:
         raise DredisSyntaxError()
 
-    count = 0
     pairs = zip(args[0::2], args[1::2])  # [1, 2, 3, 4] -> [(1,2), (3,4)]
-    for score, value in pairs:
+    for score, _ in pairs:
         _validate_zset_score(score)
-        count += keyspace.zadd(key, score, value, nx=nx, xx=xx)
-    return count
+    return keyspace.zadd_many(key, pairs, nx=nx, xx=xx)
 
 
 @command('ZRANGE', arity=-4, flags=CMD_READONLY)
 def cmd_zrange(keyspace, key, start, stop, *args):
+    with_scores = False
+    by_score = False
+    rev = False
+    limit = None
+    args = list(args)
+    while args:
+        arg = args.pop(0).lower()
+        if arg == 'withscores':
+            with_scores = True
+        elif arg == 'byscore':
+            by_score = True
+        elif arg == 'rev':
+            rev = True
+        elif arg == 'limit' and len(args) >= 2:
+            limit = (int(args.pop(0)), int(args.pop(0)))
+        else:
+            raise DredisSyntaxError()
+
+    if by_score:
+        offset, count = limit if limit else (0, float('+inf'))
+        _validate_zset_score(start)
+        _validate_zset_score(stop)
+        if rev:
+            return keyspace.zrevrangebyscore(key, start, stop, withscores=with_scores, offset=offset, count=count)
+        else:
+            return keyspace.zrangebyscore(key, start, stop, withscores=with_scores, offset=offset, count=count)
+    elif limit:
+        raise DredisSyntaxError('syntax error, LIMIT is only supported in combination with either BYSCORE or BYLEX')
+    elif rev:
+        return keyspace.zrevrange(key, int(start), int(stop), with_scores)
+    else:
+        return keyspace.zrange(key, int(start), int(stop), with_scores)
+
+
+@command('ZREVRANGE', arity=-4, flags=CMD_READONLY)
+def cmd_zrevrange(keyspace, key, start, stop, *args):
     with_scores = False
     if args:
         if args[0].lower() == 'withscores':
             with_scores = True
         else:
             raise DredisSyntaxError()
-    return keyspace.zrange(key, int(start), int(stop), with_scores)
+    return keyspace.zrevrange(key, int(start), int(stop), with_scores)
 
 
 @command('ZCARD', arity=2, flags=CMD_READONLY)
@@ -349,11 +586,21 @@ def cmd_zscore(keyspace, key, member):
     return keyspace.zscore(key, member)
 
 
+@command('ZMSCORE', arity=-3, flags=CMD_READONLY)
+def cmd_zmscore(keyspace, key, *members):
+    return keyspace.zmscore(key, members)
+
+
 @command('ZRANK', arity=3, flags=CMD_READONLY)
 def cmd_zrank(keyspace, key, member):
     return keyspace.zrank(key, member)
 
 
+@command('ZREVRANK', arity=3, flags=CMD_READONLY)
+def cmd_zrevrank(keyspace, key, member):
+    return keyspace.zrevrank(key, member)
+
+
 @command('ZCOUNT', arity=4, flags=CMD_READONLY)
 def cmd_zcount(keyspace, key, min_score, max_score):
     return keyspace.zcount(key, min_score, max_score)
@@ -361,6 +608,16 @@ def cmd_zcount(keyspace, key, min_score, max_score):
 
 @command('ZRANGEBYSCORE', arity=-4, flags=CMD_READONLY)
 def cmd_zrangebyscore(keyspace, key, min_score, max_score, *args):
+    withscores, offset, count = _parse_zrangebyscore_args(args)
+    _validate_zset_score(min_score)
+    _validate_zset_score(max_score)
+
+    members = keyspace.zrangebyscore(
+        key, min_score, max_score, withscores=withscores, offset=offset, count=count)
+    return members
+
+
+def _parse_zrangebyscore_args(args):
     withscores = False
     offset = 0
     count = float('+inf')
@@ -374,18 +631,20 @@ def cmd_zrangebyscore(keyspace, key, min_score, max_score, *args):
             count = int(args.pop(0))
         else:
             raise DredisSyntaxError()
+    return withscores, offset, count
 
-    _validate_zset_score(min_score)
-    _validate_zset_score(max_score)
 
-    members = keyspace.zrangebyscore(
-        key, min_score, max_score, withscores=withscores, offset=offset, count=count)
-    return members
+@command('ZREVRANGEBYSCORE', arity=-4, flags=CMD_READONLY)
+def cmd_zrevrangebyscore(keyspace, key, max_score, min_score, *args):
+    withscores, offset, count = _parse_zrangebyscore_args(args)
+    _validate_zset_score(max_score)
+    _validate_zset_score(min_score)
+    return keyspace.zrevrangebyscore(key, max_score, min_score, withscores=withscores, offset=offset, count=count)
 
 
 @command('ZSCAN', arity=-3, flags=CMD_READONLY)
 def cmd_zscan(keyspace, key, cursor, *args):
-    cursor, count, match = _validate_scan_params(args, cursor)
+    cursor, count, match, _ = _validate_scan_params(args, cursor)
     return keyspace.zscan(key, cursor, match, count)
 
 
@@ -399,21 +658,58 @@ def _validate_zset_score(score):
 
 @command('ZUNIONSTORE', arity=-4, flags=CMD_WRITE)
 def cmd_zunionstore(keyspace, destination, numkeys, *args):
-    keys = []
-    weights = []
-    args = list(args)
+    keys, weights, aggregate, _ = _parse_zstore_args(numkeys, args)
+    return keyspace.zunionstore(destination, keys, weights, aggregate)
+
+
+@command('ZINTERSTORE', arity=-4, flags=CMD_WRITE)
+def cmd_zinterstore(keyspace, destination, numkeys, *args):
+    keys, weights, aggregate, _ = _parse_zstore_args(numkeys, args)
+    return keyspace.zinterstore(destination, keys, weights, aggregate)
+
+
+@command('ZINTER', arity=-3, flags=CMD_READONLY)
+def cmd_zinter(keyspace, numkeys, *args):
+    keys, weights, aggregate, withscores = _parse_zstore_args(numkeys, args, command_name='ZINTER',
+                                                              allow_withscores=True)
+    return keyspace.zinter(keys, weights, aggregate, with_scores=withscores)
+
+
+@command('ZDIFFSTORE', arity=-4, flags=CMD_WRITE)
+def cmd_zdiffstore(keyspace, destination, numkeys, *keys):
+    numkeys = int(numkeys)
+    if numkeys < 1:
+        raise DredisError('at least 1 input key is needed for ZDIFFSTORE')
+    if numkeys != len(keys):
+        raise DredisSyntaxError()
+    return keyspace.zdiffstore(destination, keys)
+
+
+def _parse_zstore_args(numkeys, args, command_name='ZUNIONSTORE/ZINTERSTORE', allow_withscores=False):
+    numkeys = int(numkeys)
+    if numkeys < 1:
+        raise DredisError('at least 1 input key is needed for {}'.format(command_name))
+    if numkeys > len(args):
+        raise DredisSyntaxError()
+    keys = list(args[:numkeys])
+    weights = [1] * numkeys  # default weight of 1
+    aggregate = 'sum'
+    withscores = False
+    args = list(args[numkeys:])
     while args:
-        arg = args.pop(0)
-        if arg == 'WEIGHTS':
-            weights = map(float, args)
-            break
+        arg = args.pop(0).lower()
+        if arg == 'weights' and len(args) >= numkeys:
+            try:
+                weights = [to_float(args.pop(0)) for _ in range(numkeys)]
+            except ValueError:
+                raise DredisError('weight value is not a float')
+        elif arg == 'aggregate' and args and args[0].lower() in ('sum', 'min', 'max'):
+            aggregate = args.pop(0).lower()
+        elif arg == 'withscores' and allow_withscores:
+            withscores = True
         else:
-            keys.append(arg)
-    if len(weights) > len(keys):
-        raise DredisSyntaxError()
-    ones = [1] * (len(keys) - len(weights))  # fill in with default weight of 1
-    weights = weights + ones
-    return keyspace.zunionstore(destination, keys, weights)
+            raise DredisSyntaxError()
+    return keys, weights, aggregate, withscores
 
 
 """
@@ -429,10 +725,7 @@ def cmd_hset(keyspace, key, *pairs):
         # HSET is going to replace HMSET,
         # see https://github.com/antirez/redis/pull/5334#issuecomment-419194180 for more details
         raise DredisSyntaxError('wrong number of arguments for HMSET')
-    count = 0
-    for field, value in zip(pairs[0::2], pairs[1::2]):
-        count += keyspace.hset(key, field, value)
-    return count
+    return keyspace.hset_many(key, zip(pairs[0::2], pairs[1::2]))
 
 
 @command('HDEL', arity=-3, flags=CMD_WRITE)
@@ -450,6 +743,16 @@ def cmd_hget(keyspace, key, value):
     return keyspace.hget(key, value)
 
 
+@command('HMGET', arity=-3, flags=CMD_READONLY)
+def cmd_hmget(keyspace, key, *fields):
+    return keyspace.hmget(key, fields)
+
+
+@command('HEXISTS', arity=3, flags=CMD_READONLY)
+def cmd_hexists(keyspace, key, field):
+    return int(keyspace.hexists(key, field))
+
+
 @command('HKEYS', arity=2, flags=CMD_READONLY)
 def cmd_hkeys(keyspace, key):
     return keyspace.hkeys(key)
@@ -477,13 +780,14 @@ def cmd_hgetall(keyspace, key):
 
 @command('HSCAN', arity=-3, flags=CMD_READONLY)
 def cmd_hscan(keyspace, key, cursor, *args):
-    cursor, count, match = _validate_scan_params(args, cursor)
+    cursor, count, match, _ = _validate_scan_params(args, cursor)
     return keyspace.hscan(key, cursor, match, count)
 
 
-def _validate_scan_params(args, cursor):
+def _validate_scan_params(args, cursor, allow_type=False):
     match = None
     count = 10
+    key_type = None
     args = list(args)
     try:
         cursor = int(cursor)
@@ -501,9 +805,14 @@ def _validate_scan_params(args, cursor):
                     count = int(args.pop(0))
                 except ValueError:
                     raise DredisError("value is not an integer or out of range")
+                # same as redis, a cursor would never move forward without elements
+                if count < 1:
+                    raise DredisSyntaxError()
+            elif arg.lower() == 'type' and allow_type:
+                key_type = args.pop(0).lower()
             else:
                 raise DredisSyntaxError()
-    return cursor, count, match
+    return cursor, count, match, key_type
 
 
 def run_command(keyspace, cmd, args):
@@ -0,0 +1,303 @@
+import logging
+import shutil
+import threading
+import time
+
+import plyvel
+
+from dredis import persistence
+from dredis.db import NUMBER_OF_REDIS_DATABASES, DB_MANAGER, LMDBBackend
+from dredis.gc import GC_STATS
+from dredis.path import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACTION_THRESHOLD = 1000000  # storage keys deleted by the gc since the last compaction of a db (0 disables)
+DEFAULT_COMPACTION_RATE = 1000000  # maximum number of storage keys compacted per second
+CHECK_INTERVAL = 1  # seconds between checks of the triggers
+SLICE_SIZE = 10000  # number of storage keys compacted while holding the db lock (LevelDB)
+MAX_REBUILD_ATTEMPTS = 3  # LMDB copies are discarded if the db is replaced or too many keys are written meanwhile
+COPY_DIRECTORY_SUFFIX = '.compact'
+# all storage keys start with a key type lower than '\xff'
+ALL_KEYS_STOP = '\xff'
+
+
+def parse_window(value):
+    """
+    :param value: a time window in local time (e.g. '23:30-05:00')
+    :return: (start, end) in minutes after midnight
+    """
+    try:
+        start, end = value.split('-')
+        return _parse_time(start), _parse_time(end)
+    except ValueError:
+        raise ValueError('invalid time window %r (expected HH:MM-HH:MM)' % value)
+
+
+def _parse_time(value):
+    hours, minutes = map(int, value.split(':'))
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(value)
+    return hours * 60 + minutes
+
+
+def is_in_window(window, now):
+    """
+    :param window: the result of `parse_window()`
+    :param now: seconds since the epoch
+    """
+    local_time = time.localtime(now)
+    minutes = local_time.tm_hour * 60 + local_time.tm_min
+    start, end = window
+    if start <= end:
+        return start <= minutes < end
+    else:
+        # the window ends after midnight
+        return minutes >= start or minutes < end
+
+
+class CompactionStats(object):
+
+    def __init__(self):
+        self.current_db = None
+        self.progress = 0.0  # percentage of the current db
+        self.compacted_keys = 0  # storage keys compacted in the current (or last) compaction
+        self.completed = 0
+        self.failed = 0  # LMDB rebuilds abandoned after `MAX_REBUILD_ATTEMPTS`
+        self.last_duration = 0.0
+        # `GC_STATS.deleted_keys_per_db` when the compaction of every db started
+        self.gc_deleted_keys_at_compaction = [0] * NUMBER_OF_REDIS_DATABASES
+        self.pending_dbs = []
+        self._lock = threading.Lock()
+
+    def request(self, db_ids):
+        with self._lock:
+            for db_id in db_ids:
+                if int(db_id) not in self.pending_dbs:
+                    self.pending_dbs.append(int(db_id))
+
+    def pop_request(self):
+        with self._lock:
+            if self.pending_dbs:
+                return self.pending_dbs.pop(0)
+            return None
+
+
+COMPACTION_STATS = CompactionStats()
+
+
+def request_compaction(db_ids):
+    """
+    Compact the dbs `db_ids` as soon as possible (`COMPACT`)
+    """
+    COMPACTION_STATS.request(db_ids)
+
+
+def get_garbage_estimate(db_id):
+    """
+    :return: the estimated number of deleted storage keys still stored by the db (e.g. LevelDB tombstones)
+    """
+    return GC_STATS.deleted_keys_per_db[int(db_id)] - COMPACTION_STATS.gc_deleted_keys_at_compaction[int(db_id)]
+
+
+def get_info():
+    current_db = COMPACTION_STATS.current_db
+    return [
+        ('compaction_in_progress', int(current_db is not None)),
+        ('compaction_current_db', -1 if current_db is None else current_db),
+        ('compaction_progress_pct', '%.1f' % COMPACTION_STATS.progress),
+        ('compaction_compacted_keys', COMPACTION_STATS.compacted_keys),
+        ('compaction_pending_dbs', len(COMPACTION_STATS.pending_dbs)),
+        ('compaction_completed', COMPACTION_STATS.completed),
+        ('compaction_failed', COMPACTION_STATS.failed),
+        ('compaction_last_duration_sec', '%.3f' % COMPACTION_STATS.last_duration),
+        ('compaction_garbage_keys_estimate', sum(get_garbage_estimate(db_id)
+                                                 for db_id in range(NUMBER_OF_REDIS_DATABASES))),
+    ]
+
+
+class CompactionScheduler(threading.Thread):
+    """
+    Compact the dbs in the background to discard the keys deleted by the key gc, or by `COMPACT`.
+
+    A db is compacted when the gc deleted more than `threshold` storage keys from it since its last compaction
+    or, during the maintenance `window`, when the gc deleted any key from it.
+
+    * LevelDB dbs are compacted with `compact_range()` in slices of `SLICE_SIZE` keys,
+      the db lock is released between slices;
+    * LMDB doesn't keep deleted keys but its file doesn't shrink, dbs are rebuilt with a compacted copy.
+      The copy is created by this thread without holding the db lock (`FLUSHDB` doesn't wait for it)
+      and `finish_rebuild()` replaces the files of the db from the event loop thread, after it writes
+      to the copy the keys written meanwhile (see `LMDBBackend.start_journal()`).
+      The copy is discarded if the db was replaced or too many keys were written (it's created again later);
+    * memory dbs don't need compaction.
+
+    Compactions are rate-limited to `rate` storage keys per second.
+    """
+
+    def __init__(self, threshold=DEFAULT_COMPACTION_THRESHOLD, rate=DEFAULT_COMPACTION_RATE, window=None):
+        threading.Thread.__init__(self, name="Compaction Scheduler")
+        self._threshold = threshold
+        self._rate = float(rate)
+        self._window = window
+        self._pending_rebuild = None
+        self._next_compaction_time = 0
+        self._rebuild_attempts = [0] * NUMBER_OF_REDIS_DATABASES
+
+    def run(self):
+        while True:
+            try:
+                compacted = self.step()
+            except Exception:
+                logger.exception("Compaction failed")
+                COMPACTION_STATS.current_db = None
+                compacted = False
+            if not compacted:
+                time.sleep(CHECK_INTERVAL)
+
+    def step(self):
+        """
+        Compact the next db that needs it
+
+        :return: whether a db was compacted
+        """
+        if self._pending_rebuild is not None or time.time() < self._next_compaction_time:
+            return False
+        db_id = COMPACTION_STATS.pop_request()
+        if db_id is None:
+            db_id = self._find_db_to_compact()
+        if db_id is None:
+            return False
+        self.compact(db_id)
+        return True
+
+    def _find_db_to_compact(self):
+        in_window = self._window is not None and is_in_window(self._window, time.time())
+        for db_id in range(NUMBER_OF_REDIS_DATABASES):
+            garbage = get_garbage_estimate(db_id)
+            if (self._threshold and garbage >= self._threshold) or (in_window and garbage > 0):
+                return db_id
+        return None
+
+    def compact(self, db_id):
+        start_time = time.time()
+        COMPACTION_STATS.current_db = db_id
+        COMPACTION_STATS.progress = 0.0
+        COMPACTION_STATS.compacted_keys = 0
+        COMPACTION_STATS.gc_deleted_keys_at_compaction[db_id] = GC_STATS.deleted_keys_per_db[db_id]
+        db = DB_MANAGER.get_db(db_id)
+        if isinstance(db, plyvel.DB):
+            self._compact_leveldb(db_id, start_time)
+        elif isinstance(db, LMDBBackend):
+            # finished by `finish_rebuild()`
+            self._copy_lmdb(db_id, start_time)
+            return
+        self._finish(start_time)
+
+    def _finish(self, start_time):
+        COMPACTION_STATS.progress = 100.0
+        COMPACTION_STATS.completed += 1
+        COMPACTION_STATS.last_duration = time.time() - start_time
+        COMPACTION_STATS.current_db = None
+
+    def _compact_leveldb(self, db_id, start_time):
+        start = ''
+        total_size = None
+        compacted_size = 0
+        while start is not None:
+            with DB_MANAGER.thread_lock:
+                db = DB_MANAGER.get_db(db_id)
+                if total_size is None:
+                    total_size = db.approximate_size('', ALL_KEYS_STOP)
+                keys = 0
+                stop = None
+                for db_key in db.iterator(start=start, include_value=False):
+                    if keys == SLICE_SIZE:
+                        stop = db_key
+                        break
+                    keys += 1
+                compacted_size += db.approximate_size(start, stop or ALL_KEYS_STOP)
+                db.compact_range(start=start, stop=stop)
+            start = stop
+            COMPACTION_STATS.compacted_keys += keys
+            if total_size:
+                COMPACTION_STATS.progress = min(100.0, compacted_size * 100.0 / total_size)
+            self._throttle(start_time)
+
+    def _copy_lmdb(self, db_id, start_time):
+        copy_dir = Path(DB_MANAGER.get_directory(db_id) + COPY_DIRECTORY_SUFFIX)
+        copy_dir.reset()
+        with DB_MANAGER.thread_lock:
+            db = DB_MANAGER.get_db(db_id)
+            generation = DB_MANAGER.get_generation(db_id)
+            # the keys written after this point are written again to the copy by `finish_rebuild()`
+            db.start_journal()
+            # `FLUSHDB` and `SWAPDB` don't wait for the copy, the environment is closed after it
+            db.acquire()
+        try:
+            db.copy(copy_dir)
+            COMPACTION_STATS.compacted_keys = db.get_number_of_entries()
+        except Exception:
+            db.stop_journal()
+            raise
+        finally:
+            db.release()
+        self._pending_rebuild = (db_id, db, copy_dir, generation, start_time)
+        self._next_compaction_time = start_time + COMPACTION_STATS.compacted_keys / self._rate
+
+    def finish_rebuild(self):
+        """
+        Replace the files of the LMDB db copied by `compact()`. Must be called from the event loop thread,
+        thus no command writes to the db while the keys written during the copy are written to it
+        and the files are replaced. It waits for `BGSAVE`, whose snapshot would be closed with the files.
+
+        The writes of the gc process (`--gc-mode=process`) aren't recorded, the copy may have garbage
+        that was deleted meanwhile and the gc deletes it again.
+        """
+        if self._pending_rebuild is None or persistence.is_saving():
+            return
+        db_id, db, copy_dir, generation, start_time = self._pending_rebuild
+        with DB_MANAGER.thread_lock:
+            written_keys = db.stop_journal()
+            # the files of the db may have been replaced too (e.g. `FLUSHDB` or `SWAPDB`)
+            is_outdated = DB_MANAGER.get_generation(db_id) != generation or written_keys is None
+            if not is_outdated:
+                update_copy(db, copy_dir, written_keys)
+                DB_MANAGER.replace_db_files(db_id, copy_dir)
+        if is_outdated:
+            shutil.rmtree(copy_dir, ignore_errors=True)
+            self._rebuild_attempts[db_id] += 1
+            if self._rebuild_attempts[db_id] < MAX_REBUILD_ATTEMPTS:
+                COMPACTION_STATS.request([db_id])
+            else:
+                logger.warning("Couldn't compact db %s: it was replaced or heavily written during every "
+                               "compaction attempt" % db_id)
+                COMPACTION_STATS.failed += 1
+                self._rebuild_attempts[db_id] = 0
+            COMPACTION_STATS.current_db = None
+        else:
+            self._rebuild_attempts[db_id] = 0
+            self._finish(start_time)
+        self._pending_rebuild = None
+
+    def _throttle(self, start_time):
+        wait = COMPACTION_STATS.compacted_keys / self._rate - (time.time() - start_time)
+        if wait > 0:
+            time.sleep(wait)
+
+
+def update_copy(db, copy_dir, keys):
+    """
+    Write the current values of `keys` to the copy of `db` in `copy_dir`
+    """
+    keys = list(keys)
+    copy = DB_MANAGER.open_db(copy_dir)
+    try:
+        with copy.write_batch() as batch:
+            for key, value in zip(keys, db.get_many(keys)):
+                if value is None:
+                    batch.delete(key)
+                else:
+                    batch.put(key, value)
+    finally:
+        copy.close()
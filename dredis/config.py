@@ -9,6 +9,7 @@ EMPTY = ''
 
 _SERVER_CONFIG = {
     'debug': FALSE,
+    'rdbcompression': TRUE,
     'readonly': FALSE,
     'requirepass': EMPTY,
 }
@@ -32,7 +33,7 @@ def set(option, value):
                 logging.getLogger('dredis').setLevel(logging.DEBUG)
             else:
                 logging.getLogger('dredis').setLevel(logging.INFO)
-        elif option == 'readonly':
+        elif option in ('readonly', 'rdbcompression'):
             value = _validate_bool(option, value)
         _SERVER_CONFIG[option] = value
     else:
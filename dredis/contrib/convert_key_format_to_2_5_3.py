@@ -1,6 +1,8 @@
 """
 In case the migration to the new key format using key IDs didn't go as expected,
 you can convert them back using this script.
+Only keys in the key format version 2 (`dredis.db.KeyCodec`) are converted, keys created in the format version 3
+(`dredis.db.KeyCodecV3`) aren't supported by dredis 2.5.3.
 
 Example with dredis after 2.5.3 (the format isn't accurate, it's simplified to explain the idea):
     hset h name hugo
@@ -44,7 +46,7 @@ At the end of step 2, the keys will be properly set up but have weird names:
 """
 import argparse
 
-from dredis.db import NUMBER_OF_REDIS_DATABASES, DB_MANAGER, KEY_CODEC, UUID_LENGTH_IN_BYTES
+from dredis.db import NUMBER_OF_REDIS_DATABASES, DB_MANAGER, KEY_CODEC_V2
 
 
 def main():
@@ -61,9 +63,9 @@ def revert_collections_to_dredis_2_5_3_format():
     for db_id in range(NUMBER_OF_REDIS_DATABASES):
         db = DB_MANAGER.get_db(db_id)
         for key_prefix in [
-            KEY_CODEC.SET_TYPE,
-            KEY_CODEC.HASH_TYPE,
-            KEY_CODEC.ZSET_TYPE,
+            KEY_CODEC_V2.SET_TYPE,
+            KEY_CODEC_V2.HASH_TYPE,
+            KEY_CODEC_V2.ZSET_TYPE,
         ]:
             with db.write_batch() as batch:
                 _convert(db, batch, chr(key_prefix))
@@ -76,17 +78,11 @@ def _convert(db, batch, key_prefix):
 
 
 def _convert_key(batch, db_key, db_value):
-    type_id, _, key = KEY_CODEC.decode_key(db_key)
-    if len(db_value) < UUID_LENGTH_IN_BYTES:
-        # older schema before uuid
-        key_id = key
-        length = db_value
-    else:
-        # new schema with uuid
-        key_id = db_value[:UUID_LENGTH_IN_BYTES]
-        length = db_value[UUID_LENGTH_IN_BYTES:]
-    print('batch.put({!r}, {!r})'.format(KEY_CODEC.get_key(key_id, type_id), length))
-    batch.put(KEY_CODEC.get_key(key_id, type_id), length)
+    type_id, _, key = KEY_CODEC_V2.decode_key(db_key)
+    key_id, length = KEY_CODEC_V2.decode_key_id_and_length(key, db_value)
+    length = bytes(length)
+    print('batch.put({!r}, {!r})'.format(KEY_CODEC_V2.get_key(key_id, type_id), length))
+    batch.put(KEY_CODEC_V2.get_key(key_id, type_id), length)
     if key != key_id:
         batch.delete(db_key)
         print('batch.delete({!r})'.format(db_key))
@@ -0,0 +1,120 @@
+import logging
+import time
+import uuid
+
+from dredis.db import NUMBER_OF_REDIS_DATABASES, DB_MANAGER, KEY_CODEC
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONVERSION_INTERVAL = 100  # milliseconds
+DEFAULT_CONVERSION_BATCH_SIZE = 1000  # number of storage keys to convert in a batch
+CURSOR_METADATA_FORMAT = 'key-format-conversion-cursor-v%d'
+
+
+class KeyFormatConverter(object):
+    """
+    Convert keys stored in legacy formats (e.g. `db.KeyCodec`) to the current format (`db.KEY_CODEC`)
+    while the server is running.
+
+    `step()` must be called from the event loop thread: every key is converted along with its elements in a single
+    batch, thus clients never see a partially converted collection (but very large collections block the event
+    loop while they're converted).
+    The last converted key is stored in the same batch, so the conversion resumes where it stopped
+    if the server is restarted.
+    """
+
+    def __init__(self, interval=DEFAULT_CONVERSION_INTERVAL, batch_size=DEFAULT_CONVERSION_BATCH_SIZE):
+        self._interval_in_secs = interval / 1000.0  # convert to seconds
+        self._batch_size = batch_size
+        self._next_run = 0
+
+    def step(self):
+        now = time.time()
+        if now >= self._next_run:
+            self._next_run = now + self._interval_in_secs
+            self.convert()
+
+    def convert(self):
+        """
+        :return: the number of converted storage keys (at most the batch size plus the elements of one collection)
+        """
+        converted = 0
+        for db_id in range(NUMBER_OF_REDIS_DATABASES):
+            for codec in DB_MANAGER.get_key_codecs(db_id)[1:]:
+                converted += self._convert_db(db_id, codec, self._batch_size - converted)
+                if converted >= self._batch_size:
+                    return converted
+        return converted
+
+    def _convert_db(self, db_id, codec, limit):
+        db = DB_MANAGER.get_db(db_id)
+        cursor_db_key = KEY_CODEC.encode_metadata(CURSOR_METADATA_FORMAT % codec.VERSION)
+        cursor = db.get(cursor_db_key, '')
+        db_keys = self._get_keys_to_convert(db, codec, cursor, limit)
+        converted = 0
+        for db_key, db_value in db_keys:
+            with db.write_batch() as batch:
+                converted += self._convert_key(db, batch, codec, db_key, db_value)
+                batch.put(cursor_db_key, db_key)
+            if converted >= limit:
+                return converted
+        if len(db_keys) < limit:
+            db.delete(cursor_db_key)
+            DB_MANAGER.update_key_codecs(db_id)
+            logger.info("Finished converting db %s from key format version %d to version %d" % (
+                db_id, codec.VERSION, KEY_CODEC.VERSION))
+        return converted
+
+    def _get_keys_to_convert(self, db, codec, cursor, limit):
+        result = []
+        for key_type in codec.KEY_TYPES:
+            prefix = chr(key_type)
+            for db_key, db_value in db.iterator(start=max(prefix, cursor)):
+                if not db_key.startswith(prefix):
+                    break
+                result.append((db_key, db_value))
+                if len(result) == limit:
+                    return result
+        return result
+
+    def _convert_key(self, db, batch, codec, db_key, db_value):
+        type_id, _, key = codec.decode_key(db_key)
+        key_type = get_key_type_name(codec, type_id)
+        converted = 1
+        if key_type == 'string':
+            batch.put(KEY_CODEC.encode_string(key), db_value)
+        else:
+            key_id, length = codec.decode_key_id_and_length(key, db_value)
+            if key_id == key:
+                # collections created before dredis 2.6 use the key name as key ID
+                new_key_id = uuid.uuid4().bytes
+            else:
+                new_key_id = key_id
+            old_prefixes = get_element_prefixes(codec, key_type, key_id)
+            new_prefixes = get_element_prefixes(KEY_CODEC, key_type, new_key_id)
+            for old_prefix, new_prefix in zip(old_prefixes, new_prefixes):
+                for element_db_key, element_db_value in list(db.iterator(prefix=old_prefix)):
+                    batch.put(new_prefix + element_db_key[len(old_prefix):], element_db_value)
+                    batch.delete(element_db_key)
+                    converted += 1
+            batch.put(KEY_CODEC.encode_key(key, key_type), KEY_CODEC.encode_key_id_and_length(key, new_key_id, length))
+        batch.delete(db_key)
+        return converted
+
+
+def get_key_type_name(codec, type_id):
+    for key_type, key_type_id in codec.KEY_TYPE_IDS.items():
+        if key_type_id == type_id:
+            return key_type
+    raise ValueError("Unknown type ID %r" % type_id)
+
+
+def get_element_prefixes(codec, key_type, key_id):
+    if key_type == 'set':
+        return [codec.get_min_set_member(key_id)]
+    elif key_type == 'hash':
+        return [codec.get_min_hash_field(key_id)]
+    elif key_type == 'zset':
+        return [codec.get_min_zset_value(key_id), codec.get_min_zset_score(key_id)]
+    else:
+        return []
@@ -192,11 +192,62 @@ crc64_tab = [
 ]
 
 
+def _generate_slicing_tables():
+    """
+    Slicing-by-8 tables: `tables[k][byte]` is the CRC of `byte` followed by `k` zero bytes
+    """
+    tables = [crc64_tab]
+    for _ in range(7):
+        previous_table = tables[-1]
+        tables.append([crc64_tab[crc & UINT8_BITMASK] ^ (crc >> 8) for crc in previous_table])
+    return tables
+
+
+crc64_slicing_tabs = _generate_slicing_tables()
+
+# the data is unpacked in chunks of 8-byte words, thus large payloads aren't unpacked at once
+CHUNK_SIZE = 64 * 1024
+
+
 def crc64(crc, bytes_):
-    for byte in bytes_:
-        crc = uint64_t(crc64_tab[uint8_t(crc) ^ byte] ^ (crc >> 8))
+    """
+    Update `crc` with `bytes_` (a string, bytearray, buffer or mmap) 8 bytes at a time
+    """
+    t0, t1, t2, t3, t4, t5, t6, t7 = crc64_slicing_tabs
+    size = len(bytes_)
+    words_size = size - size % 8
+    for offset in xrange(0, words_size, CHUNK_SIZE):
+        words_count = min(CHUNK_SIZE, words_size - offset) // 8
+        for word in struct.unpack_from('<%dQ' % words_count, bytes_, offset):
+            crc ^= word
+            crc = (t7[crc & 0xff] ^ t6[crc >> 8 & 0xff] ^ t5[crc >> 16 & 0xff] ^ t4[crc >> 24 & 0xff] ^
+                   t3[crc >> 32 & 0xff] ^ t2[crc >> 40 & 0xff] ^ t1[crc >> 48 & 0xff] ^ t0[crc >> 56])
+    for byte in bytearray(bytes_[words_size:]):
+        crc = t0[(crc ^ byte) & 0xff] ^ (crc >> 8)
     return crc
 
 
+class CRC64(object):
+    """
+    Incremental CRC64, thus streams can be checksummed one chunk at a time:
+
+        >>> crc = CRC64()
+        >>> crc.update('1234')
+        >>> crc.update('56789')
+        >>> hex(crc.crc)
+        '0xe9c6d914c4b8d9caL'
+    """
+
+    def __init__(self, data=b''):
+        self.crc = 0
+        self.update(data)
+
+    def update(self, data):
+        self.crc = crc64(self.crc, data)
+
+    def digest(self):
+        return struct.pack('<Q', self.crc)
+
+
 def checksum(payload):
-    return struct.pack('<Q', crc64(0, bytearray(payload)))
+    return CRC64(payload).digest()
@@ -1,19 +1,34 @@
+import bisect
+import multiprocessing
+import os
 import struct
 import threading
+import time
 import uuid
 
 import lmdb
 import plyvel
 
 from dredis.path import Path
-from dredis.utils import FLOAT_CODEC
+from dredis.utils import FLOAT_CODEC, encode_varint, decode_varint
 
 NUMBER_OF_REDIS_DATABASES = 16
 DEFAULT_REDIS_DB = '0'
 UUID_LENGTH_IN_BYTES = 16  # len(uuid.uuid4().bytes) == 16
+KEY_COUNT_METADATA = 'key-count'
+KEY_COUNT_STRUCT = struct.Struct('>q')
+SCAN_CURSOR_SECRET_METADATA = 'scan-cursor-secret'
+SWAP_DIRECTORY_SUFFIX = '.swap'
+REATTACH_INTERVAL = 0.01  # seconds to wait while the server replaces the directory of an attached db
+MAX_JOURNAL_SIZE = 1000000  # number of keys recorded by `LMDBBackend.start_journal()`
 
 
 class KeyCodec(object):
+    """
+    Key format used up to dredis 2.6 (format version 2)
+    """
+
+    VERSION = 2
 
     STRING_TYPE = 1
     SET_TYPE = 2
@@ -23,8 +38,16 @@ class KeyCodec(object):
     ZSET_TYPE = 6
     ZSET_VALUE_TYPE = 7
     ZSET_SCORE_TYPE = 8
+    ZSET_RANK_TYPE = None  # not supported
     DELETED_KEY_TYPE = 127
     KEY_TYPES = [STRING_TYPE, SET_TYPE, HASH_TYPE, ZSET_TYPE]
+    KEY_TYPE_IDS = {
+        'string': STRING_TYPE,
+        'set': SET_TYPE,
+        'hash': HASH_TYPE,
+        'zset': ZSET_TYPE,
+    }
+    KEY_TYPE_NAMES = {type_id: name for name, type_id in KEY_TYPE_IDS.items()}
 
     # type_id | key_length
     KEY_PREFIX_FORMAT = '>BI'
@@ -36,6 +59,11 @@ class KeyCodec(object):
 
     MIN_DELETED_VALUE = struct.pack('>B', DELETED_KEY_TYPE)
 
+    # values written before this marker existed use ASCII numbers (e.g. '10' for a length of 10)
+    BINARY_VALUE_MARKER = '\x00'
+    LENGTH_STRUCT = struct.Struct('>Q')
+    SCORE_STRUCT = struct.Struct('>d')
+
     # the key format using <key length + key> was inspired by the `blackwidow` project:
     # https://github.com/KernelMaker/blackwidow/blob/5abe9a3e3f035dd0d81f514e598f29c1db679a28/src/zsets_data_key_format.h#L44-L53
     # https://github.com/KernelMaker/blackwidow/blob/5abe9a3e3f035dd0d81f514e598f29c1db679a28/src/base_data_key_format.h#L37-L43
@@ -46,13 +74,38 @@ class KeyCodec(object):
         prefix = self.KEY_PREFIX_STRUCT.pack(type_id, len(key))
         return prefix + bytes(key)
 
+    def encode_key(self, key, key_type):
+        """
+        :param key_type: the name of the type as returned by `TYPE` ('string', 'set', 'hash', or 'zset')
+        """
+        return self.get_key(key, self.KEY_TYPE_IDS[key_type])
+
+    def get_min_key(self, type_id, key_prefix=''):
+        """
+        :return: the lowest db key of the keys of `type_id` starting with `key_prefix`.
+        The key length comes before the key name in this format, thus all keys of `type_id` have to be scanned.
+        """
+        return chr(type_id)
+
     def encode_key_id_and_length(self, key, key_id, length):
         if key == key_id:
             # older schema before uuid
             return bytes(length)
         else:
             # newer schema with uuid
-            return bytes(key_id) + bytes(length)
+            return bytes(key_id) + self.BINARY_VALUE_MARKER + self.LENGTH_STRUCT.pack(length)
+
+    def encode_score(self, score):
+        """
+        :return: the value of `encode_zset_value()` keys
+        """
+        return self.BINARY_VALUE_MARKER + self.SCORE_STRUCT.pack(float(score))
+
+    def decode_score(self, db_value):
+        if db_value[:1] == self.BINARY_VALUE_MARKER:
+            return self.SCORE_STRUCT.unpack_from(db_value, 1)[0]
+        else:
+            return float(db_value)
 
     def encode_string(self, key):
         return self.get_key(key, self.STRING_TYPE)
@@ -91,6 +144,9 @@ class KeyCodec(object):
     def encode_deleted_zset_value(self, key_id):
         return self.get_key(self.get_min_zset_value(key_id), self.DELETED_KEY_TYPE)
 
+    def encode_deleted_zset_rank(self, key_id):
+        return self.get_key(self.get_min_zset_rank(key_id), self.DELETED_KEY_TYPE)
+
     def encode_deleted_hash(self, key_id):
         return self.get_key(self.get_min_hash_field(key_id), self.DELETED_KEY_TYPE)
 
@@ -138,23 +194,32 @@ class KeyCodec(object):
         if db_value is None:
             # newer schema with uuid
             key_id = uuid.uuid4().bytes
-            length = '0'
+            length = 0
+        elif len(db_value) < UUID_LENGTH_IN_BYTES:
+            # older schema before uuid
+            key_id = key
+            length = int(db_value)
         else:
-            if len(db_value) < UUID_LENGTH_IN_BYTES:
-                # older schema before uuid
-                key_id = key
-                length = db_value
+            # new schema with uuid
+            key_id = db_value[:UUID_LENGTH_IN_BYTES]
+            if db_value[UUID_LENGTH_IN_BYTES] == self.BINARY_VALUE_MARKER:
+                length = self.LENGTH_STRUCT.unpack_from(db_value, UUID_LENGTH_IN_BYTES + 1)[0]
             else:
-                # new schema with uuid
-                key_id = db_value[:UUID_LENGTH_IN_BYTES]
-                length = db_value[UUID_LENGTH_IN_BYTES:]
-        length = int(length)
+                length = int(db_value[UUID_LENGTH_IN_BYTES:])
         return key_id, length
 
     def decode_zset_score(self, ldb_key):
+        return FLOAT_CODEC.decode(self._get_zset_score_bytes(ldb_key))
+
+    def decode_zset_scores(self, ldb_keys):
+        """
+        Decode the scores of a list of score keys at once (see `FloatCodec.decode_many()`)
+        """
+        return FLOAT_CODEC.decode_many([self._get_zset_score_bytes(ldb_key) for ldb_key in ldb_keys])
+
+    def _get_zset_score_bytes(self, ldb_key):
         _, length, key_name = self.decode_key(ldb_key)
-        score_bytes = key_name[length:length + self.ZSET_SCORE_FORMAT_LENGTH]
-        return FLOAT_CODEC.decode(score_bytes)
+        return key_name[length:length + self.ZSET_SCORE_FORMAT_LENGTH]
 
     def decode_zset_value(self, ldb_key):
         _, length, key_name = self.decode_key(ldb_key)
@@ -163,17 +228,100 @@ class KeyCodec(object):
     def get_min_zset_score(self, key):
         return self.get_key(key, self.ZSET_SCORE_TYPE)
 
+    def get_zset_score_lower_bound(self, key, score, exclusive=False):
+        """
+        :return: the lowest possible score key with a score greater than `score` (or equal if not `exclusive`)
+        """
+        score = float(score)
+        if score == 0:
+            # -0.0 is stored before 0.0, but they're equal
+            score = 0.0 if exclusive else -0.0
+        if exclusive:
+            encoded_score = FLOAT_CODEC.encode_next(score)
+        else:
+            encoded_score = FLOAT_CODEC.encode(score)
+        return self.get_min_zset_score(key) + encoded_score
+
     def get_min_zset_value(self, key):
         return self.get_key(key, self.ZSET_VALUE_TYPE)
 
+    def get_min_zset_rank(self, key):
+        return self.get_key(key, self.ZSET_RANK_TYPE)
+
+
+class KeyCodecV3(KeyCodec):
+    """
+    Compact key format (format version 3)
+
+    The format version 2 uses 5 bytes of prefix for every stored key (type + 4-byte key length).
+    Version 3 uses different type IDs, so keys of both formats can live in the same database, and:
+
+    * keys (strings, sets, hashes, zsets) have no length at all: <type><key>.
+      Nothing is stored after the key name, thus the length is redundant and
+      keys sharing a prefix are stored next to each other (e.g. `user:1`, `user:10`, `user:2`).
+    * collection elements use a varint length for the key ID: <type><varint(len(key ID))><key ID><element>.
+      Key IDs are 16-byte UUIDs, thus the length takes a single byte.
+
+    Example (zset member `alice` with score 100):
+        version 2: 8 | 0 0 0 16 | key ID | score | alice
+        version 3: 24 | 16 | key ID | score | alice
+    """
+
+    VERSION = 3
+
+    METADATA_TYPE = 16
+    STRING_TYPE = 17
+    SET_TYPE = 18
+    SET_MEMBER_TYPE = 19
+    HASH_TYPE = 20
+    HASH_FIELD_TYPE = 21
+    ZSET_TYPE = 22
+    ZSET_VALUE_TYPE = 23
+    ZSET_SCORE_TYPE = 24
+    ZSET_RANK_TYPE = 25  # see `dredis.rank_index`
+    DELETED_KEY_TYPE = 126
+    KEY_TYPES = [STRING_TYPE, SET_TYPE, HASH_TYPE, ZSET_TYPE]
+    KEY_TYPE_IDS = {
+        'string': STRING_TYPE,
+        'set': SET_TYPE,
+        'hash': HASH_TYPE,
+        'zset': ZSET_TYPE,
+    }
+    KEY_TYPE_NAMES = {type_id: name for name, type_id in KEY_TYPE_IDS.items()}
+    ELEMENT_TYPES = frozenset([SET_MEMBER_TYPE, HASH_FIELD_TYPE, ZSET_VALUE_TYPE, ZSET_SCORE_TYPE, ZSET_RANK_TYPE])
+
+    MIN_DELETED_VALUE = struct.pack('>B', DELETED_KEY_TYPE)
+
+    def get_key(self, key, type_id):
+        if type_id in self.ELEMENT_TYPES:
+            return chr(type_id) + encode_varint(len(key)) + bytes(key)
+        else:
+            return chr(type_id) + bytes(key)
+
+    def decode_key(self, key):
+        type_id = ord(key[0])
+        if type_id in self.ELEMENT_TYPES:
+            key_length, offset = decode_varint(key, 1)
+            return type_id, key_length, key[offset:]
+        else:
+            return type_id, len(key) - 1, key[1:]
+
+    def get_min_key(self, type_id, key_prefix=''):
+        return chr(type_id) + bytes(key_prefix)
+
+    def encode_metadata(self, name):
+        return self.get_key(name, self.METADATA_TYPE)
+
 
 class LMDBBatch(object):
-    def __init__(self, env):
+    def __init__(self, env, record_writes):
         self._env = env
+        self._record_writes = record_writes
         self._put = {}
         self._delete = set()
 
     def put(self, key, value):
+        self._delete.discard(key)
         self._put[key] = value
 
     def delete(self, key):
@@ -184,11 +332,18 @@ class LMDBBatch(object):
         self._delete.add(key)
 
     def write(self):
+        # sorted keys are inserted next to each other in the B-tree,
+        # and appended without searching for their position if they're after all stored keys
+        items = sorted(self._put.iteritems())
         with self._env.begin(write=True) as tnx:
-            for k, v in self._put.items():
-                tnx.put(k, v)
+            if items:
+                c = tnx.cursor()
+                append = not c.last() or c.key() < items[0][0]
+                c.putmulti(items, append=append)
             for k in self._delete:
                 tnx.delete(k)
+        self._record_writes(self._put)
+        self._record_writes(self._delete)
 
     def __enter__(self):
         return self
@@ -199,6 +354,55 @@ class LMDBBatch(object):
             return True
 
 
+def iterate_lmdb_transaction(tnx, prefix=None, start=None, stop=None, reverse=False, include_value=True):
+    # LMDB doesn't have native prefix support, we must call `set_range()` to start it at the proper position,
+    # otherwise it'd require extra iterations to filter by prefix.
+    start, stop = get_iterator_bounds(prefix, start, stop)
+    c = tnx.cursor()
+    if reverse:
+        if stop is not None and c.set_range(stop):
+            positioned = c.prev()
+        else:
+            positioned = c.last()
+        items = c.iterprev() if positioned else []
+    else:
+        if start is not None:
+            positioned = c.set_range(start)
+        else:
+            positioned = c.first()
+        items = c.iternext() if positioned else []
+    for k, v in items:
+        if reverse and start is not None and k < start:
+            return
+        if not reverse and stop is not None and k >= stop:
+            return
+        if include_value:
+            yield k, v
+        else:
+            yield k
+
+
+class LMDBSnapshot(object):
+    """
+    A read-only view of an LMDB database at the time it's created (a read transaction)
+    """
+
+    def __init__(self, env):
+        self._tnx = env.begin()
+
+    def get(self, key, default=None):
+        return self._tnx.get(key, default)
+
+    def get_many(self, keys):
+        return [self._tnx.get(key) for key in keys]
+
+    def iterator(self, prefix=None, start=None, stop=None, reverse=False, include_value=True):
+        return iterate_lmdb_transaction(self._tnx, prefix, start, stop, reverse, include_value)
+
+    def close(self):
+        self._tnx.abort()
+
+
 class LMDBBackend(object):
     """
     Implement a subset of the interface of plyvel.DB
@@ -215,41 +419,116 @@ class LMDBBackend(object):
         options = default_options.copy()
         options.update(custom_options)
         self._env = lmdb.open(path, **options)
+        self._journal = None  # see `start_journal()`
+        self._journal_overflow = False
+        # see `acquire()`
+        self._close_lock = threading.Lock()
+        self._users = 0
+        self._closed = False
 
     def get(self, key, default=None):
         with self._env.begin() as tnx:
             return tnx.get(key, default)
 
+    def get_many(self, keys):
+        # a single read transaction is a consistent snapshot and avoids a transaction per key
+        with self._env.begin() as tnx:
+            return [tnx.get(key) for key in keys]
+
     def put(self, key, value):
         with self._env.begin(write=True) as tnx:
             tnx.put(key, value)
+        self._record_writes([key])
 
     def delete(self, key):
         with self._env.begin(write=True) as tnx:
             tnx.delete(key)
+        self._record_writes([key])
 
     def write_batch(self):
-        return LMDBBatch(self._env)
+        return LMDBBatch(self._env, self._record_writes)
+
+    def delete_range(self, start, stop, limit=None):
+        # the cursor moves to the next key after every deletion, thus keys aren't looked up one by one
+        deleted_keys = []
+        next_key = None
+        with self._env.begin(write=True) as tnx:
+            c = tnx.cursor()
+            if c.set_range(start):
+                while True:
+                    key = c.key()
+                    if not key or (stop is not None and key >= stop):
+                        break
+                    if len(deleted_keys) == limit:
+                        next_key = key
+                        break
+                    c.delete()
+                    deleted_keys.append(key)
+        self._record_writes(deleted_keys)
+        return len(deleted_keys), next_key
+
+    def copy(self, path, compact=True):
+        """
+        Write a consistent copy of the database to the directory `path`.
+        Compacted copies don't have free pages and store the keys in order.
+        """
+        self._env.copy(bytes(path), compact=compact)
+
+    def get_number_of_entries(self):
+        return self._env.stat()['entries']
+
+    def start_journal(self):
+        """
+        Record the keys written from now on by this process, thus a copy can be brought up to date
+        (see `compaction.CompactionScheduler`)
+        """
+        self._journal = set()
+        self._journal_overflow = False
+
+    def stop_journal(self):
+        """
+        :return: the keys written since `start_journal()` or None if there were more than `MAX_JOURNAL_SIZE`
+        """
+        journal, self._journal = self._journal, None
+        if self._journal_overflow:
+            return None
+        return journal
+
+    def _record_writes(self, keys):
+        journal = self._journal
+        if journal is not None and not self._journal_overflow:
+            journal.update(keys)
+            if len(journal) > MAX_JOURNAL_SIZE:
+                self._journal_overflow = True
+                journal.clear()
+
+    def acquire(self):
+        """
+        Keep the environment open until `release()`, thus other threads can use it without holding
+        `DBManager.thread_lock` (e.g. a compaction copy). `close()` doesn't wait for them.
+        """
+        with self._close_lock:
+            self._users += 1
+
+    def release(self):
+        with self._close_lock:
+            self._users -= 1
+            if self._closed and not self._users:
+                self._env.close()
 
     def close(self):
-        self._env.close()
+        with self._close_lock:
+            self._closed = True
+            if not self._users:
+                self._env.close()
 
-    def iterator(self, prefix=None, start=None, include_value=True):
-        # LMDB doesn't have native prefix support, we must call `set_range()` to start it at the proper position,
-        # otherwise it'd require extra iterations to filter by prefix.
-        if start is None:
-            start = prefix
+    def iterator(self, prefix=None, start=None, stop=None, reverse=False, include_value=True):
         with self._env.begin() as t:
-            c = t.cursor()
-            if start is not None and not c.set_range(start):
-                return
-            for k, v in c:
-                if prefix is not None and not k.startswith(prefix):
-                    return
-                if include_value:
-                    yield k, v
-                else:
-                    yield k
+            for item in iterate_lmdb_transaction(t, prefix, start, stop, reverse, include_value):
+                yield item
+
+    def snapshot(self):
+        return LMDBSnapshot(self._env)
 
     def __iter__(self):
         with self._env.begin() as t:
@@ -265,11 +544,17 @@ class MemoryBackend(object):
 
     def __init__(self, path, **custom_options):
         self._db = {}
+        self._keys = []  # sorted keys for `iterator()`
 
     def get(self, key, default=None):
         return self._db.get(key, default)
 
+    def get_many(self, keys):
+        return [self._db.get(key) for key in keys]
+
     def put(self, key, value):
+        if key not in self._db:
+            bisect.insort(self._keys, key)
         self._db[key] = bytes(value)
 
     def delete(self, key):
@@ -277,6 +562,7 @@ class MemoryBackend(object):
             del self._db[key]
         except KeyError:
             return None
+        del self._keys[bisect.bisect_left(self._keys, key)]
 
     def write_batch(self):
         return self
@@ -284,6 +570,18 @@ class MemoryBackend(object):
     def write(self):
         pass
 
+    def delete_range(self, start, stop, limit=None):
+        i = bisect.bisect_left(self._keys, start)
+        j = len(self._keys) if stop is None else bisect.bisect_left(self._keys, stop)
+        next_key = None
+        if limit is not None and j - i > limit:
+            j = i + limit
+            next_key = self._keys[j]
+        for key in self._keys[i:j]:
+            del self._db[key]
+        del self._keys[i:j]
+        return j - i, next_key
+
     def __enter__(self):
         return self
 
@@ -291,23 +589,106 @@ class MemoryBackend(object):
         if exc_type is None:
             return True
 
-    def iterator(self, prefix=None, start=None, include_value=True):
-        for k, v in self:
-            if start is not None and k < start:
-                continue
-            if prefix is not None and not k.startswith(prefix):
-                continue
+    def iterator(self, prefix=None, start=None, stop=None, reverse=False, include_value=True):
+        start, stop = get_iterator_bounds(prefix, start, stop)
+        # keys may be added or deleted while iterating, thus the position must be searched on every step
+        if reverse:
+            i = (len(self._keys) if stop is None else bisect.bisect_left(self._keys, stop)) - 1
+        else:
+            i = 0 if start is None else bisect.bisect_left(self._keys, start)
+        while 0 <= i < len(self._keys):
+            k = self._keys[i]
+            if reverse and start is not None and k < start:
+                return
+            if not reverse and stop is not None and k >= stop:
+                return
             if include_value:
-                yield k, v
+                yield k, self._db[k]
             else:
                 yield k
+            if reverse:
+                i = bisect.bisect_left(self._keys, k) - 1
+            else:
+                i = bisect.bisect_right(self._keys, k)
+
+    def snapshot(self):
+        snapshot = MemoryBackend(None)
+        snapshot._db = self._db.copy()
+        snapshot._keys = list(self._keys)
+        return snapshot
 
     def close(self):
         pass
 
     def __iter__(self):
-        for key in sorted(self._db):
-            yield key, self._db[key]
+        return self.iterator()
+
+
+def get_many(db, keys):
+    """
+    :return: the values of `keys` (None for missing keys) read from the same snapshot of `db`
+    """
+    if len(keys) == 1:
+        return [db.get(keys[0])]
+    if isinstance(db, plyvel.DB):
+        # plyvel doesn't have a multi-get, the snapshot only guarantees all values are read from the same version
+        snapshot = db.snapshot()
+        try:
+            return [snapshot.get(key) for key in keys]
+        finally:
+            snapshot.close()
+    if not hasattr(db, 'get_many'):
+        # LevelDB snapshots (e.g., `KeyspaceSnapshot`) are consistent already
+        return [db.get(key) for key in keys]
+    return db.get_many(keys)
+
+
+def delete_range(db, start, stop, limit=None):
+    """
+    Delete at most `limit` keys in the range [start, stop) with the cheapest primitive of the backend
+    (LevelDB doesn't have range deletions, the keys are deleted in a single write batch)
+
+    :return: (number of deleted keys, the first key left in the range or None)
+    """
+    if isinstance(db, plyvel.DB):
+        deleted = 0
+        with db.write_batch() as batch:
+            for key in db.iterator(start=start, stop=stop, include_value=False):
+                if deleted == limit:
+                    return deleted, key
+                batch.delete(key)
+                deleted += 1
+        return deleted, None
+    return db.delete_range(start, stop, limit)
+
+
+def compact_range(db, start, stop):
+    """
+    Discard the deleted keys in the range [start, stop) from the storage.
+    Only LevelDB needs it, LMDB reuses the pages of deleted keys.
+    """
+    if isinstance(db, plyvel.DB):
+        db.compact_range(start=start, stop=stop)
+
+
+def get_iterator_bounds(prefix, start, stop):
+    """
+    :return: the range of keys [start, stop) to iterate over (None means no limit), as in `plyvel.DB.iterator()`
+    """
+    if prefix is not None:
+        start = prefix if start is None else max(start, prefix)
+        stop = get_prefix_upper_bound(prefix)
+    return start, stop
+
+
+def get_prefix_upper_bound(prefix):
+    """
+    :return: the lowest key greater than all keys starting with `prefix` (None if there's no such key)
+    """
+    prefix = prefix.rstrip('\xff')
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
 
 
 def leveldb_backend(path, **custom_options):
@@ -334,6 +715,9 @@ class DBManager(object):
         self._db_backend = DEFAULT_DB_BACKEND
         self._db_backend_options = {}
         self.thread_lock = threading.Lock()
+        # incremented before and after the directory of a db is replaced (e.g. `FLUSHDB`), thus it's odd meanwhile.
+        # it's shared memory, thus processes forked by the server (e.g. `gc.KeyGarbageCollectorProcess`) see it
+        self._generations = multiprocessing.RawArray('l', NUMBER_OF_REDIS_DATABASES)
 
     def setup_dbs(self, root_dir, backend, backend_options):
         self._db_backend = backend
@@ -342,32 +726,199 @@ class DBManager(object):
             db_id = str(db_id_)
             directory = Path(root_dir).join(db_id)
             self._assign_db(db_id, directory)
+        if root_dir:
+            Path(root_dir).delete_leftovers()
+
+    def attach_dbs(self, root_dir, backend, backend_options):
+        """
+        Open the databases of the server from another process. Only the LMDB backend supports it.
+        """
+        self._db_backend = backend
+        self._db_backend_options = backend_options
+        for db_id_ in range(NUMBER_OF_REDIS_DATABASES):
+            db_id = str(db_id_)
+            self._attach_db(db_id, Path(root_dir).join(db_id))
+
+    def reattach_replaced_dbs(self):
+        """
+        Open again the databases attached by `attach_dbs()` if the server replaced their directories
+        """
+        for db_id in self._dbs:
+            while self._dbs[db_id]['generation'] != self._generations[int(db_id)]:
+                generation = self._generations[int(db_id)]
+                if generation % 2 == 1:
+                    # the server is replacing the directory
+                    time.sleep(REATTACH_INTERVAL)
+                    continue
+                self._dbs[db_id]['db'].close()
+                try:
+                    self._attach_db(db_id, self._dbs[db_id]['directory'])
+                except Exception:
+                    # the directory was replaced again while it was opened
+                    if self._generations[int(db_id)] == generation:
+                        raise
+
+    def _attach_db(self, db_id, directory):
+        generation = self._generations[int(db_id)]
+        directory.makedirs(ignore_if_exists=True)
+        self._dbs[db_id] = {
+            'db': self.open_db(directory),
+            'directory': directory,
+            'generation': generation,
+        }
 
     def open_db(self, path):
         db_factory = DB_BACKENDS[self._db_backend]
         options = self._db_backend_options
         return db_factory(bytes(path), **options)
 
+    def get_directory(self, db_id):
+        return self._dbs[str(db_id)]['directory']
+
     def get_db(self, db_id):
         return self._dbs[str(db_id)]['db']
 
-    def delete_dbs(self):
+    def get_key_codecs(self, db_id):
+        """
+        :return: the codecs of the key formats present in the database, the current format comes first
+        """
+        return self._dbs[str(db_id)]['key_codecs']
+
+    def update_key_codecs(self, db_id):
+        """
+        Detect which key formats are in use. Databases without keys in legacy formats
+        don't pay the price of looking up keys in older formats.
+        """
+        db_id = str(db_id)
+        db = self.get_db(db_id)
+        key_codecs = [KEY_CODEC]
+        for codec in LEGACY_KEY_CODECS:
+            if has_keys(db, codec):
+                key_codecs.append(codec)
+        self._dbs[db_id]['key_codecs'] = key_codecs
+
+    def delete_dbs(self, asynchronous=False):
         for db_id in self._dbs:
-            self.delete_db(db_id)
+            self.delete_db(db_id, asynchronous)
 
-    def delete_db(self, db_id):
+    def delete_db(self, db_id, asynchronous=False):
+        """
+        :param asynchronous: replace the directory with an empty one and delete the files in a background thread
+        """
         db_id = str(db_id)
         with self.thread_lock:
+            self._generations[int(db_id)] += 1
             self._dbs[db_id]['db'].close()
-            self._dbs[db_id]['directory'].reset()
+            self._dbs[db_id]['directory'].reset(asynchronous)
             self._assign_db(db_id, self._dbs[db_id]['directory'])
+            self._generations[int(db_id)] += 1
+
+    def swap_dbs(self, db_id1, db_id2):
+        """
+        Exchange the contents of two dbs without copying them (`SWAPDB`).
+        The directories are renamed too, thus the dbs keep their new IDs after a restart.
+        """
+        db_id1, db_id2 = str(db_id1), str(db_id2)
+        if db_id1 == db_id2:
+            return
+        with self.thread_lock:
+            self._generations[int(db_id1)] += 1
+            self._generations[int(db_id2)] += 1
+            db_info1, db_info2 = self._dbs[db_id1], self._dbs[db_id2]
+            directory1, directory2 = db_info1['directory'], db_info2['directory']
+            # LevelDB creates files by path, thus it must be opened again after its directory is renamed
+            reopen = isinstance(db_info1['db'], plyvel.DB)
+            if reopen:
+                db_info1['db'].close()
+                db_info2['db'].close()
+            # the memory backend doesn't create directories
+            if os.path.exists(directory1) and os.path.exists(directory2):
+                temporary_directory = directory1 + SWAP_DIRECTORY_SUFFIX
+                os.rename(directory1, temporary_directory)
+                os.rename(directory2, directory1)
+                os.rename(temporary_directory, directory2)
+            db_info1['directory'], db_info2['directory'] = directory2, directory1
+            self._dbs[db_id1], self._dbs[db_id2] = db_info2, db_info1
+            if reopen:
+                self._assign_db(db_id1, directory1)
+                self._assign_db(db_id2, directory2)
+            self._generations[int(db_id1)] += 1
+            self._generations[int(db_id2)] += 1
+
+    def get_generation(self, db_id):
+        """
+        :return: a number that changes when the files of the db are replaced (e.g. `FLUSHDB` or `SWAPDB`)
+        """
+        return self._generations[int(db_id)]
+
+    def replace_db_files(self, db_id, source_dir):
+        """
+        Replace the files of a db with the files of `source_dir` (e.g. a compacted copy).
+        The caller must hold `thread_lock`.
+        """
+        db_id = str(db_id)
+        directory = self._dbs[db_id]['directory']
+        self._generations[int(db_id)] += 1
+        self._dbs[db_id]['db'].close()
+        # other processes may still use the previous files (e.g. the LMDB lock file), thus they're not reused
+        directory.reset()
+        for filename in os.listdir(source_dir):
+            os.rename(os.path.join(source_dir, filename), directory.join(filename))
+        os.rmdir(source_dir)
+        self._assign_db(db_id, directory)
+        self._generations[int(db_id)] += 1
 
     def _assign_db(self, db_id, directory):
+        db = self.open_db(directory)
         self._dbs[db_id] = {
-            'db': self.open_db(directory),
+            'db': db,
             'directory': directory,
         }
+        self.update_key_codecs(db_id)
+        # databases without keys start counting them right away,
+        # the keys of other databases without a key count are counted by the first `DBSIZE`
+        if get_key_count(db) is None and not any(has_keys(db, codec) for codec in [KEY_CODEC] + LEGACY_KEY_CODECS):
+            set_key_count(db, 0)
+        # created here, thus `SCAN` and the other read-only commands don't write to the database
+        if get_scan_cursor_secret(db) is None:
+            db.put(KEY_CODEC.encode_metadata(SCAN_CURSOR_SECRET_METADATA), os.urandom(16))
+
+
+def has_keys(db, codec):
+    for key_type in codec.KEY_TYPES:
+        for _ in db.iterator(prefix=chr(key_type), include_value=False):
+            return True
+    return False
+
+
+def get_key_count(db):
+    """
+    :return: the number of keys stored in `db` or None if it's unknown (see `Keyspace.dbsize()`)
+    """
+    db_value = db.get(KEY_CODEC.encode_metadata(KEY_COUNT_METADATA))
+    if db_value is None or len(db_value) != KEY_COUNT_STRUCT.size:
+        return None
+    count = KEY_COUNT_STRUCT.unpack(db_value)[0]
+    if count < 0:
+        return None
+    return count
+
+
+def set_key_count(db_or_batch, count):
+    db_or_batch.put(KEY_CODEC.encode_metadata(KEY_COUNT_METADATA), KEY_COUNT_STRUCT.pack(count))
+
+
+def get_scan_cursor_secret(db):
+    """
+    :return: the HMAC secret of the SCAN cursors of `db` (see `keyspace.ScanCursorCodec`)
+    """
+    return db.get(KEY_CODEC.encode_metadata(SCAN_CURSOR_SECRET_METADATA))
 
 
-KEY_CODEC = KeyCodec()
+KEY_CODEC_V2 = KeyCodec()
+KEY_CODEC_V3 = KeyCodecV3()
+# the format of new keys
+KEY_CODEC = KEY_CODEC_V3
+# older formats that are still readable
+LEGACY_KEY_CODECS = [KEY_CODEC_V2]
 DB_MANAGER = DBManager()
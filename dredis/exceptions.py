@@ -41,6 +41,12 @@ class BusyKeyError(DredisError):
     DEFAULT_MSG = 'Target key name already exists'
 
 
+class MigrateIOError(DredisError):
+
+    PREFIX = 'IOERR'
+    DEFAULT_MSG = 'error or timeout reading to target instance'
+
+
 class NoKeyError(DredisError):
 
     DEFAULT_MSG = "no such key"
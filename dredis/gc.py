@@ -1,38 +1,292 @@
+import logging
+import multiprocessing
+import os
+import struct
 import threading
 import time
 
-from dredis.db import NUMBER_OF_REDIS_DATABASES, DB_MANAGER, KEY_CODEC
+from dredis.db import (
+    NUMBER_OF_REDIS_DATABASES, DB_MANAGER, KEY_CODEC, LEGACY_KEY_CODECS, compact_range, delete_range,
+    get_prefix_upper_bound,
+)
+from dredis.stats import COMMAND_STATS
+from dredis.utils import encode_varint, decode_varint
 
+logger = logging.getLogger(__name__)
 
 DEFAULT_GC_INTERVAL = 500  # milliseconds
-DEFAULT_GC_BATCH_SIZE = 10000  # number of storage keys to delete in a batch
+DEFAULT_GC_BATCH_SIZE = 10000  # maximum number of storage keys to delete in a batch
+DEFAULT_GC_TARGET_LATENCY = 1  # milliseconds. the gc backs off while the average command latency is higher
+GC_MODES = ('thread', 'process')
+DEFAULT_GC_MODE = 'thread'
+MIN_GC_BATCH_SIZE = 100
+CATCH_UP_INTERVAL_RATIO = 0.1  # fraction of the interval to wait between collections while there's a backlog
+BACKLOG_UPDATE_INTERVAL = 10  # seconds. the backlog reported by `INFO` is counted by the gc at most this often
+COMPACTION_THRESHOLD = 100000  # collections with more storage keys are compacted after they're deleted (LevelDB)
+CURSOR_METADATA = 'gc-cursor'
+# the codecs in the order of their deleted markers in the db
+GC_KEY_CODECS = sorted([KEY_CODEC] + LEGACY_KEY_CODECS, key=lambda codec: codec.MIN_DELETED_VALUE)
+# the value of deleted markers is the number of storage keys of the collection when it was deleted
+MARKER_VALUE_STRUCT = struct.Struct('>Q')
+
+
+def encode_marker_value(number_of_keys):
+    return MARKER_VALUE_STRUCT.pack(number_of_keys)
+
+
+def decode_marker_value(db_value):
+    # markers written by older versions of dredis are empty
+    if len(db_value) != MARKER_VALUE_STRUCT.size:
+        return 0
+    return MARKER_VALUE_STRUCT.unpack(db_value)[0]
+
+
+def encode_cursor(marker_db_key, db_key):
+    return encode_varint(len(marker_db_key)) + marker_db_key + db_key
+
+
+def decode_cursor(cursor):
+    """
+    :return: (marker db key, storage key) where the collection resumes
+    """
+    marker_length, offset = decode_varint(cursor)
+    return cursor[offset:offset + marker_length], cursor[offset + marker_length:]
+
+
+class GarbageCollectorStats(object):
+    """
+    The stats are stored in shared memory, thus the server reports the stats of `KeyGarbageCollectorProcess`
+    """
+
+    def __init__(self):
+        self.deleted_keys = multiprocessing.RawValue('l', 0)
+        self.deleted_keys_per_db = multiprocessing.RawArray('l', NUMBER_OF_REDIS_DATABASES)
+        self.deletion_rate = multiprocessing.RawValue('d', 0.0)  # storage keys per second since the last collection
+        self.last_pause = multiprocessing.RawValue('d', 0.0)  # the longest batch of the last collection (seconds)
+        self.total_pause = multiprocessing.RawValue('d', 0.0)
+        self.batch_size = multiprocessing.RawValue('l', DEFAULT_GC_BATCH_SIZE)
+        self.interval = multiprocessing.RawValue('d', DEFAULT_GC_INTERVAL / 1000.0)
+        # the backlog is counted by the gc (see `update_backlog()`) instead of every `INFO` call
+        self.pending_markers = multiprocessing.RawValue('l', 0)
+        self.pending_keys = multiprocessing.RawValue('l', 0)
+
+
+GC_STATS = GarbageCollectorStats()
+
+
+def get_backlog():
+    """
+    :return: (number of deleted markers, estimated number of storage keys to delete)
+    """
+    markers = 0
+    keys = 0
+    for db_id in range(NUMBER_OF_REDIS_DATABASES):
+        db = DB_MANAGER.get_db(db_id)
+        for codec in GC_KEY_CODECS:
+            for _, db_value in db.iterator(prefix=codec.MIN_DELETED_VALUE):
+                markers += 1
+                keys += decode_marker_value(db_value)
+    return markers, keys
+
+
+def update_backlog():
+    """
+    Count the backlog reported by `INFO`, it iterates over all deleted markers
+    """
+    GC_STATS.pending_markers.value, GC_STATS.pending_keys.value = get_backlog()
+
+
+def get_info():
+    return [
+        ('gc_pending_markers', GC_STATS.pending_markers.value),
+        ('gc_pending_keys_estimate', GC_STATS.pending_keys.value),
+        ('gc_deleted_keys', GC_STATS.deleted_keys.value),
+        ('gc_deletion_rate', '%.2f' % GC_STATS.deletion_rate.value),
+        ('gc_last_pause_ms', '%.3f' % (GC_STATS.last_pause.value * 1000)),
+        ('gc_total_pause_ms', '%.3f' % (GC_STATS.total_pause.value * 1000)),
+        ('gc_batch_size', GC_STATS.batch_size.value),
+        ('gc_interval_ms', '%.1f' % (GC_STATS.interval.value * 1000)),
+    ]
 
 
 class KeyGarbageCollector(threading.Thread):
+    """
+    Delete the storage keys of deleted collections (see `Keyspace._delete_db_set()`) in the background.
+
+    Every db stores a cursor with the marker and the storage key where the next batch starts.
+    Collections resume where the previous batch stopped (even after a restart)
+    instead of iterating again over the keys deleted before (LevelDB keeps them until they're compacted).
+    The markers after the cursor are collected first and then the next pass starts from the first marker.
+
+    The storage keys of a collection are deleted with `db.delete_range()` (a cursor walk in a single transaction
+    for LMDB, a write batch for LevelDB). LevelDB collections larger than `COMPACTION_THRESHOLD`
+    are compacted after they're deleted to discard their deletion markers.
 
-    def __init__(self, gc_interval=DEFAULT_GC_INTERVAL, batch_size=DEFAULT_GC_BATCH_SIZE):
+    The batch size and the interval between collections adapt to the load:
+    * the batch size is halved while the average command latency is above the target latency;
+    * otherwise, while there's a backlog, the batch size doubles (up to `batch_size`)
+      and the next collection starts after a fraction of the interval.
+    """
+
+    def __init__(self, gc_interval=DEFAULT_GC_INTERVAL, batch_size=DEFAULT_GC_BATCH_SIZE,
+                 target_latency=DEFAULT_GC_TARGET_LATENCY):
         threading.Thread.__init__(self, name="Key Garbage Collector")
         self._gc_interval_in_secs = gc_interval / 1000.0  # convert to seconds
-        self._batch_size = batch_size
+        self._max_batch_size = int(batch_size)
+        self._min_batch_size = min(MIN_GC_BATCH_SIZE, self._max_batch_size)
+        self._target_latency_in_secs = target_latency / 1000.0  # convert to seconds
+        self._batch_size = self._max_batch_size
+        self._next_interval = self._gc_interval_in_secs
+        self._last_collection_time = None
+        self._last_backlog_update_time = None
 
     def run(self):
         while True:
             self.collect()
-            time.sleep(self._gc_interval_in_secs)
+            time.sleep(self.next_interval)
+
+    @property
+    def next_interval(self):
+        """
+        :return: the number of seconds to wait before the next collection
+        """
+        return self._next_interval
 
     def collect(self):
+        """
+        :return: the number of deleted storage keys
+        """
+        start_time = time.time()
+        deleted = 0
+        has_backlog = False
+        longest_pause = 0.0
         for db_id in range(NUMBER_OF_REDIS_DATABASES):
+            pause_start_time = time.time()
             with DB_MANAGER.thread_lock:
-                self._collect(DB_MANAGER.get_db(db_id))
+                db_deleted, db_has_backlog = self._collect(DB_MANAGER.get_db(db_id))
+            pause = time.time() - pause_start_time
+            deleted += db_deleted
+            GC_STATS.deleted_keys_per_db[db_id] += db_deleted
+            has_backlog = has_backlog or db_has_backlog
+            longest_pause = max(longest_pause, pause)
+            GC_STATS.total_pause.value += pause
+        self._update_stats(start_time, deleted, longest_pause)
+        self._adapt(has_backlog)
+        # the first collection counts the backlog of the databases opened at startup
+        if self._last_backlog_update_time is None or time.time() - self._last_backlog_update_time >= BACKLOG_UPDATE_INTERVAL:
+            update_backlog()
+            self._last_backlog_update_time = time.time()
+        return deleted
 
     def _collect(self, db):
+        """
+        :return: (the number of deleted storage keys, whether the batch size was reached)
+        """
+        cursor_db_key = KEY_CODEC.encode_metadata(CURSOR_METADATA)
+        cursor = db.get(cursor_db_key)
+        if cursor is None:
+            marker_from_cursor = db_key_from_cursor = None
+        else:
+            marker_from_cursor, db_key_from_cursor = decode_cursor(cursor)
+
+        # every step is idempotent, thus the deletions don't need to be in the same batch as the cursor
         deleted = 0
-        with db.write_batch() as batch:
-            for deleted_db_key, _ in db.iterator(prefix=KEY_CODEC.MIN_DELETED_VALUE):
-                _, _, deleted_key_value = KEY_CODEC.decode_key(deleted_db_key)
-                for db_key, _ in db.iterator(prefix=deleted_key_value):
-                    deleted += 1
-                    batch.delete(db_key)
-                    if deleted == self._batch_size:
-                        return
-                batch.delete(deleted_db_key)
+        for codec, marker_db_key, marker_value in self._iterate_markers(db, marker_from_cursor):
+            if deleted >= self._batch_size:
+                db.put(cursor_db_key, encode_cursor(marker_db_key, ''))
+                return deleted, True
+            _, _, prefix = codec.decode_key(marker_db_key)
+            if marker_db_key == marker_from_cursor and db_key_from_cursor.startswith(prefix):
+                start = db_key_from_cursor
+            else:
+                start = prefix
+            stop = get_prefix_upper_bound(prefix)
+            range_deleted, next_db_key = delete_range(db, start, stop, self._batch_size - deleted)
+            deleted += range_deleted
+            if next_db_key is not None:
+                db.put(cursor_db_key, encode_cursor(marker_db_key, next_db_key))
+                return deleted, True
+            db.delete(marker_db_key)
+            deleted += 1
+            if decode_marker_value(marker_value) >= COMPACTION_THRESHOLD:
+                compact_range(db, prefix, stop)
+
+        # the pass is finished, the next one starts from the first marker
+        if cursor is not None:
+            db.delete(cursor_db_key)
+        return deleted, False
+
+    def _iterate_markers(self, db, marker_from_cursor):
+        for codec in GC_KEY_CODECS:
+            prefix = codec.MIN_DELETED_VALUE
+            start = prefix if marker_from_cursor is None else max(prefix, marker_from_cursor)
+            for marker_db_key, marker_value in db.iterator(start=start):
+                if not marker_db_key.startswith(prefix):
+                    break
+                yield codec, marker_db_key, marker_value
+
+    def _adapt(self, has_backlog):
+        if COMMAND_STATS.get_average_latency() > self._target_latency_in_secs:
+            self._batch_size = max(self._min_batch_size, self._batch_size // 2)
+            self._next_interval = self._gc_interval_in_secs
+        elif has_backlog:
+            self._batch_size = min(self._max_batch_size, self._batch_size * 2)
+            self._next_interval = self._gc_interval_in_secs * CATCH_UP_INTERVAL_RATIO
+        else:
+            self._next_interval = self._gc_interval_in_secs
+        GC_STATS.batch_size.value = self._batch_size
+        GC_STATS.interval.value = self._next_interval
+
+    def _update_stats(self, start_time, deleted, longest_pause):
+        if self._last_collection_time is not None:
+            GC_STATS.deletion_rate.value = deleted / max(time.time() - self._last_collection_time, 1e-6)
+        self._last_collection_time = start_time
+        GC_STATS.deleted_keys.value += deleted
+        GC_STATS.last_pause.value = longest_pause
+
+
+class KeyGarbageCollectorProcess(multiprocessing.Process):
+    """
+    Run `KeyGarbageCollector` in a separate process (`--gc-mode=process`),
+    thus the gc doesn't compete with the event loop for the GIL.
+
+    Only LMDB supports access to the same database by multiple processes. The process must be started
+    before the server opens the databases because LMDB environments can't be used after `fork()`,
+    it opens its own environments after `start_collecting()` is called.
+    The server and the gc coordinate through the deleted markers: the server only writes markers and the gc
+    deletes the storage keys of the markers and the markers. Databases are opened again when the server replaces
+    their directories (e.g. `FLUSHDB`).
+    """
+
+    def __init__(self, root_dir, backend_options, gc_interval=DEFAULT_GC_INTERVAL, batch_size=DEFAULT_GC_BATCH_SIZE,
+                 target_latency=DEFAULT_GC_TARGET_LATENCY):
+        multiprocessing.Process.__init__(self, name="Key Garbage Collector")
+        self.daemon = True
+        self._root_dir = root_dir
+        self._backend_options = backend_options
+        self._collector_args = (gc_interval, batch_size, target_latency)
+        self._server_pid = os.getpid()
+        self._dbs_ready = multiprocessing.Event()
+
+    def start_collecting(self):
+        """
+        Called by the server after it opened the databases
+        """
+        self._dbs_ready.set()
+
+    def run(self):
+        try:
+            self._dbs_ready.wait()
+            DB_MANAGER.attach_dbs(self._root_dir, 'lmdb', self._backend_options)
+            collector = KeyGarbageCollector(*self._collector_args)
+            # daemon processes aren't terminated if the server is killed
+            while os.getppid() == self._server_pid:
+                try:
+                    DB_MANAGER.reattach_replaced_dbs()
+                    collector.collect()
+                except Exception:
+                    # e.g. a db directory was replaced during the collection, it's reattached by the next one
+                    logger.exception("Key garbage collection failed")
+                time.sleep(collector.next_interval)
+        except KeyboardInterrupt:
+            pass
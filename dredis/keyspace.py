@@ -1,16 +1,29 @@
 import collections
-import datetime
-import fnmatch
-import time
-from io import BytesIO
-
-from dredis import rdb, config
-from dredis.db import DB_MANAGER, KEY_CODEC, DEFAULT_REDIS_DB
+import contextlib
+import hashlib
+import heapq
+import hmac
+import itertools
+import math
+import operator
+import os
+import struct
+import uuid
+
+from dredis import compaction, migrate, persistence, rdb, config
+from dredis.db import (
+    DB_MANAGER, KEY_CODEC, DEFAULT_REDIS_DB, NUMBER_OF_REDIS_DATABASES, get_key_count, get_many, get_prefix_upper_bound,
+    get_scan_cursor_secret, set_key_count,
+)
+from dredis.gc import encode_marker_value
 from dredis.exceptions import DredisError, BusyKeyError, NoKeyError
 from dredis.lua import LuaRunner
-from dredis.utils import to_float
+from dredis.rank_index import ZSetRankIndex
+from dredis.utils import FLOAT_CODEC, compile_pattern, encode_varint, to_float
 
-RDB_FILENAME_FORMAT = 'dump_%Y-%m-%dT%H:%M:%S.rdb'
+KEY_TYPE_NAMES = ('string', 'set', 'hash', 'zset')
+STORE_BATCH_SIZE = 10000  # number of elements written in a batch by *STORE commands (e.g. ZUNIONSTORE, SINTERSTORE)
+BULK_LOAD_BATCH_SIZE = 100000  # minimum number of db keys written in a batch by `KeyspaceBulkLoader`
 
 
 def to_float_string(f):
@@ -19,39 +32,168 @@ def to_float_string(f):
     return "{:.17g}".format(float(f))
 
 
-class Cursors(object):
+def sum_scores(scores):
+    # same as redis, the sum of +inf and -inf is 0
+    result = 0.0
+    for score in scores:
+        result += score
+        if math.isnan(result):
+            result = 0.0
+    return result
+
+
+def weigh_score(score, weight):
+    result = score * weight
+    if math.isnan(result):
+        # same as redis, inf * 0 is 0
+        result = 0.0
+    return result
+
+
+ZSET_AGGREGATE_FUNCTIONS = {
+    'sum': sum_scores,
+    'min': min,
+    'max': max,
+}
+
+
+def iterate_sorted_union(iterators):
+    """
+    :return: an iterator of the distinct items of the sorted `iterators`
+    """
+    for item, _ in itertools.groupby(heapq.merge(*iterators)):
+        yield item
+
+
+def iterate_sorted_intersection(iterators):
+    """
+    :return: an iterator of the items present in all sorted `iterators`
+    """
+    iterators = [iter(iterator) for iterator in iterators]
+    try:
+        heads = [next(iterator) for iterator in iterators]
+        while True:
+            highest = max(heads)
+            for i, iterator in enumerate(iterators):
+                while heads[i] < highest:
+                    heads[i] = next(iterator)
+            if all(head == highest for head in heads):
+                yield highest
+                heads = [next(iterator) for iterator in iterators]
+    except StopIteration:
+        return
+
+
+def iterate_sorted_difference(iterator, other_iterators):
+    """
+    :return: an iterator of the items of the sorted `iterator` that aren't in any of the sorted `other_iterators`
+    """
+    others = iterate_sorted_union(other_iterators)
+    other = next(others, None)
+    for item in iterator:
+        while other is not None and other < item:
+            other = next(others, None)
+        if item != other:
+            yield item
+
+
+class ScanCursorCodec(object):
+    """
+    SCAN cursors store the db key where the next call resumes, thus no state is kept in the server.
+
+    The cursor is an unsigned 64-bit integer (same as redis) with the bytes <header><prefix><tag>:
+    * the position is the suffix of the next db key after the prefix of the scanned range (e.g. the hash field).
+      the prefix has its first `PREFIX_LENGTH` bytes and the header has its length or `TRUNCATED`;
+    * the tag is a truncated HMAC of the scanned range, the header and the whole position, thus cursors can't be
+      forged or used with other keys. It also tells apart the truncated positions with the same prefix
+      (see `decode()`). The HMAC secret is stored in the database (see `DBManager._assign_db()`).
+    """
+
+    VERSION = 1  # cursors never start with a zero byte, thus they're never 0
+    PREFIX_LENGTH = 4
+    TRUNCATED = PREFIX_LENGTH + 1
+    TAG_LENGTH = 3
+    CURSOR_STRUCT = struct.Struct('>B{}s{}s'.format(PREFIX_LENGTH, TAG_LENGTH))
+    INTEGER_STRUCT = struct.Struct('>Q')
+
+    def __init__(self, secret, recent_positions=None):
+        self._secret = secret
+        self._recent_positions = RECENT_SCAN_POSITIONS if recent_positions is None else recent_positions
+
+    def encode(self, scan_prefix, position):
+        if len(position) <= self.PREFIX_LENGTH:
+            header = (self.VERSION << 4) | len(position)
+        else:
+            header = (self.VERSION << 4) | self.TRUNCATED
+        tag = self._get_tag(scan_prefix, header, position)
+        cursor = self.INTEGER_STRUCT.unpack(self.CURSOR_STRUCT.pack(header, position[:self.PREFIX_LENGTH], tag))[0]
+        if header & 0xf == self.TRUNCATED:
+            self._recent_positions.add(scan_prefix, cursor, position)
+        return cursor
+
+    def decode(self, scan_prefix, cursor, iterate_positions):
+        """
+        A truncated position is taken from the recent cursors or looked up by its tag among the positions
+        with the same prefix. The scan resumes from the first of them if the position is gone
+        (e.g. a deleted hash field), thus elements may be returned twice (same as redis).
+
+        :param iterate_positions: function to iterate over the positions of the range starting with a prefix
+        :return: the position stored in `cursor` or None if `cursor` is invalid
+        """
+        if not 0 < cursor < 2 ** 64:
+            return None
+        header, prefix, tag = self.CURSOR_STRUCT.unpack(self.INTEGER_STRUCT.pack(cursor))
+        version, prefix_length = header >> 4, header & 0xf
+        if version != self.VERSION or prefix_length > self.TRUNCATED:
+            return None
+        if prefix_length != self.TRUNCATED:
+            position = prefix[:prefix_length]
+            if prefix[prefix_length:].strip('\x00') or not self._has_tag(scan_prefix, header, position, tag):
+                return None
+            return position
+        position = self._recent_positions.get(scan_prefix, cursor)
+        if position is not None and position.startswith(prefix) and self._has_tag(scan_prefix, header, position, tag):
+            return position
+        for position in iterate_positions(prefix):
+            if len(position) > self.PREFIX_LENGTH and self._has_tag(scan_prefix, header, position, tag):
+                return position
+        return prefix
+
+    def _has_tag(self, scan_prefix, header, position, tag):
+        return hmac.compare_digest(tag, self._get_tag(scan_prefix, header, position))
+
+    def _get_tag(self, scan_prefix, header, position):
+        message = encode_varint(len(scan_prefix)) + scan_prefix + chr(header) + position
+        return hmac.new(self._secret, message, hashlib.sha256).digest()[:self.TAG_LENGTH]
+
+
+class RecentScanPositions(object):
     """
-    Limit the size of cursors to limit memory consumption
+    The truncated positions of the last cursors, thus the next calls of a scan don't look them up by their tag.
+    Cursors don't depend on it, the lookup is only slower (e.g. after a restart).
     """
 
-    def __init__(self, max_size):
-        self._keys = collections.deque(maxlen=max_size)
-        self._data = {}
+    def __init__(self, max_size, max_position_length):
         self._max_size = max_size
-        # starting at something > 1 to to avoid collisions when the process gets restarted
-        self._cursor_id = int(time.time() * 1000)
+        self._max_position_length = max_position_length
+        self._positions = collections.OrderedDict()
 
-    def add(self, db, key, value):
-        if len(self._data) >= self._max_size:
-            key_to_remove = self._keys.popleft()
-            del self._data[key_to_remove]
-        self._cursor_id += 1
-        cursor_key = self._get_cursor_key(db, key, self._cursor_id)
-        self._data[cursor_key] = value
-        self._keys.append(cursor_key)
-        return self._cursor_id
+    def add(self, scan_prefix, cursor, position):
+        if len(position) > self._max_position_length:
+            return
+        self._positions.pop((scan_prefix, cursor), None)
+        self._positions[(scan_prefix, cursor)] = position
+        if len(self._positions) > self._max_size:
+            self._positions.popitem(last=False)
 
-    def get(self, db, key, cursor):
-        cursor_key = self._get_cursor_key(db, key, cursor)
-        return self._data[cursor_key]
+    def get(self, scan_prefix, cursor):
+        return self._positions.get((scan_prefix, cursor))
 
-    def _get_cursor_key(self, db, key, cursor_id):
-        return (db, key, cursor_id)
+    def clear(self):
+        self._positions.clear()
 
 
-CURSOR_MAX_SIZE = 8 * 1024
-ZSET_CURSORS = Cursors(CURSOR_MAX_SIZE)
-HASH_CURSORS = Cursors(CURSOR_MAX_SIZE)
+RECENT_SCAN_POSITIONS = RecentScanPositions(max_size=8192, max_position_length=1024)
 
 
 class Keyspace(object):
@@ -65,18 +207,33 @@ class Keyspace(object):
     def _set_db(self, db):
         self._current_db = str(db)
 
-    def flushall(self):
-        DB_MANAGER.delete_dbs()
+    def flushall(self, asynchronous=False):
+        DB_MANAGER.delete_dbs(asynchronous)
+
+    def flushdb(self, asynchronous=False):
+        DB_MANAGER.delete_db(self._current_db, asynchronous)
 
-    def flushdb(self):
-        DB_MANAGER.delete_db(self._current_db)
+    def swapdb(self, db_id1, db_id2):
+        DB_MANAGER.swap_dbs(db_id1, db_id2)
 
     def select(self, db):
         self._set_db(db)
 
+    def compact(self, all_dbs=False):
+        if all_dbs:
+            compaction.request_compaction(range(NUMBER_OF_REDIS_DATABASES))
+        else:
+            compaction.request_compaction([self._current_db])
+
     def save(self):
-        filename = datetime.datetime.utcnow().strftime(RDB_FILENAME_FORMAT)
-        rdb.dump_rdb(self, filename)
+        # the dump selects every db, thus it doesn't use this keyspace
+        persistence.save(Keyspace())
+
+    def bgsave(self):
+        persistence.bgsave(KeyspaceSnapshot)
+
+    def lastsave(self):
+        return persistence.PERSISTENCE_STATS.last_save_time
 
     def incrby(self, key, increment=1):
         number = self.get(key)
@@ -87,10 +244,50 @@ class Keyspace(object):
         return result
 
     def get(self, key):
-        return self._db.get(KEY_CODEC.encode_string(key))
+        _, value = self._get_db_value(key, 'string')
+        return value
 
     def set(self, key, value):
-        self._db.put(KEY_CODEC.encode_string(key), value)
+        legacy_codecs = self._key_codecs[1:]
+        is_new_key = self.get(key) is None
+        if legacy_codecs or is_new_key:
+            with self._db.write_batch() as batch:
+                batch.put(KEY_CODEC.encode_string(key), value)
+                for codec in legacy_codecs:
+                    batch.delete(codec.encode_string(key))
+                if is_new_key:
+                    self._update_key_count(batch, 1)
+        else:
+            self._db.put(KEY_CODEC.encode_string(key), value)
+
+    def mget(self, keys):
+        values = [None] * len(keys)
+        for codec in self._key_codecs:
+            missing = [i for i, value in enumerate(values) if value is None]
+            if not missing:
+                break
+            for i, db_value in zip(missing, self._get_db_values([codec.encode_string(keys[i]) for i in missing])):
+                values[i] = db_value
+        return values
+
+    def mset(self, pairs):
+        legacy_codecs = self._key_codecs[1:]
+        keys = [key for key, _ in pairs]
+        new_keys = set(key for key, value in zip(keys, self.mget(keys)) if value is None)
+        with self._db.write_batch() as batch:
+            for key, value in pairs:
+                batch.put(KEY_CODEC.encode_string(key), value)
+                for codec in legacy_codecs:
+                    batch.delete(codec.encode_string(key))
+            self._update_key_count(batch, len(new_keys))
+
+    def msetnx(self, pairs):
+        db_keys = [codec.encode_key(key, key_type)
+                   for codec in self._key_codecs for key, _ in pairs for key_type in KEY_TYPE_NAMES]
+        if any(db_value is not None for db_value in self._get_db_values(db_keys)):
+            return 0
+        self.mset(pairs)
+        return 1
 
     def getrange(self, key, start, end):
         value = self.get(key)
@@ -102,85 +299,227 @@ class Keyspace(object):
             end += 1  # inclusive
             return value[start:end]
 
-    def sadd(self, key, value):
-        key_id, length = self._get_set_key_id_and_length(key)
-        if self._db.get(KEY_CODEC.encode_set_member(key_id, value)) is None:
+    def sadd(self, key, *members):
+        codec, key_id, length = self._get_set_key_id_and_length(key)
+        db_keys = [codec.encode_set_member(key_id, member) for member in members]
+        new_db_keys = set(db_key for db_key, db_value in zip(db_keys, self._get_db_values(db_keys)) if db_value is None)
+        if new_db_keys:
             with self._db.write_batch() as batch:
-                batch.put(KEY_CODEC.encode_set(key), KEY_CODEC.encode_key_id_and_length(key, key_id, length + 1))
-                batch.put(KEY_CODEC.encode_set_member(key_id, value), bytes(''))
-            return 1
-        else:
+                batch.put(codec.encode_set(key), codec.encode_key_id_and_length(key, key_id, length + len(new_db_keys)))
+                for db_key in new_db_keys:
+                    batch.put(db_key, bytes(''))
+                if length == 0:
+                    self._update_key_count(batch, 1)
+        return len(new_db_keys)
+
+    def srem(self, key, *members):
+        codec, key_id, length = self._get_set_key_id_and_length(key)
+
+        # safe guard
+        if length == 0:
             return 0
 
+        db_keys = [codec.encode_set_member(key_id, member) for member in members]
+        existing_db_keys = set(
+            db_key for db_key, db_value in zip(db_keys, self._get_db_values(db_keys)) if db_value is not None)
+        if not existing_db_keys:
+            return 0
+        length -= len(existing_db_keys)
+        if length == 0:
+            # remove empty sets from keyspace
+            self.delete(key)
+        else:
+            with self._db.write_batch() as batch:
+                batch.put(codec.encode_set(key), codec.encode_key_id_and_length(key, key_id, length))
+                for db_key in existing_db_keys:
+                    batch.delete(db_key)
+        return len(existing_db_keys)
+
     def smembers(self, key):
         result = set()
-        key_id, length = self._get_set_key_id_and_length(key)
+        codec, key_id, length = self._get_set_key_id_and_length(key)
         if length > 0:
-            for db_key, _ in self._get_db_iterator(KEY_CODEC.get_min_set_member(key_id)):
-                _, length, member_key = KEY_CODEC.decode_key(db_key)
+            for db_key, _ in self._get_db_iterator(codec.get_min_set_member(key_id)):
+                _, length, member_key = codec.decode_key(db_key)
                 member_value = member_key[length:]
                 result.add(member_value)
         return result
 
+    def iterate_set(self, key):
+        """
+        Iterate over the members of a set in the db order without loading them in memory
+        """
+        return self._iterate_set_members(key)
+
     def sismember(self, key, value):
-        key_id, _ = self._get_set_key_id_and_length(key)
-        return self._db.get(KEY_CODEC.encode_set_member(key_id, value)) is not None
+        codec, key_id, _ = self._get_set_key_id_and_length(key)
+        return self._db.get(codec.encode_set_member(key_id, value)) is not None
+
+    def sscan(self, key, cursor, match, count):
+        codec, key_id, _ = self._get_set_key_id_and_length(key)
+        return self._scan(codec.get_min_set_member(key_id), cursor, match, count)
+
+    def smismember(self, key, members):
+        codec, key_id, length = self._get_set_key_id_and_length(key)
+        if length == 0:
+            return [False] * len(members)
+        db_values = self._get_db_values([codec.encode_set_member(key_id, member) for member in members])
+        return [db_value is not None for db_value in db_values]
 
     def scard(self, key):
-        _, length = self._get_set_key_id_and_length(key)
+        _, _, length = self._get_set_key_id_and_length(key)
         return length
 
     def _get_set_key_id_and_length(self, key):
-        db_value = self._db.get(KEY_CODEC.encode_set(key))
-        return KEY_CODEC.decode_key_id_and_length(key, db_value)
+        return self._get_key_id_and_length(key, 'set')
+
+    def _iterate_set_members(self, key):
+        """
+        :return: an iterator of the members of a set in lexicographical order (the order of the db keys)
+        """
+        codec, key_id, length = self._get_set_key_id_and_length(key)
+        if length == 0:
+            return
+        prefix = codec.get_min_set_member(key_id)
+        for db_key in self._db.iterator(prefix=prefix, include_value=False):
+            yield db_key[len(prefix):]
+
+    def sinter(self, keys):
+        return list(self._iterate_set_intersection(keys))
+
+    def sintercard(self, keys, limit=0):
+        result = 0
+        for _ in self._iterate_set_intersection(keys):
+            result += 1
+            if result == limit:
+                break
+        return result
+
+    def sinterstore(self, destination, keys):
+        return self._store_set(destination, self._iterate_set_intersection(keys))
+
+    def sunion(self, keys):
+        return list(self._iterate_set_union(keys))
+
+    def sunionstore(self, destination, keys):
+        return self._store_set(destination, self._iterate_set_union(keys))
+
+    def sdiff(self, keys):
+        return list(self._iterate_set_difference(keys))
+
+    def sdiffstore(self, destination, keys):
+        return self._store_set(destination, self._iterate_set_difference(keys))
+
+    def _iterate_set_intersection(self, keys):
+        # the members of every set are sorted, thus they can be merged without loading the sets in memory
+        if any(self.scard(key) == 0 for key in keys):
+            return iter([])
+        return iterate_sorted_intersection([self._iterate_set_members(key) for key in keys])
+
+    def _iterate_set_union(self, keys):
+        return iterate_sorted_union([self._iterate_set_members(key) for key in keys])
+
+    def _iterate_set_difference(self, keys):
+        return iterate_sorted_difference(self._iterate_set_members(keys[0]),
+                                         [self._iterate_set_members(key) for key in keys[1:]])
+
+    def _store_set(self, key, members):
+        """
+        Replace `key` with a set of `members` (see `_store_elements()`)
+
+        :return: the number of members
+        """
+        codec = KEY_CODEC
+        key_id = uuid.uuid4().bytes
+        length = self._store_elements(members, lambda member: [(codec.encode_set_member(key_id, member), bytes(''))])
+        self._replace_key(key, codec.encode_set(key), codec.encode_key_id_and_length(key, key_id, length), length)
+        return length
+
+    def _get_db_values(self, db_keys):
+        """
+        :return: the values of `db_keys` (None for missing keys)
+        """
+        return get_many(self._db, db_keys)
+
+    def _get_key_id_and_length(self, key, key_type):
+        codec, db_value = self._get_db_value(key, key_type)
+        key_id, length = codec.decode_key_id_and_length(key, db_value)
+        return codec, key_id, length
+
+    def _get_db_value(self, key, key_type):
+        """
+        :return: (KeyCodec, str). the codec of the key format storing `key` and the stored value.
+        Keys that don't exist get the current key format.
+        """
+        for codec in self._key_codecs:
+            db_value = self._db.get(codec.encode_key(key, key_type))
+            if db_value is not None:
+                return codec, db_value
+        return KEY_CODEC, None
+
+    def _get_key_type(self, key):
+        """
+        :return: (KeyCodec, str). the codec of the key format storing `key` and the key type
+        """
+        for codec in self._key_codecs:
+            for key_type in KEY_TYPE_NAMES:
+                if self._db.get(codec.encode_key(key, key_type)) is not None:
+                    return codec, key_type
+        return KEY_CODEC, 'none'
+
+    @property
+    def _key_codecs(self):
+        return DB_MANAGER.get_key_codecs(self._current_db)
 
     def delete(self, *keys):
         result = 0
         for key in keys:
-            if self._db.get(KEY_CODEC.encode_string(key)) is not None:
-                self._delete_db_string(key)
-                result += 1
-            elif self._db.get(KEY_CODEC.encode_set(key)) is not None:
-                self._delete_db_set(key)
-                result += 1
-            elif self._db.get(KEY_CODEC.encode_hash(key)) is not None:
-                self._delete_db_hash(key)
-                result += 1
-            elif self._db.get(KEY_CODEC.encode_zset(key)) is not None:
-                self._delete_db_zset(key)
+            codec, key_type = self._get_key_type(key)
+            if key_type != 'none':
+                with self._db.write_batch() as batch:
+                    self._delete_db_key(batch, codec, key, key_type)
+                    self._update_key_count(batch, -1)
                 result += 1
         return result
 
-    def _delete_db_string(self, key):
+    def _delete_db_key(self, batch, codec, key, key_type):
+        if key_type == 'string':
+            self._delete_db_string(batch, codec, key)
+        elif key_type == 'set':
+            self._delete_db_set(batch, codec, key)
+        elif key_type == 'hash':
+            self._delete_db_hash(batch, codec, key)
+        elif key_type == 'zset':
+            self._delete_db_zset(batch, codec, key)
+
+    def _delete_db_string(self, batch, codec, key):
         # there is one set of db keys for strings:
         # * string
-        self._db.delete(KEY_CODEC.encode_string(key))
+        batch.delete(codec.encode_string(key))
 
-    def _delete_db_set(self, key):
+    def _delete_db_set(self, batch, codec, key):
         # there are two sets of db keys for sets:
         # * set
         # * set members
         #
         # currently the `set` key is immediately deleted and the other keys
         # will be collected by gc.KeyGarbageCollector()
-        key_id, _ = self._get_set_key_id_and_length(key)
-        with self._db.write_batch() as batch:
-            batch.delete(KEY_CODEC.encode_set(key))
-            batch.put(KEY_CODEC.encode_deleted_set(key_id), bytes(''))
+        key_id, length = codec.decode_key_id_and_length(key, self._db.get(codec.encode_set(key)))
+        batch.delete(codec.encode_set(key))
+        batch.put(codec.encode_deleted_set(key_id), encode_marker_value(length))
 
-    def _delete_db_hash(self, key):
+    def _delete_db_hash(self, batch, codec, key):
         # there are two sets of db keys for hashes:
         # * hash
         # * hash fields
         #
         # currently the `hash` key is immediately deleted and the other keys
         # will be collected by gc.KeyGarbageCollector()
-        key_id, _ = self._get_hash_key_id_and_length(key)
-        with self._db.write_batch() as batch:
-            batch.delete(KEY_CODEC.encode_hash(key))
-            batch.put(KEY_CODEC.encode_deleted_hash(key_id), bytes(''))
+        key_id, length = codec.decode_key_id_and_length(key, self._db.get(codec.encode_hash(key)))
+        batch.delete(codec.encode_hash(key))
+        batch.put(codec.encode_deleted_hash(key_id), encode_marker_value(length))
 
-    def _delete_db_zset(self, key):
+    def _delete_db_zset(self, batch, codec, key):
         # there are three sets of db keys for zsets:
         # * zset
         # * zset scores
@@ -188,91 +527,210 @@ class Keyspace(object):
         #
         # currently the `zset` key is immediately deleted and the other keys
         # will be collected by gc.KeyGarbageCollector()
-        key_id, _ = self._get_zset_key_id_and_length(key)
-        with self._db.write_batch() as batch:
-            batch.delete(KEY_CODEC.encode_zset(key))
-            batch.put(KEY_CODEC.encode_deleted_zset_score(key_id), bytes(''))
-            batch.put(KEY_CODEC.encode_deleted_zset_value(key_id), bytes(''))
+        key_id, length = codec.decode_key_id_and_length(key, self._db.get(codec.encode_zset(key)))
+        batch.delete(codec.encode_zset(key))
+        batch.put(codec.encode_deleted_zset_score(key_id), encode_marker_value(length))
+        batch.put(codec.encode_deleted_zset_value(key_id), encode_marker_value(length))
+        if ZSetRankIndex.is_supported(codec):
+            batch.put(codec.encode_deleted_zset_rank(key_id), encode_marker_value(0))
 
     def _get_db_iterator(self, key_prefix=None, start=None):
         for db_key, db_value in self._db.iterator(prefix=key_prefix, start=start):
             yield db_key, db_value
 
     def zadd(self, key, score, value, nx=False, xx=False):
-        key_id, zset_length = self._get_zset_key_id_and_length(key)
+        return self.zadd_many(key, [(score, value)], nx=nx, xx=xx)
+
+    def zadd_many(self, key, elements, nx=False, xx=False):
+        """
+        Add or update the `elements` (score, member) of a zset with a single write batch.
+        The elements are applied in order, as if they were added one by one.
+
+        :return: the number of new members
+        """
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
+        members = collections.OrderedDict.fromkeys(bytes(member) for _, member in elements).keys()
+        db_scores = self._get_db_values([codec.encode_zset_value(key_id, member) for member in members])
+        previous_scores = {}
+        for member, db_score in zip(members, db_scores):
+            if db_score is not None:
+                previous_scores[member] = codec.decode_score(db_score)
+
+        scores = dict(previous_scores)
+        for score, element_member in elements:
+            element_member = bytes(element_member)
+            if (nx and element_member in scores) or (xx and element_member not in scores):
+                continue
+            scores[element_member] = float(score)
+        changed_members = [member for member in members
+                           if member in scores and scores[member] != previous_scores.get(member)]
+        if not changed_members:
+            return 0
 
+        rank_index = self._get_zset_rank_index_for_update(codec, key_id, zset_length)
+        result = 0
         batch = self._db.write_batch()
-        db_score = self._db.get(KEY_CODEC.encode_zset_value(key_id, value))
-        if db_score is not None:
-            if nx:
-                return 0
-            result = 0
-            previous_score = db_score
-            if float(previous_score) == float(score):
-                return result
+        for member in changed_members:
+            score = scores[member]
+            previous_score = previous_scores.get(member)
+            if previous_score is None:
+                result += 1
             else:
-                batch.delete(KEY_CODEC.encode_zset_score(key_id, value, previous_score))
-        else:
-            if xx:
-                return 0
-            result = 1
-            zset_length += 1
-            batch.put(KEY_CODEC.encode_zset(key), KEY_CODEC.encode_key_id_and_length(key, key_id, zset_length))
-
-        batch.put(KEY_CODEC.encode_zset_value(key_id, value), to_float_string(score))
-        batch.put(KEY_CODEC.encode_zset_score(key_id, value, score), bytes(''))
+                batch.delete(codec.encode_zset_score(key_id, member, previous_score))
+            batch.put(codec.encode_zset_value(key_id, member), codec.encode_score(score))
+            batch.put(codec.encode_zset_score(key_id, member, score), bytes(''))
+            if rank_index:
+                if previous_score is not None:
+                    rank_index.remove(previous_score, member)
+                rank_index.add(score, member)
+        if result:
+            batch.put(codec.encode_zset(key), codec.encode_key_id_and_length(key, key_id, zset_length + result))
+            if zset_length == 0:
+                self._update_key_count(batch, 1)
+        if rank_index:
+            rank_index.flush(batch)
         batch.write()
+        if rank_index:
+            rank_index.rebalance()
 
         return result
 
-    def zrange(self, key, start, stop, with_scores):
-        result = []
+    def _get_zset_rank_index(self, codec, key_id, zset_length):
+        """
+        :return: the `ZSetRankIndex` of the zset or None if it doesn't exist
+        """
+        if zset_length == 0 or not ZSetRankIndex.is_supported(codec):
+            return None
+        rank_index = ZSetRankIndex(self._db, codec, key_id)
+        if rank_index.exists():
+            return rank_index
+        else:
+            return None
 
-        key_id, zset_length = self._get_zset_key_id_and_length(key)
-        if stop < 0:
-            end = zset_length + stop
+    def _get_zset_rank_index_for_update(self, codec, key_id, zset_length):
+        """
+        Zsets created by older versions of dredis don't have a rank index, it's created on their first update
+        """
+        if not ZSetRankIndex.is_supported(codec):
+            return None
+        rank_index = ZSetRankIndex(self._db, codec, key_id)
+        if zset_length == 0:
+            rank_index.create()
+        elif not rank_index.exists():
+            rank_index.build()
+        return rank_index
+
+    def zrange(self, key, start, stop, with_scores):
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
+        begin, end = self._get_zset_index_range(zset_length, start, stop)
+        if begin > end:
+            return []
+
+        prefix = codec.get_min_zset_score(key_id)
+        rank_index = self._get_zset_rank_index(codec, key_id, zset_length)
+        if rank_index and begin > 0:
+            db_start, skip = rank_index.seek(begin)
+        else:
+            db_start, skip = prefix, begin
+        db_keys = []
+        for i, db_key in enumerate(self._db.iterator(start=db_start, include_value=False), begin - skip):
+            if i < begin:
+                continue
+            if i > end or not db_key.startswith(prefix):
+                break
+            db_keys.append(db_key)
+        return self._get_zset_range_result(codec, db_keys, with_scores)
+
+    def zrevrange(self, key, start, stop, with_scores):
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
+        begin, end = self._get_zset_index_range(zset_length, start, stop)
+        if begin > end:
+            return []
+
+        rank_index = self._get_zset_rank_index(codec, key_id, zset_length)
+        if rank_index and begin > 0:
+            db_stop = rank_index.find_score_key(zset_length - 1 - begin) + '\x00'
+            skip = 0
         else:
-            end = stop
+            db_stop = None
+            skip = begin
+        db_keys = []
+        for i, db_key in enumerate(self._get_zset_reverse_iterator(codec, key_id, db_stop)):
+            if i < skip:
+                continue
+            if len(db_keys) > end - begin:
+                break
+            db_keys.append(db_key)
+        return self._get_zset_range_result(codec, db_keys, with_scores)
 
+    def _get_zset_index_range(self, zset_length, start, stop):
+        """
+        :return: the indexes of the first and the last elements of the range (the range is empty if first > last)
+        """
         if start < 0:
             begin = max(0, zset_length + start)
         else:
             begin = start
-        for i, (db_key, _) in enumerate(self._get_db_iterator(KEY_CODEC.get_min_zset_score(key_id))):
-            if i < begin:
-                continue
-            if i > end:
-                break
-            db_score = KEY_CODEC.decode_zset_score(db_key)
-            db_value = KEY_CODEC.decode_zset_value(db_key)
-            result.append(db_value)
-            if with_scores:
-                result.append(db_score)
+        if stop < 0:
+            end = zset_length + stop
+        else:
+            end = min(stop, zset_length - 1)
+        return begin, end
 
+    def _get_zset_range_result(self, codec, db_keys, with_scores):
+        result = []
+        if with_scores:
+            for db_key, db_score in zip(db_keys, codec.decode_zset_scores(db_keys)):
+                result.append(codec.decode_zset_value(db_key))
+                result.append(db_score)
+        else:
+            for db_key in db_keys:
+                result.append(codec.decode_zset_value(db_key))
         return result
 
+    def _get_zset_reverse_iterator(self, codec, key_id, db_stop=None):
+        """
+        Iterate over the score keys of a zset from the highest score, starting before `db_stop` (if provided)
+        """
+        # plyvel doesn't support `prefix` along with `stop` and its reverse iteration with `start` is buggy,
+        # thus the prefix is checked here
+        prefix = codec.get_min_zset_score(key_id)
+        if db_stop is None:
+            db_stop = get_prefix_upper_bound(prefix)
+        for db_key in self._db.iterator(stop=db_stop, reverse=True, include_value=False):
+            if not db_key.startswith(prefix):
+                break
+            yield db_key
+
     def zcard(self, key):
-        _, zset_length = self._get_zset_key_id_and_length(key)
+        _, _, zset_length = self._get_zset_key_id_and_length(key)
         return zset_length
 
     def zscore(self, key, member):
-        key_id, length = self._get_zset_key_id_and_length(key)
+        codec, key_id, length = self._get_zset_key_id_and_length(key)
         if length == 0:
             return None
+        db_score = self._db.get(codec.encode_zset_value(key_id, member))
+        if db_score is None:
+            return None
         else:
-            return self._db.get(KEY_CODEC.encode_zset_value(key_id, member))
+            return to_float_string(codec.decode_score(db_score))
+
+    def zmscore(self, key, members):
+        codec, key_id, length = self._get_zset_key_id_and_length(key)
+        if length == 0:
+            return [None] * len(members)
+        db_scores = self._get_db_values([codec.encode_zset_value(key_id, member) for member in members])
+        return [None if db_score is None else to_float_string(codec.decode_score(db_score)) for db_score in db_scores]
 
     def zscan(self, key, cursor, match, count):
-        def get_key_value_pair(db_key, db_value):
-            field = KEY_CODEC.decode_zset_value(db_key)
-            value = KEY_CODEC.decode_zset_score(db_key)
-            return field, value
+        codec, key_id, _ = self._get_zset_key_id_and_length(key)
 
-        key_id, _ = self._get_zset_key_id_and_length(key)
-        get_min_field = KEY_CODEC.get_min_zset_score
-        cursors = ZSET_CURSORS
+        # the value keys are sorted by member, thus MATCH patterns with a literal prefix can seek to it
+        def get_key_value_pair(field, db_value):
+            return field, codec.decode_score(db_value)
 
-        return self._scan(key_id, cursor, match, count, get_min_field, get_key_value_pair, cursors)
+        return self._scan(codec.get_min_zset_value(key_id), cursor, match, count, get_key_value_pair)
 
     def eval(self, script, keys, argv):
         return self._lua_runner.run(script, keys, argv)
@@ -282,33 +740,45 @@ class Keyspace(object):
         see zadd() for information about score and value structures
         """
         result = 0
-        key_id, zset_length = self._get_zset_key_id_and_length(key)
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
 
         # safe guard
         if zset_length == 0:
             return result
 
+        # the batch isn't visible to the reads, thus repeated members would be removed twice
+        members = list(set(members))
+        db_keys = [codec.encode_zset_value(key_id, member) for member in members]
+        existing_members_and_scores = [
+            (member, db_score) for member, db_score in zip(members, self._get_db_values(db_keys)) if db_score is not None]
+        if not existing_members_and_scores:
+            return result
+
+        rank_index = self._get_zset_rank_index_for_update(codec, key_id, zset_length)
         batch = self._db.write_batch()
-        for member in members:
-            score = self._db.get(KEY_CODEC.encode_zset_value(key_id, member))
-            if score is None:
-                continue
+        for member, db_score in existing_members_and_scores:
+            score = codec.decode_score(db_score)
             result += 1
             zset_length -= 1
-            batch.delete(KEY_CODEC.encode_zset_value(key_id, member))
-            batch.delete(KEY_CODEC.encode_zset_score(key_id, member, score))
+            batch.delete(codec.encode_zset_value(key_id, member))
+            batch.delete(codec.encode_zset_score(key_id, member, score))
+            if rank_index:
+                rank_index.remove(score, member)
 
         # empty zset should be removed from keyspace
         if zset_length == 0:
             self.delete(key)
         else:
-            batch.put(KEY_CODEC.encode_zset(key), KEY_CODEC.encode_key_id_and_length(key, key_id, zset_length))
+            batch.put(codec.encode_zset(key), codec.encode_key_id_and_length(key, key_id, zset_length))
+            if rank_index:
+                rank_index.flush(batch)
             batch.write()
+            if rank_index:
+                rank_index.rebalance()
         return result
 
     def _get_zset_key_id_and_length(self, key):
-        db_value = self._db.get(KEY_CODEC.encode_zset(key))
-        return KEY_CODEC.decode_key_id_and_length(key, db_value)
+        return self._get_key_id_and_length(key, 'zset')
 
     def zrangebyscore(self, key, min_score, max_score, withscores=False, offset=0, count=float('+inf')):
         result = []
@@ -318,13 +788,19 @@ class Keyspace(object):
         else:
             num_elems_per_entry = 1
 
-        key_id, _ = self._get_zset_key_id_and_length(key)
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
 
         score_range = ScoreRange(min_score, max_score)
-        for db_key in self._db.iterator(prefix=KEY_CODEC.get_min_zset_score(key_id), include_value=False):
+        rank_index = self._get_zset_rank_index(codec, key_id, zset_length)
+        if rank_index and offset > 0:
+            db_keys = self._skip_zset_score_range_offset(codec, key_id, zset_length, score_range, rank_index, offset)
+            offset = 0
+        else:
+            db_keys = self._get_zset_score_range_iterator(codec, key_id, score_range)
+        for db_key in db_keys:
             if len(result) / num_elems_per_entry >= count:
                 return result
-            db_score = KEY_CODEC.decode_zset_score(db_key)
+            db_score = codec.decode_zset_score(db_key)
             if score_range.above_max(db_score):
                 break
             if score_range.check(db_score):
@@ -332,90 +808,406 @@ class Keyspace(object):
                 if len(result) / num_elems_per_entry >= count:
                     return result
                 if num_elems_read > offset:
-                    db_value = KEY_CODEC.decode_zset_value(db_key)
+                    db_value = codec.decode_zset_value(db_key)
                     result.append(db_value)
                     if withscores:
                         result.append(db_score)
         return result
 
+    def zrevrangebyscore(self, key, max_score, min_score, withscores=False, offset=0, count=float('+inf')):
+        result = []
+        if withscores:
+            num_elems_per_entry = 2
+        else:
+            num_elems_per_entry = 1
+
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
+
+        score_range = ScoreRange(min_score, max_score)
+        # the first score key after the range
+        db_stop = codec.get_zset_score_lower_bound(key_id, score_range.max_score, not score_range.max_exclusive)
+        rank_index = self._get_zset_rank_index(codec, key_id, zset_length)
+        if rank_index and offset > 0:
+            rank = rank_index.rank_of_score_key(db_stop) - 1 - offset
+            if rank < 0:
+                return result
+            db_stop = rank_index.find_score_key(rank) + '\x00'
+            offset = 0
+        for db_key in self._get_zset_reverse_iterator(codec, key_id, db_stop):
+            if len(result) / num_elems_per_entry >= count:
+                break
+            db_score = codec.decode_zset_score(db_key)
+            if score_range.below_min(db_score):
+                break
+            if offset > 0:
+                offset -= 1
+                continue
+            result.append(codec.decode_zset_value(db_key))
+            if withscores:
+                result.append(db_score)
+        return result
+
+    def _skip_zset_score_range_offset(self, codec, key_id, zset_length, score_range, rank_index, offset):
+        """
+        Iterate over the score keys of a zset starting at the element `offset` of `score_range`
+        """
+        start = codec.get_zset_score_lower_bound(key_id, score_range.min_score, score_range.min_exclusive)
+        rank = rank_index.rank_of_score_key(start) + offset
+        if rank >= zset_length:
+            return
+        db_start, skip = rank_index.seek(rank)
+        prefix = codec.get_min_zset_score(key_id)
+        for i, db_key in enumerate(self._db.iterator(start=db_start, include_value=False)):
+            if not db_key.startswith(prefix):
+                break
+            if i >= skip:
+                yield db_key
+
     def zcount(self, key, min_score, max_score):
-        # TODO: optimize for performance. it's probably possible to create a new entry only for scores
-        # like:
-        #     <prefix>myzset<score> = number of elements with that score
-        #
-        #     ZADD myzset 10 a
-        #     <prefix>_myzset_10 = 1  ; one element with score 10
-        #
-        #     ZADD myzset 10 b
-        #     <prefix>_myzset_10 = 2  ; two elements with score 10
-        key_id, _ = self._get_zset_key_id_and_length(key)
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
         score_range = ScoreRange(min_score, max_score)
+
+        rank_index = self._get_zset_rank_index(codec, key_id, zset_length)
+        if rank_index:
+            start = codec.get_zset_score_lower_bound(key_id, score_range.min_score, score_range.min_exclusive)
+            # the first score key after the range
+            stop = codec.get_zset_score_lower_bound(key_id, score_range.max_score, not score_range.max_exclusive)
+            return max(0, rank_index.rank_of_score_key(stop) - rank_index.rank_of_score_key(start))
+
         count = 0
-        for db_key, _ in self._get_db_iterator(KEY_CODEC.get_min_zset_score(key_id)):
-            db_score = KEY_CODEC.decode_zset_score(db_key)
-            if score_range.check(db_score):
-                count += 1
+        for db_key in self._get_zset_score_range_iterator(codec, key_id, score_range):
+            db_score = codec.decode_zset_score(db_key)
             if score_range.above_max(db_score):
                 break
+            if score_range.check(db_score):
+                count += 1
         return count
 
+    def _get_zset_score_range_iterator(self, codec, key_id, score_range):
+        """
+        Iterate over the score keys of a zset starting at the lower bound of `score_range`
+        (the caller must stop the iteration after the upper bound)
+        """
+        prefix = codec.get_min_zset_score(key_id)
+        start = codec.get_zset_score_lower_bound(key_id, score_range.min_score, score_range.min_exclusive)
+        for db_key in self._db.iterator(start=start, include_value=False):
+            if not db_key.startswith(prefix):
+                break
+            yield db_key
+
     def zrank(self, key, member):
-        key_id, _ = self._get_zset_key_id_and_length(key)
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
 
-        score = self._db.get(KEY_CODEC.encode_zset_value(key_id, member))
-        if score is None:
+        db_score = self._db.get(codec.encode_zset_value(key_id, member))
+        if db_score is None:
             return None
+        score = codec.decode_score(db_score)
+
+        rank_index = self._get_zset_rank_index(codec, key_id, zset_length)
+        if rank_index:
+            return rank_index.rank(score, member)
 
         rank = 0
-        for db_key, _ in self._get_db_iterator(KEY_CODEC.get_min_zset_score(key_id)):
-            db_score = KEY_CODEC.decode_zset_score(db_key)
-            db_value = KEY_CODEC.decode_zset_value(db_key)
-            if db_score < float(score):
+        for db_key, _ in self._get_db_iterator(codec.get_min_zset_score(key_id)):
+            db_score = codec.decode_zset_score(db_key)
+            db_value = codec.decode_zset_value(db_key)
+            if db_score < score:
                 rank += 1
-            elif db_score == float(score) and db_value < member:
+            elif db_score == score and db_value < member:
                 rank += 1
             else:
                 break
         return rank
 
-    def zunionstore(self, destination, keys, weights):
-        union = collections.defaultdict(list)
-        for (key, weight) in zip(keys, weights):
-            elem_with_scores = self.zrange(key, 0, -1, with_scores=True)
-            while elem_with_scores:
-                member = elem_with_scores.pop(0)
-                score = elem_with_scores.pop(0)
-                union[member].append(float(score) * weight)
-        aggregate_fn = sum  # FIXME: redis also supports MIN and MAX
+    def zrevrank(self, key, member):
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
 
-        result = 0
-        for member, scores in union.items():
-            score = aggregate_fn(scores)
-            result += self.zadd(destination, str(score), member)
+        db_score = self._db.get(codec.encode_zset_value(key_id, member))
+        if db_score is None:
+            return None
+        score = codec.decode_score(db_score)
+
+        rank_index = self._get_zset_rank_index(codec, key_id, zset_length)
+        if rank_index:
+            return zset_length - 1 - rank_index.rank(score, member)
+
+        member_db_key = codec.encode_zset_score(key_id, member, score)
+        rank = 0
+        for db_key in self._get_zset_reverse_iterator(codec, key_id):
+            if db_key <= member_db_key:
+                break
+            rank += 1
+        return rank
+
+    def zunionstore(self, destination, keys, weights, aggregate='sum'):
+        """
+        The source zsets are merged by member (the zset value keys are sorted by member),
+        thus the sources are never loaded in memory.
+        """
+        sources = [self._iterate_zset_members(key, weight) for key, weight in zip(keys, weights)]
+        merged = heapq.merge(*sources)
+        aggregate_fn = ZSET_AGGREGATE_FUNCTIONS[aggregate]
+        elements = (
+            (member, aggregate_fn(score for _, score in member_scores))
+            for member, member_scores in itertools.groupby(merged, key=operator.itemgetter(0))
+        )
+        return self._store_zset(destination, elements)
+
+    def iterate_zset(self, key):
+        """
+        Iterate over the members of a sorted set in the db order (sorted by member) without loading them in memory
+
+        :return: an iterator of (member, score)
+        """
+        return self._iterate_zset_members(key)
+
+    def _iterate_zset_members(self, key, weight=1):
+        """
+        :return: an iterator of (member, weighted score) sorted by member
+        """
+        codec, key_id, zset_length = self._get_zset_key_id_and_length(key)
+        if zset_length == 0:
+            return
+        prefix = codec.get_min_zset_value(key_id)
+        for db_key, db_value in self._db.iterator(prefix=prefix):
+            yield db_key[len(prefix):], weigh_score(codec.decode_score(db_value), weight)
+
+    def zinterstore(self, destination, keys, weights, aggregate='sum'):
+        return self._store_zset(destination, self._iterate_zset_intersection(keys, weights, aggregate))
+
+    def zinter(self, keys, weights, aggregate='sum', with_scores=False):
+        elements = sorted(self._iterate_zset_intersection(keys, weights, aggregate), key=operator.itemgetter(1, 0))
+        result = []
+        for member, score in elements:
+            result.append(member)
+            if with_scores:
+                result.append(score)
         return result
 
+    def _iterate_zset_intersection(self, keys, weights, aggregate):
+        """
+        Iterate over the smallest zset and look up its members in the other zsets,
+        thus the cost depends on the size of the smallest zset only.
+
+        :return: an iterator of (member, aggregated score) sorted by member
+        """
+        zsets = [self._get_zset_key_id_and_length(key) for key in keys]
+        smallest = min(range(len(zsets)), key=lambda i: zsets[i][2])
+        if zsets[smallest][2] == 0:
+            return
+        aggregate_fn = ZSET_AGGREGATE_FUNCTIONS[aggregate]
+        for member, smallest_score in self._iterate_zset_members(keys[smallest], weights[smallest]):
+            scores = []
+            for i, (codec, key_id, _) in enumerate(zsets):
+                if i == smallest:
+                    scores.append(smallest_score)
+                    continue
+                db_score = self._db.get(codec.encode_zset_value(key_id, member))
+                if db_score is None:
+                    break
+                scores.append(weigh_score(codec.decode_score(db_score), weights[i]))
+            else:
+                yield member, aggregate_fn(scores)
+
+    def zdiffstore(self, destination, keys):
+        """
+        Only the first zset is iterated, the other zsets are looked up by member
+        """
+        others = [self._get_zset_key_id_and_length(key) for key in keys[1:]]
+        others = [(codec, key_id) for codec, key_id, length in others if length > 0]
+        elements = (
+            (member, score)
+            for member, score in self._iterate_zset_members(keys[0])
+            if all(self._db.get(codec.encode_zset_value(key_id, member)) is None for codec, key_id in others)
+        )
+        return self._store_zset(destination, elements)
+
+    def _store_zset(self, key, elements):
+        """
+        Replace `key` with a zset of `elements` (member, score) (see `_store_elements()`)
+
+        :return: the number of elements
+        """
+        codec = KEY_CODEC
+        key_id = uuid.uuid4().bytes
+
+        def encode_element((member, score)):
+            return [
+                (codec.encode_zset_value(key_id, member), codec.encode_score(score)),
+                (codec.encode_zset_score(key_id, member, score), bytes('')),
+            ]
+
+        length = self._store_elements(elements, encode_element)
+        if length > 0 and ZSetRankIndex.is_supported(codec):
+            ZSetRankIndex(self._db, codec, key_id).build()
+        self._replace_key(key, codec.encode_zset(key), codec.encode_key_id_and_length(key, key_id, length), length)
+        return length
+
+    def _store_elements(self, elements, encode_element):
+        """
+        Write the db keys of `elements` to a new key ID in batches of `STORE_BATCH_SIZE`.
+        The new key ID is only referenced by `_replace_key()` after all elements are written,
+        thus clients never see a partial collection.
+
+        :return: the number of elements
+        """
+        length = 0
+        batch = self._db.write_batch()
+        for element in elements:
+            for db_key, db_value in encode_element(element):
+                batch.put(db_key, db_value)
+            length += 1
+            if length % STORE_BATCH_SIZE == 0:
+                batch.write()
+                batch = self._db.write_batch()
+        batch.write()
+        return length
+
+    def _replace_key(self, key, db_key, db_value, length):
+        with self._db.write_batch() as batch:
+            if length > 0:
+                key_count_delta = self._overwrite_key(batch, key, db_key, db_value)
+            else:
+                old_codec, old_key_type = self._get_key_type(key)
+                key_count_delta = 0
+                if old_key_type != 'none':
+                    self._delete_db_key(batch, old_codec, key, old_key_type)
+                    key_count_delta = -1
+            self._update_key_count(batch, key_count_delta)
+
+    def _overwrite_key(self, batch, key, db_key, db_value):
+        """
+        Delete `key` and write its new db key `db_key` (of any type) in `batch`
+
+        :return: the change of the number of keys
+        """
+        old_codec, old_key_type = self._get_key_type(key)
+        if old_key_type == 'none':
+            key_count_delta = 1
+        else:
+            self._delete_db_key(batch, old_codec, key, old_key_type)
+            key_count_delta = 0
+            # dredis doesn't check types on writes, thus a key may also be stored with the type of `db_key`
+            if db_key != old_codec.encode_key(key, old_key_type) and self._db.get(db_key) is not None:
+                key_count_delta = -1
+        batch.put(db_key, db_value)
+        return key_count_delta
+
     def type(self, key):
-        if self._db.get(KEY_CODEC.encode_string(key)) is not None:
-            return 'string'
-        if self._db.get(KEY_CODEC.encode_set(key)) is not None:
-            return 'set'
-        if self._db.get(KEY_CODEC.encode_hash(key)) is not None:
-            return 'hash'
-        if self._db.get(KEY_CODEC.encode_zset(key)) is not None:
-            return 'zset'
-        return 'none'
+        _, key_type = self._get_key_type(key)
+        return key_type
 
     def keys(self, pattern):
-        db_keys = set()
-        for key_type in KEY_CODEC.KEY_TYPES:
-            for key in self._db.iterator(prefix=chr(key_type), include_value=False):
-                _, _, key_value = KEY_CODEC.decode_key(key)
-                if pattern is None or fnmatch.fnmatch(key_value, pattern):
-                    db_keys.add(key_value)
-        return db_keys
+        prefix, matches = compile_pattern(pattern)
+        keys = set()
+        for codec, db_key in self._iterate_db_keys(prefix):
+            _, _, key = codec.decode_key(db_key)
+            if matches(key):
+                keys.add(key)
+        return keys
+
+    def iterate_keys(self):
+        """
+        Iterate over all keys of the current db in the db order without loading them in memory
+
+        :return: an iterator of (key, key type)
+        """
+        for codec, db_key in self._iterate_db_keys():
+            type_id, _, key = codec.decode_key(db_key)
+            yield key, codec.KEY_TYPE_NAMES[type_id]
+
+    def scan(self, cursor, match, count, key_type=None):
+        keys = []
+        new_cursor = 0
+        cursor_codec = self._get_cursor_codec()
+        scan_prefix = 'keys'
+        if cursor == 0:
+            db_key_from_cursor = None
+        else:
+            db_key_from_cursor = cursor_codec.decode(scan_prefix, cursor, self._iterate_db_key_positions)
+            if db_key_from_cursor is None:
+                return [bytes(new_cursor), keys]
+
+        prefix, matches = compile_pattern(match)
+        for i, (codec, db_key) in enumerate(self._iterate_db_keys(prefix, key_type, db_key_from_cursor)):
+            # store the next key at the cursor
+            if i == count:
+                new_cursor = cursor_codec.encode(scan_prefix, db_key)
+                break
+            _, _, key = codec.decode_key(db_key)
+            if matches(key):
+                keys.append(key)
+        return [bytes(new_cursor), keys]
+
+    def _iterate_db_keys(self, prefix='', key_type=None, start=None):
+        """
+        Iterate over the db keys of all keys starting with `prefix` in the db order,
+        seeking to the prefix when the key format allows it.
+
+        :return: an iterator of (KeyCodec, db key)
+        """
+        min_db_keys = []
+        for codec in self._key_codecs:
+            for type_name, type_id in codec.KEY_TYPE_IDS.items():
+                if key_type is None or type_name == key_type:
+                    min_db_keys.append((codec.get_min_key(type_id, prefix), codec))
+        for min_db_key, codec in sorted(min_db_keys):
+            db_start = min_db_key if start is None else max(start, min_db_key)
+            for db_key in self._db.iterator(start=db_start, include_value=False):
+                if not db_key.startswith(min_db_key):
+                    break
+                yield codec, db_key
 
     def dbsize(self):
-        return len(self.keys(pattern=None))
+        """
+        The number of keys is stored in the database and updated in the same batches that create or delete keys.
+        It's counted again when the server starts if it's unknown or suspect (see `check_key_count()`),
+        thus `DBSIZE` never iterates over the keys.
+        Keys stored with more than one type (dredis doesn't check types on writes) are counted once per type.
+        """
+        key_count = get_key_count(self._db)
+        if key_count is None:
+            # the count went below zero after the server started
+            return 0
+        return key_count
+
+    def check_key_count(self):
+        """
+        Count the keys of the current database again if the stored number is unknown (databases created by older
+        versions of dredis) or suspect. It iterates over all keys, thus it's called when the server starts.
+
+        :return: whether the keys were counted again
+        """
+        key_count = get_key_count(self._db)
+        if key_count is None or (key_count == 0) == self._has_keys():
+            self.rebuild_key_count()
+            return True
+        return False
+
+    def rebuild_key_count(self):
+        """
+        Count the keys of the current database without loading them in memory and store the result
+
+        :return: the number of keys
+        """
+        key_count = sum(1 for _ in self._iterate_db_keys())
+        set_key_count(self._db, key_count)
+        return key_count
+
+    def _has_keys(self):
+        for _ in self._iterate_db_keys():
+            return True
+        return False
+
+    def _update_key_count(self, batch, delta):
+        """
+        Update the number of keys in the batch that creates or deletes keys.
+        Unknown counts are left for `check_key_count()`, negative counts are stored to be detected by `get_key_count()`.
+        """
+        if delta:
+            key_count = get_key_count(self._db)
+            if key_count is not None:
+                set_key_count(batch, key_count + delta)
 
     def exists(self, *keys):
         result = 0
@@ -425,33 +1217,46 @@ class Keyspace(object):
         return result
 
     def hset(self, key, field, value):
-        result = 0
-        key_id, hash_length = self._get_hash_key_id_and_length(key)
-        if self._db.get(KEY_CODEC.encode_hash_field(key_id, field)) is None:
-            result = 1
+        return self.hset_many(key, [(field, value)])
+
+    def hset_many(self, key, pairs):
+        """
+        Set the `pairs` (field, value) of a hash with a single write batch
+
+        :return: the number of new fields
+        """
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
+        db_keys = [codec.encode_hash_field(key_id, field) for field, _ in pairs]
+        new_db_keys = set(db_key for db_key, db_value in zip(db_keys, self._get_db_values(db_keys)) if db_value is None)
         with self._db.write_batch() as batch:
-            batch.put(KEY_CODEC.encode_hash(key), KEY_CODEC.encode_key_id_and_length(key, key_id, hash_length + result))
-            batch.put(KEY_CODEC.encode_hash_field(key_id, field), value)
-        return result
+            if new_db_keys:
+                batch.put(codec.encode_hash(key),
+                          codec.encode_key_id_and_length(key, key_id, hash_length + len(new_db_keys)))
+                if hash_length == 0:
+                    self._update_key_count(batch, 1)
+            for db_key, (_, value) in zip(db_keys, pairs):
+                batch.put(db_key, value)
+        return len(new_db_keys)
 
     def _get_hash_key_id_and_length(self, key):
-        db_value = self._db.get(KEY_CODEC.encode_hash(key))
-        return KEY_CODEC.decode_key_id_and_length(key, db_value)
+        return self._get_key_id_and_length(key, 'hash')
 
     def hsetnx(self, key, field, value):
-        key_id, hash_length = self._get_hash_key_id_and_length(key)
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
         # only set if not set before
-        if self._db.get(KEY_CODEC.encode_hash_field(key_id, field)) is None:
+        if self._db.get(codec.encode_hash_field(key_id, field)) is None:
             with self._db.write_batch() as batch:
-                batch.put(KEY_CODEC.encode_hash(key), KEY_CODEC.encode_key_id_and_length(key, key_id, hash_length + 1))
-                batch.put(KEY_CODEC.encode_hash_field(key_id, field), value)
+                batch.put(codec.encode_hash(key), codec.encode_key_id_and_length(key, key_id, hash_length + 1))
+                batch.put(codec.encode_hash_field(key_id, field), value)
+                if hash_length == 0:
+                    self._update_key_count(batch, 1)
             return 1
         else:
             return 0
 
     def hdel(self, key, *fields):
         result = 0
-        key_id, hash_length = self._get_hash_key_id_and_length(key)
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
 
         # safe guard
         if hash_length == 0:
@@ -459,29 +1264,38 @@ class Keyspace(object):
 
         batch = self._db.write_batch()
         for field in fields:
-            if self._db.get(KEY_CODEC.encode_hash_field(key_id, field)) is not None:
+            if self._db.get(codec.encode_hash_field(key_id, field)) is not None:
                 result += 1
                 hash_length -= 1
-                batch.delete(KEY_CODEC.encode_hash_field(key_id, field))
+                batch.delete(codec.encode_hash_field(key_id, field))
 
         if hash_length == 0:
             # remove empty hashes from keyspace
             self.delete(key)
         else:
-            batch.put(KEY_CODEC.encode_hash(key), KEY_CODEC.encode_key_id_and_length(key, key_id, hash_length))
+            batch.put(codec.encode_hash(key), codec.encode_key_id_and_length(key, key_id, hash_length))
             batch.write()
         return result
 
     def hget(self, key, field):
-        key_id, _ = self._get_hash_key_id_and_length(key)
-        return self._db.get(KEY_CODEC.encode_hash_field(key_id, field))
+        codec, key_id, _ = self._get_hash_key_id_and_length(key)
+        return self._db.get(codec.encode_hash_field(key_id, field))
+
+    def hmget(self, key, fields):
+        codec, key_id, length = self._get_hash_key_id_and_length(key)
+        if length == 0:
+            return [None] * len(fields)
+        return self._get_db_values([codec.encode_hash_field(key_id, field) for field in fields])
+
+    def hexists(self, key, field):
+        return self.hget(key, field) is not None
 
     def hkeys(self, key):
         result = []
-        key_id, hash_length = self._get_hash_key_id_and_length(key)
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
         if hash_length > 0:
-            for db_key, _ in self._get_db_iterator(KEY_CODEC.get_min_hash_field(key_id)):
-                _, length, field_key = KEY_CODEC.decode_key(db_key)
+            for db_key, _ in self._get_db_iterator(codec.get_min_hash_field(key_id)):
+                _, length, field_key = codec.decode_key(db_key)
                 field = field_key[length:]
                 result.append(field)
 
@@ -489,14 +1303,14 @@ class Keyspace(object):
 
     def hvals(self, key):
         result = []
-        key_id, hash_length = self._get_hash_key_id_and_length(key)
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
         if hash_length > 0:
-            for _, db_value in self._get_db_iterator(KEY_CODEC.get_min_hash_field(key_id)):
+            for _, db_value in self._get_db_iterator(codec.get_min_hash_field(key_id)):
                 result.append(db_value)
         return result
 
     def hlen(self, key):
-        key_id, hash_length = self._get_hash_key_id_and_length(key)
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
         return hash_length
 
     def hincrby(self, key, field, increment):
@@ -507,52 +1321,82 @@ class Keyspace(object):
 
     def hgetall(self, key):
         result = []
-        key_id, hash_length = self._get_hash_key_id_and_length(key)
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
         if hash_length > 0:
-            for db_key, db_value in self._get_db_iterator(KEY_CODEC.get_min_hash_field(key_id)):
-                _, length, field_key = KEY_CODEC.decode_key(db_key)
+            for db_key, db_value in self._get_db_iterator(codec.get_min_hash_field(key_id)):
+                _, length, field_key = codec.decode_key(db_key)
                 field = field_key[length:]
                 result.append(field)
                 result.append(db_value)
         return result
 
+    def iterate_hash(self, key):
+        """
+        Iterate over the fields of a hash in the db order without loading them in memory
+
+        :return: an iterator of (field, value)
+        """
+        codec, key_id, hash_length = self._get_hash_key_id_and_length(key)
+        if hash_length == 0:
+            return
+        prefix = codec.get_min_hash_field(key_id)
+        for db_key, db_value in self._db.iterator(prefix=prefix):
+            yield db_key[len(prefix):], db_value
+
     def hscan(self, key, cursor, match, count):
-        def get_key_value_pair(db_key, db_value):
-            _, length, field_key = KEY_CODEC.decode_key(db_key)
-            field = field_key[length:]
+        codec, key_id, _ = self._get_hash_key_id_and_length(key)
+
+        def get_key_value_pair(field, db_value):
             return field, db_value
 
-        key_id, _ = self._get_hash_key_id_and_length(key)
-        get_min_field = KEY_CODEC.get_min_hash_field
-        cursors = HASH_CURSORS
+        return self._scan(codec.get_min_hash_field(key_id), cursor, match, count, get_key_value_pair)
 
-        return self._scan(key_id, cursor, match, count, get_min_field, get_key_value_pair, cursors)
+    def _scan(self, min_db_key, cursor, match, count, get_key_value_pair=None):
+        """
+        Scan the elements of a collection, all db keys of the elements start with `min_db_key`.
+        The cursor stores the element where the next call resumes.
 
-    def _scan(self, key, cursor, match, count, get_min_field, get_key_value_pair, cursors):
+        :param get_key_value_pair: function to get the reply of an element from (field, db value).
+        only the fields are returned if it's not provided (e.g. set members)
+        """
         elements = []
         new_cursor = 0
-        min_db_key = get_min_field(key)
+        cursor_codec = self._get_cursor_codec()
+        prefix, matches = compile_pattern(match)
 
         if cursor == 0:
-            db_key_from_cursor = min_db_key
+            field_from_cursor = prefix
         else:
-            try:
-                db_key_from_cursor = cursors.get(self._current_db, key, cursor)
-            except KeyError:
-                return [new_cursor, elements]
-
-        for i, (db_key, db_value) in enumerate(self._get_db_iterator(start=db_key_from_cursor)):
-            if not db_key.startswith(min_db_key):
+            field_from_cursor = cursor_codec.decode(
+                min_db_key, cursor, lambda field_prefix: self._iterate_db_key_positions(min_db_key + field_prefix, min_db_key))
+            if field_from_cursor is None:
+                return [bytes(new_cursor), elements]
+
+        scan_db_key = min_db_key + prefix
+        for i, (db_key, db_value) in enumerate(self._get_db_iterator(start=min_db_key + field_from_cursor)):
+            if not db_key.startswith(scan_db_key):
                 break
+            field = db_key[len(min_db_key):]
             # store the next element at the cursor
             if i == count:
-                new_cursor = cursors.add(self._current_db, key, db_key)
+                new_cursor = cursor_codec.encode(min_db_key, field)
                 break
-            field, value = get_key_value_pair(db_key, db_value)
-            if match is None or fnmatch.fnmatch(field, match):
-                elements.append(field)
-                elements.append(value)
-        return [new_cursor, elements]
+            if matches(field):
+                if get_key_value_pair is None:
+                    elements.append(field)
+                else:
+                    elements.extend(get_key_value_pair(field, db_value))
+        return [bytes(new_cursor), elements]
+
+    def _get_cursor_codec(self):
+        return ScanCursorCodec(get_scan_cursor_secret(self._db))
+
+    def _iterate_db_key_positions(self, prefix, min_db_key=''):
+        """
+        :return: an iterator of the suffixes after `min_db_key` of the db keys starting with `prefix`
+        """
+        for db_key in self._db.iterator(prefix=prefix, include_value=False):
+            yield db_key[len(min_db_key):]
 
     @property
     def _db(self):
@@ -561,6 +1405,9 @@ class Keyspace(object):
     def dump(self, key):
         return rdb.generate_payload(self, key)
 
+    def migrate(self, host, port, keys, destination_db, timeout, copy, replace):
+        return migrate.migrate(self, host, port, keys, destination_db, timeout, copy, replace)
+
     def restore(self, key, ttl, payload, replace):
         # TODO: there's no TTL support at the moment
         object_type = self.type(key)
@@ -570,37 +1417,22 @@ class Keyspace(object):
             else:
                 raise BusyKeyError()
         rdb.verify_payload(payload)
-        rdb.load_object(self, key, BytesIO(payload))
+        rdb.load_object(self, key, rdb.BufferReader(payload))
 
     def rename(self, old_name, new_name):
-        if self.exists(old_name):
-            if old_name == new_name:
-                return
-            # replace the key that holds the key ID and don't touch the rest
-            key_type = self.type(old_name)
-            if key_type == 'zset':
-                old_db_key = KEY_CODEC.encode_zset(old_name)
-                new_db_key = KEY_CODEC.encode_zset(new_name)
-            elif key_type == 'hash':
-                old_db_key = KEY_CODEC.encode_hash(old_name)
-                new_db_key = KEY_CODEC.encode_hash(new_name)
-            elif key_type == 'set':
-                old_db_key = KEY_CODEC.encode_set(old_name)
-                new_db_key = KEY_CODEC.encode_set(new_name)
-            elif key_type == 'string':
-                old_db_key = KEY_CODEC.encode_string(old_name)
-                new_db_key = KEY_CODEC.encode_string(new_name)
-            else:
-                raise DredisError("invalid key type")
-            self._replace_db_key(new_db_key, old_db_key)
-        else:
+        codec, key_type = self._get_key_type(old_name)
+        if key_type == 'none':
             raise NoKeyError()
-
-    def _replace_db_key(self, new_db_key, old_db_key):
-        db_value = self._db.get(old_db_key)
+        if old_name == new_name:
+            return
+        # replace the key that holds the key ID and don't touch the rest.
+        # the new key keeps the format of the old key because the key format of the elements doesn't change
+        old_db_key = codec.encode_key(old_name, key_type)
+        new_db_key = codec.encode_key(new_name, key_type)
         with self._db.write_batch() as batch:
+            key_count_delta = self._overwrite_key(batch, new_name, new_db_key, self._db.get(old_db_key))
             batch.delete(old_db_key)
-            batch.put(new_db_key, db_value)
+            self._update_key_count(batch, key_count_delta - 1)
 
     def auth(self, password):
         if config.get('requirepass') == config.EMPTY:
@@ -612,27 +1444,179 @@ class Keyspace(object):
             self.authenticated = True
 
 
+class KeyspaceSnapshot(Keyspace):
+    """
+    A read-only view of all dbs at the time it's created, it can be read from another thread (e.g., `BGSAVE`).
+
+    Dbs close their snapshots when they're replaced (e.g., `FLUSHALL`), thus reads from other threads
+    must hold `lock()`, which fails after the current db was replaced.
+    """
+
+    def __init__(self):
+        self._current_db = DEFAULT_REDIS_DB
+        self.authenticated = False
+        self._snapshots = {}
+        for db_id in map(str, range(NUMBER_OF_REDIS_DATABASES)):
+            self._snapshots[db_id] = {
+                'db': DB_MANAGER.get_db(db_id).snapshot(),
+                'key_codecs': DB_MANAGER.get_key_codecs(db_id),
+                'generation': DB_MANAGER.get_generation(db_id),
+            }
+
+    @property
+    def _db(self):
+        return self._snapshots[self._current_db]['db']
+
+    @property
+    def _key_codecs(self):
+        return self._snapshots[self._current_db]['key_codecs']
+
+    def _is_replaced(self, db_id):
+        return DB_MANAGER.get_generation(db_id) != self._snapshots[db_id]['generation']
+
+    @contextlib.contextmanager
+    def lock(self):
+        with DB_MANAGER.thread_lock:
+            if self._is_replaced(self._current_db):
+                raise DredisError('db {} was replaced while it was read from a snapshot'.format(self._current_db))
+            yield
+
+    def close(self):
+        with DB_MANAGER.thread_lock:
+            for db_id, snapshot in self._snapshots.items():
+                if not self._is_replaced(db_id):
+                    snapshot['db'].close()
+
+
+def new_key_id():
+    # same as `uuid.uuid4().bytes` (random IDs) without the cost of creating UUID objects
+    return os.urandom(16)
+
+
+class KeyspaceBulkLoader(Keyspace):
+    """
+    Write keys in large batches of `BULK_LOAD_BATCH_SIZE` db keys (e.g., loading RDB files).
+
+    New keys are encoded without reading the db if the selected db was empty, otherwise the existing keys are
+    deleted in the batch that writes the new ones. Keys repeated in a batch replace the previous ones.
+    The elements of collections are written before (or with) their keys, thus partial collections aren't visible.
+    `flush()` writes the last batch (called when it's used as a context manager).
+    """
+
+    def __init__(self):
+        super(KeyspaceBulkLoader, self).__init__()
+        self._is_empty_db = not self._has_keys()
+        self._start_batch()
+
+    def _start_batch(self):
+        self._batch = self._db.write_batch()
+        self._batch_size = 0
+        self._batch_keys = set()
+        self._new_keys = 0
+
+    def select(self, db):
+        self.flush()
+        super(KeyspaceBulkLoader, self).select(db)
+        self._is_empty_db = not self._has_keys()
+        self._start_batch()
+
+    def flush(self):
+        self._update_key_count(self._batch, self._new_keys)
+        self._batch.write()
+        self._start_batch()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+
+    def set(self, key, value):
+        self._add_key(key, KEY_CODEC.encode_string(key), value, [])
+
+    def sadd(self, key, *members):
+        codec = KEY_CODEC
+        key_id = new_key_id()
+        prefix = codec.get_min_set_member(key_id)
+        db_keys = set(prefix + bytes(member) for member in members)
+        self._add_key(key, codec.encode_set(key), codec.encode_key_id_and_length(key, key_id, len(db_keys)),
+                      [(db_key, bytes('')) for db_key in db_keys])
+
+    def hset_many(self, key, pairs):
+        codec = KEY_CODEC
+        key_id = new_key_id()
+        prefix = codec.get_min_hash_field(key_id)
+        fields = dict(pairs)
+        self._add_key(key, codec.encode_hash(key), codec.encode_key_id_and_length(key, key_id, len(fields)),
+                      [(prefix + bytes(field), value) for field, value in fields.iteritems()])
+
+    def zadd_many(self, key, elements):
+        codec = KEY_CODEC
+        key_id = new_key_id()
+        value_prefix = codec.get_min_zset_value(key_id)
+        score_prefix = codec.get_min_zset_score(key_id)
+        scores = dict((bytes(member), float(score)) for score, member in elements)
+        db_items = []
+        score_keys = []
+        for member, score in scores.iteritems():
+            db_items.append((value_prefix + member, codec.encode_score(score)))
+            score_keys.append(score_prefix + FLOAT_CODEC.encode(score) + member)
+        score_keys.sort()
+        db_items.extend((score_key, bytes('')) for score_key in score_keys)
+        if ZSetRankIndex.is_supported(codec):
+            ZSetRankIndex(self._db, codec, key_id).write(self._batch, score_keys)
+        self._add_key(key, codec.encode_zset(key), codec.encode_key_id_and_length(key, key_id, len(scores)), db_items)
+
+    def _add_key(self, key, db_key, db_value, element_db_items):
+        is_repeated = key in self._batch_keys
+        if is_repeated:
+            # the batch isn't visible to the reads, thus the previous key is written before it's deleted
+            self.flush()
+        if is_repeated or not self._is_empty_db:
+            self._delete_in_batch(key)
+        for element_db_key, element_db_value in element_db_items:
+            self._batch.put(element_db_key, element_db_value)
+        self._batch.put(db_key, db_value)
+        self._batch_keys.add(key)
+        self._new_keys += 1
+        self._batch_size += len(element_db_items) + 1
+        if self._batch_size >= BULK_LOAD_BATCH_SIZE:
+            self.flush()
+
+    def _delete_in_batch(self, key):
+        codec, key_type = self._get_key_type(key)
+        if key_type != 'none':
+            self._delete_db_key(self._batch, codec, key, key_type)
+            self._new_keys -= 1
+
+
 class ScoreRange(object):
+    """
+    Range of scores as used by ZRANGEBYSCORE and ZCOUNT (e.g. `(1 5` means `1 < score <= 5`)
+    """
 
     def __init__(self, min_value, max_value):
-        self._min_value = min_value
-        self._max_value = max_value
+        self.min_score, self.min_exclusive = self._parse(min_value)
+        self.max_score, self.max_exclusive = self._parse(max_value)
 
-    def check(self, value):
-        if self._min_value.startswith('('):
-            if to_float(self._min_value[1:]) >= value:
-                return False
-        elif to_float(self._min_value) > value:
-            return False
+    def _parse(self, value):
+        if value.startswith('('):
+            return to_float(value[1:]), True
+        else:
+            return to_float(value), False
 
-        if self._max_value.startswith('('):
-            if to_float(self._max_value[1:]) <= value:
-                return False
-        elif to_float(self._max_value) < value:
-            return False
+    def check(self, value):
+        return not self.below_min(value) and not self.above_max(value)
 
-        return True
+    def below_min(self, value):
+        if self.min_exclusive:
+            return value <= self.min_score
+        else:
+            return value < self.min_score
 
     def above_max(self, value):
-        max_value = self._max_value[1:] if self._max_value.startswith('(') else self._max_value
-        return value > to_float(max_value)
+        if self.max_exclusive:
+            return value >= self.max_score
+        else:
+            return value > self.max_score
@@ -0,0 +1,245 @@
+"""
+`MIGRATE` sends `RESTORE` commands to another instance (dredis or Redis).
+
+This module is based on `migrateCommand()` from https://github.com/antirez/redis/blob/3.2.6/src/cluster.c
+"""
+import itertools
+import logging
+import socket
+import tempfile
+import time
+
+from dredis import rdb
+from dredis.exceptions import DredisError, MigrateIOError
+
+logger = logging.getLogger(__name__)
+
+# same as redis, idle connections to target instances are closed after 10 seconds
+MIGRATE_SOCKET_CACHE_TTL = 10  # seconds
+MIGRATE_SOCKET_CACHE_ITEMS = 64
+# the `RESTORE` commands are sent in batches of this size, the replies of a batch are read before the next one
+MIGRATE_PIPELINE_SIZE = 1024 * 1024
+# larger payloads are written to a temporary file before they're sent (their size is sent first)
+MIGRATE_MAX_MEMORY_PAYLOAD_SIZE = 1024 * 1024
+
+
+class MigrateConnection(object):
+
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.db = None  # the db selected by the last `SELECT`
+        self.last_use_time = time.time()
+        self._reader = self.sock.makefile('rb')
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def read_reply(self):
+        """
+        :return: the status or error reply of a command (`SELECT` and `RESTORE` don't reply anything else)
+        """
+        line = self._reader.readline()
+        if not line.endswith('\r\n'):
+            raise socket.error('connection closed by the target instance')
+        return line[:-2]
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+
+class MigrateConnectionPool(object):
+    """
+    Keep the connections to the target instances open between `MIGRATE` commands
+    """
+
+    def __init__(self):
+        self._connections = {}
+
+    def get(self, host, port, timeout):
+        """
+        :return: (connection, True if it's a cached connection)
+        """
+        self.close_idle_connections()
+        connection = self._connections.get((host, port))
+        if connection is not None:
+            connection.sock.settimeout(timeout)
+            connection.last_use_time = time.time()
+            return connection, True
+        if len(self._connections) >= MIGRATE_SOCKET_CACHE_ITEMS:
+            oldest_address = min(self._connections, key=lambda address: self._connections[address].last_use_time)
+            self.close(*oldest_address)
+        try:
+            connection = MigrateConnection(host, port, timeout)
+        except socket.error:
+            raise MigrateIOError('error or timeout connecting to the client')
+        self._connections[(host, port)] = connection
+        return connection, False
+
+    def close(self, host, port):
+        connection = self._connections.pop((host, port), None)
+        if connection is not None:
+            connection.close()
+
+    def close_idle_connections(self):
+        min_use_time = time.time() - MIGRATE_SOCKET_CACHE_TTL
+        for address, connection in self._connections.items():
+            if connection.last_use_time < min_use_time:
+                self.close(*address)
+
+
+MIGRATE_CONNECTION_POOL = MigrateConnectionPool()
+
+
+def migrate(keyspace, host, port, keys, destination_db, timeout, copy, replace):
+    """
+    Restore `keys` in the db `destination_db` of the instance at `host`:`port` and delete them from `keyspace`
+    unless `copy` is true (`MIGRATE`).
+    Small keys are pipelined and large ones are sent one chunk at a time.
+
+    :param timeout: the maximum idle time of the connection in milliseconds
+    :return: the number of existing keys in `keys`
+    """
+    keys_and_types = [(key, keyspace.type(key)) for key in keys]
+    keys_and_types = [(key, key_type) for key, key_type in keys_and_types if key_type != 'none']
+    if not keys_and_types:
+        return 0
+    # same as redis, a cached connection is retried once because the target instance may have closed it
+    may_retry = True
+    while True:
+        connection, is_cached = MIGRATE_CONNECTION_POOL.get(host, port, timeout / 1000.0)
+        try:
+            replies = _restore_keys(connection, keyspace, keys_and_types, destination_db, replace)
+        except socket.error as exc:
+            MIGRATE_CONNECTION_POOL.close(host, port)
+            if is_cached and may_retry and not isinstance(exc, socket.timeout):
+                may_retry = False
+                continue
+            logger.warning("MIGRATE to %s:%s failed: %s" % (host, port, exc))
+            raise MigrateIOError('error or timeout reading to target instance')
+        break
+
+    migrated_keys = []
+    error = None
+    for key, reply in replies:
+        if reply.startswith('-'):
+            error = error or reply[1:]
+            if key is None:
+                # `SELECT` failed, thus the keys weren't restored in `destination_db`
+                migrated_keys = []
+                break
+        elif key is not None:
+            migrated_keys.append(key)
+    if not copy and migrated_keys:
+        keyspace.delete(*migrated_keys)
+    if error is not None:
+        raise DredisError('Target instance replied with error: {}'.format(error))
+    return len(keys_and_types)
+
+
+def _restore_keys(connection, keyspace, keys_and_types, destination_db, replace):
+    """
+    :return: a list of (key, reply) of the commands sent, the key is None for `SELECT`
+    """
+    pipeline = Pipeline(connection)
+    if connection.db != destination_db:
+        pipeline.add_command(None, 2, [encode_bulk_string('SELECT'), encode_bulk_string(bytes(destination_db))])
+    for key, key_type in keys_and_types:
+        payload_size, payload_chunks = _spool_payload(keyspace, key, key_type)
+        command = itertools.chain(
+            [encode_bulk_string('RESTORE'), encode_bulk_string(key), encode_bulk_string('0'), '${}\r\n'.format(payload_size)],
+            payload_chunks,
+            ['\r\n', encode_bulk_string('REPLACE')] if replace else ['\r\n'],
+        )
+        pipeline.add_command(key, 5 if replace else 4, command)
+    pipeline.execute()
+    for key, reply in pipeline.replies:
+        if key is None and not reply.startswith('-'):
+            connection.db = destination_db
+    return pipeline.replies
+
+
+def _spool_payload(keyspace, key, key_type):
+    """
+    Generate the `DUMP` payload of `key`, large payloads are written to a temporary file
+
+    :return: (payload size, iterable of payload chunks)
+    """
+    chunks = []
+    payload_size = 0
+    payload_file = None
+    for chunk in rdb.iterate_payload(keyspace, key, key_type):
+        payload_size += len(chunk)
+        if payload_file is not None:
+            payload_file.write(chunk)
+        elif payload_size > MIGRATE_MAX_MEMORY_PAYLOAD_SIZE:
+            payload_file = tempfile.TemporaryFile()
+            payload_file.writelines(chunks)
+            payload_file.write(chunk)
+            chunks = None
+        else:
+            chunks.append(chunk)
+    if payload_file is None:
+        return payload_size, chunks
+    payload_file.seek(0)
+    return payload_size, iterate_file_chunks(payload_file)
+
+
+def iterate_file_chunks(f):
+    with f:
+        while True:
+            chunk = f.read(rdb.DUMP_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class Pipeline(object):
+    """
+    Send commands in batches of about `MIGRATE_PIPELINE_SIZE` bytes and read the replies of a batch before the next one.
+    Commands larger than a batch are sent one chunk at a time.
+    """
+
+    def __init__(self, connection):
+        self.replies = []  # (key, reply)
+        self._connection = connection
+        self._buffer = []
+        self._buffer_size = 0
+        self._unread_size = 0
+        self._pending_keys = []
+
+    def add_command(self, key, number_of_args, encoded_args):
+        """
+        :param encoded_args: an iterable of strings with the RESP-encoded arguments
+        """
+        self._write('*{}\r\n'.format(number_of_args))
+        for data in encoded_args:
+            self._write(data)
+        self._pending_keys.append(key)
+        if self._unread_size >= MIGRATE_PIPELINE_SIZE:
+            self.execute()
+
+    def execute(self):
+        self._flush()
+        for key in self._pending_keys:
+            self.replies.append((key, self._connection.read_reply()))
+        self._pending_keys = []
+        self._unread_size = 0
+
+    def _write(self, data):
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+        self._unread_size += len(data)
+        if self._buffer_size >= MIGRATE_PIPELINE_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._connection.send(b''.join(self._buffer))
+        self._buffer = []
+        self._buffer_size = 0
+
+
+def encode_bulk_string(string):
+    return '${}\r\n{}\r\n'.format(len(string), string)
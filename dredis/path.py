@@ -1,19 +1,46 @@
 import errno
+import glob
 import os.path
 import shutil
+import threading
+import uuid
 
 import six
 import sys
 
 
+DELETED_PATH_SUFFIX = '.deleted-'
+
+
 class Path(str):
 
     def join(self, path):
         return Path(os.path.join(self, path))
 
-    def reset(self):
-        shutil.rmtree(self, ignore_errors=True)
-        os.makedirs(self)
+    def reset(self, asynchronous=False):
+        """
+        :param asynchronous: rename the directory and delete it in a background thread
+        """
+        if asynchronous and os.path.exists(self):
+            deleted_path = Path('{}{}{}'.format(self, DELETED_PATH_SUFFIX, uuid.uuid4().hex))
+            os.rename(self, deleted_path)
+            deleted_path.delete_in_background()
+        else:
+            shutil.rmtree(self, ignore_errors=True)
+        self.makedirs(ignore_if_exists=True)
+
+    def delete_in_background(self):
+        thread = threading.Thread(target=shutil.rmtree, args=(self,), kwargs={'ignore_errors': True},
+                                  name="Delete {}".format(self))
+        thread.daemon = True
+        thread.start()
+
+    def delete_leftovers(self):
+        """
+        Delete the directories renamed by `reset(asynchronous=True)` that weren't deleted before the server stopped
+        """
+        for path in glob.glob(self.join('*' + DELETED_PATH_SUFFIX + '*')):
+            Path(path).delete_in_background()
 
     def makedirs(self, ignore_if_exists=False):
         try:
@@ -0,0 +1,111 @@
+import datetime
+import logging
+import threading
+import time
+
+from dredis import rdb
+from dredis.exceptions import DredisError
+
+logger = logging.getLogger(__name__)
+
+RDB_FILENAME_FORMAT = 'dump_%Y-%m-%dT%H:%M:%S.rdb'
+
+
+class PersistenceStats(object):
+
+    def __init__(self):
+        # same as redis, the server start counts as a save
+        self.last_save_time = int(time.time())
+        self.bgsave_start_time = None  # None when no `BGSAVE` is in progress
+        self.last_bgsave_status = 'ok'
+        self.last_bgsave_duration = -1
+        self._lock = threading.Lock()
+
+    def start_bgsave(self):
+        with self._lock:
+            if self.bgsave_start_time is not None:
+                raise DredisError('Background save already in progress')
+            self.bgsave_start_time = time.time()
+
+    def finish_bgsave(self, status):
+        with self._lock:
+            self.last_bgsave_status = status
+            self.last_bgsave_duration = int(time.time() - self.bgsave_start_time)
+            self.bgsave_start_time = None
+
+
+PERSISTENCE_STATS = PersistenceStats()
+
+
+def get_rdb_filename():
+    return datetime.datetime.utcnow().strftime(RDB_FILENAME_FORMAT)
+
+
+def is_saving():
+    return PERSISTENCE_STATS.bgsave_start_time is not None
+
+
+def save(keyspace):
+    """
+    Dump all databases to a new RDB file (`SAVE`)
+    """
+    if is_saving():
+        raise DredisError('Background save already in progress')
+    rdb.dump_rdb(keyspace, get_rdb_filename())
+    PERSISTENCE_STATS.last_save_time = int(time.time())
+
+
+def bgsave(create_snapshot):
+    """
+    Dump all databases to a new RDB file in a background thread (`BGSAVE`)
+
+    :param create_snapshot: a function returning a `keyspace.KeyspaceSnapshot`,
+                            called only if there isn't a `BGSAVE` in progress
+    """
+    PERSISTENCE_STATS.start_bgsave()
+    try:
+        snapshot = create_snapshot()
+    except Exception:
+        PERSISTENCE_STATS.finish_bgsave('err')
+        raise
+    background_save = BackgroundSave(snapshot, get_rdb_filename())
+    background_save.start()
+    return background_save
+
+
+def get_info():
+    bgsave_start_time = PERSISTENCE_STATS.bgsave_start_time
+    return [
+        ('rdb_bgsave_in_progress', int(bgsave_start_time is not None)),
+        ('rdb_last_save_time', PERSISTENCE_STATS.last_save_time),
+        ('rdb_last_bgsave_status', PERSISTENCE_STATS.last_bgsave_status),
+        ('rdb_last_bgsave_time_sec', PERSISTENCE_STATS.last_bgsave_duration),
+        ('rdb_current_bgsave_time_sec', -1 if bgsave_start_time is None else int(time.time() - bgsave_start_time)),
+    ]
+
+
+class BackgroundSave(threading.Thread):
+    """
+    Dump a `KeyspaceSnapshot` while the server keeps running commands.
+    The RDB file is written one key at a time, thus the dump isn't kept in memory.
+    """
+
+    def __init__(self, snapshot, filename):
+        super(BackgroundSave, self).__init__(name='bgsave')
+        self.daemon = True
+        self._snapshot = snapshot
+        self._filename = filename
+
+    def run(self):
+        try:
+            rdb.dump_rdb(self._snapshot, self._filename, lock=self._snapshot.lock)
+        except Exception:
+            logger.exception("Background saving error")
+            status = 'err'
+        else:
+            logger.info("Background saving terminated with success (%s)" % self._filename)
+            PERSISTENCE_STATS.last_save_time = int(time.time())
+            status = 'ok'
+        finally:
+            self._snapshot.close()
+        PERSISTENCE_STATS.finish_bgsave(status)
@@ -0,0 +1,361 @@
+import struct
+
+# every zset element is identified by the suffix of its score key (<score><member>),
+# thus the blocks are delimited by score key suffixes.
+# the highest encoded score is +inf ('\xff\xf0\x00...'), thus MAX_FENCE is greater than all suffixes
+MAX_FENCE = '\xff' * 9
+MAX_BLOCK_SIZE = 256
+MIN_BLOCK_SIZE = MAX_BLOCK_SIZE // 4
+BUILD_BLOCK_SIZE = MAX_BLOCK_SIZE // 2
+
+# number of elements | number of children (elements for level 0 blocks) | lower fence
+BLOCK_VALUE_STRUCT = struct.Struct('>QQ')
+
+
+class Block(object):
+
+    __slots__ = ('level', 'fence', 'count', 'size', 'lower')
+
+    def __init__(self, level, fence, count, size, lower):
+        self.level = level
+        self.fence = fence
+        self.count = count
+        self.size = size
+        self.lower = lower
+
+
+class ZSetRankIndex(object):
+    """
+    Order-statistics index of a sorted set, used to calculate ranks and to find elements by index (ZRANK, ZRANGE)
+    without iterating over all previous elements.
+
+    The index is a counted B-tree stored along with the zset elements:
+    every block covers the score keys between its lower fence (exclusive) and its fence (inclusive)
+    and stores how many elements exist in that range.
+    Level 0 blocks count the elements directly and blocks of level N count the elements of their
+    children in level N - 1. The last block of every level has `MAX_FENCE` as fence and the top level has
+    a single block.
+
+    Block keys are <zset rank prefix><level><fence> so every block can be found with a single seek
+    (the first block of a level with a fence greater or equal to the score key suffix).
+
+    Example (MAX_BLOCK_SIZE == 4):
+        level 1: ('', MAX] = 6
+        level 0: ('', 1-b] = 2  (1-b, MAX] = 4
+        scores:  0-a 1-b | 2-c 3-d 4-e 5-f
+
+    Writes (`add()` and `remove()`) only change the element counts and are stored in the same batch as the elements.
+    Blocks are split or merged in separate batches by `rebalance()` after the elements are written,
+    thus the counts are always consistent with the elements.
+    """
+
+    def __init__(self, db, codec, key_id):
+        self._db = db
+        self._codec = codec
+        self._key_id = key_id
+        self._score_prefix = codec.get_min_zset_score(key_id)
+        self._rank_prefix = codec.get_min_zset_rank(key_id)
+        self._top_level = None
+        self._changed_blocks = {}
+        self._touched_blocks = {}
+
+    @classmethod
+    def is_supported(cls, codec):
+        return codec.ZSET_RANK_TYPE is not None
+
+    def exists(self):
+        for _ in self._db.iterator(prefix=self._rank_prefix, include_value=False):
+            return True
+        return False
+
+    def create(self):
+        """
+        Create the index of a new zset. The index is stored by `flush()`.
+        """
+        self._set_block(Block(0, MAX_FENCE, 0, 0, ''))
+        self._top_level = 0
+
+    def build(self):
+        """
+        Create the index of an existing zset (e.g. a zset created by an older version of dredis)
+        """
+        with self._db.write_batch() as batch:
+            self.write(batch, self._db.iterator(prefix=self._score_prefix, include_value=False))
+
+    def write(self, batch, score_keys):
+        """
+        Write the index of a zset in `batch`, without reading the db (e.g. zsets loaded from RDB files)
+
+        :param score_keys: the sorted score db keys of all elements of the zset
+        """
+        blocks = []
+        count = 0
+        for db_key in score_keys:
+            count += 1
+            if count == BUILD_BLOCK_SIZE:
+                blocks.append((db_key[len(self._score_prefix):], count, count))
+                count = 0
+        blocks.append((MAX_FENCE, count, count))
+
+        level = 0
+        while True:
+            lower = ''
+            for fence, count, size in blocks:
+                batch.put(self._encode_block_key(level, fence), self._encode_block_value(count, size, lower))
+                lower = fence
+            if len(blocks) == 1:
+                break
+            parents = []
+            for i in range(0, len(blocks), BUILD_BLOCK_SIZE):
+                children = blocks[i:i + BUILD_BLOCK_SIZE]
+                parents.append((children[-1][0], sum(count for _, count, _ in children), len(children)))
+            blocks = parents
+            level += 1
+        self._top_level = level
+
+    def add(self, score, member):
+        self._update_counts(self._get_suffix(score, member), 1)
+
+    def remove(self, score, member):
+        self._update_counts(self._get_suffix(score, member), -1)
+
+    def flush(self, batch):
+        for db_key, block in self._changed_blocks.items():
+            batch.put(db_key, self._encode_block_value(block.count, block.size, block.lower))
+        self._changed_blocks.clear()
+
+    def rank(self, score, member):
+        """
+        :return: the number of elements before the element (score, member)
+        """
+        return self._rank(self._get_suffix(score, member))
+
+    def rank_of_score_key(self, db_key):
+        """
+        :return: the number of elements before the score key `db_key`, which doesn't have to exist
+        (e.g. `KeyCodec.get_zset_score_lower_bound()`)
+        """
+        return self._rank(db_key[len(self._score_prefix):])
+
+    def _rank(self, suffix):
+        result = 0
+        lower = ''
+        for level in range(self._get_top_level(), 0, -1):
+            for block in self._iterate_blocks(level - 1, lower):
+                if block.fence < suffix:
+                    result += block.count
+                else:
+                    lower = block.lower
+                    break
+        for db_key in self._db.iterator(start=self._get_element_start(lower), include_value=False):
+            if not db_key.startswith(self._score_prefix) or db_key[len(self._score_prefix):] >= suffix:
+                break
+            result += 1
+        return result
+
+    def seek(self, index):
+        """
+        :return: a db key to start iterating and how many score keys must be skipped to get to the element `index`
+        """
+        lower = ''
+        for level in range(self._get_top_level(), 0, -1):
+            for block in self._iterate_blocks(level - 1, lower):
+                if index < block.count:
+                    lower = block.lower
+                    break
+                index -= block.count
+        return self._get_element_start(lower), index
+
+    def find_score_key(self, index):
+        """
+        :return: the score key of the element `index`
+        """
+        db_start, skip = self.seek(index)
+        for i, db_key in enumerate(self._db.iterator(start=db_start, include_value=False)):
+            if i == skip:
+                return db_key
+
+    def rebalance(self):
+        """
+        Split the blocks changed by `add()` and merge the blocks changed by `remove()` if necessary
+        """
+        # the sizes of the touched blocks are known, only the blocks to split or merge have to be read again
+        pending = set(db_key for db_key, block in self._touched_blocks.items() if self._needs_rebalance(block))
+        self._touched_blocks = {}
+        while pending:
+            db_key = pending.pop()
+            db_value = self._db.get(db_key)
+            if db_value is None:
+                continue
+            block = self._decode_block(db_key, db_value)
+            if block.size > MAX_BLOCK_SIZE:
+                pending.update(self._split(block))
+            elif block.size < MIN_BLOCK_SIZE:
+                pending.update(self._merge(block))
+
+    def _needs_rebalance(self, block):
+        if block.size > MAX_BLOCK_SIZE:
+            return True
+        elif self._is_top_block(block):
+            # the top block can't be merged, but it's removed if it has a single child
+            return block.level > 0 and block.size == 1
+        else:
+            return block.size < MIN_BLOCK_SIZE
+
+    def _is_top_block(self, block):
+        return block.lower == '' and block.fence == MAX_FENCE
+
+    def _update_counts(self, suffix, delta):
+        level = 0
+        while True:
+            block = self._find_block(level, suffix)
+            block.count += delta
+            if level == 0:
+                block.size += delta
+            db_key = self._set_block(block)
+            self._touched_blocks[db_key] = block
+            if self._is_top_block(block):
+                break
+            level += 1
+
+    def _split(self, block):
+        half = block.size // 2
+        left = Block(block.level, None, 0, half, block.lower)
+        if block.level == 0:
+            start = self._get_element_start(block.lower)
+            for i, db_key in enumerate(self._db.iterator(start=start, include_value=False)):
+                if i == half - 1:
+                    left.fence = db_key[len(self._score_prefix):]
+                    break
+            left.count = half
+        else:
+            for i, child in enumerate(self._iterate_blocks(block.level - 1, block.lower)):
+                left.count += child.count
+                if i == half - 1:
+                    left.fence = child.fence
+                    break
+        is_top_block = self._is_top_block(block)
+        block.count -= left.count
+        block.size -= half
+        block.lower = left.fence
+
+        with self._db.write_batch() as batch:
+            batch.put(*self._encode_block(left))
+            batch.put(*self._encode_block(block))
+            if is_top_block:
+                parent = Block(block.level + 1, MAX_FENCE, left.count + block.count, 2, '')
+                self._top_level = parent.level
+            else:
+                parent = self._find_block(block.level + 1, block.fence)
+                parent.size += 1
+            parent_key, parent_value = self._encode_block(parent)
+            batch.put(parent_key, parent_value)
+        return [self._encode_block_key(left.level, left.fence), self._encode_block_key(block.level, block.fence),
+                parent_key]
+
+    def _merge(self, block):
+        if self._is_top_block(block):
+            if block.level > 0 and block.size == 1:
+                # the only child of the top block covers the same range
+                self._db.delete(self._encode_block_key(block.level, block.fence))
+                self._top_level = block.level - 1
+                return [self._encode_block_key(self._top_level, MAX_FENCE)]
+            return []
+
+        parent = self._find_block(block.level + 1, block.fence)
+        if block.lower:
+            left = self._find_block(block.level, block.lower)
+            if self._can_merge(left, block, parent):
+                return self._merge_blocks(left, block, parent)
+        if block.fence != MAX_FENCE:
+            right = self._find_block(block.level, block.fence + '\x00')
+            if self._can_merge(block, right, parent):
+                return self._merge_blocks(block, right, parent)
+        return []
+
+    def _can_merge(self, left, right, parent):
+        if left.size + right.size > MAX_BLOCK_SIZE:
+            return False
+        left_parent = self._find_block(parent.level, left.fence)
+        right_parent = self._find_block(parent.level, right.fence)
+        return left_parent.fence == right_parent.fence == parent.fence
+
+    def _merge_blocks(self, left, right, parent):
+        right.lower = left.lower
+        right.count += left.count
+        right.size += left.size
+        parent.size -= 1
+        with self._db.write_batch() as batch:
+            batch.delete(self._encode_block_key(left.level, left.fence))
+            batch.put(*self._encode_block(right))
+            parent_key, parent_value = self._encode_block(parent)
+            batch.put(parent_key, parent_value)
+        result = [parent_key, self._encode_block_key(right.level, right.fence)]
+        if left.level > 0:
+            # the last child of `left` and the first child of `right` became siblings and may be merged now
+            result.append(self._encode_block_key(left.level - 1, left.fence))
+            result.append(self._encode_block_key(left.level - 1, self._find_block(left.level - 1, left.fence + '\x00').fence))
+        return result
+
+    def _get_top_level(self):
+        if self._top_level is None:
+            level = 0
+            while self._find_block(level, '').fence != MAX_FENCE:
+                level += 1
+            self._top_level = level
+        return self._top_level
+
+    def _find_block(self, level, suffix):
+        """
+        :return: the first block of `level` with a fence greater or equal to `suffix`
+        """
+        start = self._encode_block_key(level, suffix)
+        db_key = db_value = None
+        for db_key, db_value in self._db.iterator(start=start):
+            break
+        # blocks changed by the current write take precedence (the blocks created by `create()` aren't stored yet)
+        changed_db_keys = [k for k in self._changed_blocks if k >= start and (db_key is None or k <= db_key)]
+        if changed_db_keys:
+            return self._changed_blocks[min(changed_db_keys)]
+        return self._decode_block(db_key, db_value)
+
+    def _iterate_blocks(self, level, lower):
+        level_prefix = self._encode_block_key(level, '')
+        if lower:
+            start = level_prefix + lower + '\x00'
+        else:
+            start = level_prefix
+        for db_key, db_value in self._db.iterator(start=start):
+            if not db_key.startswith(level_prefix):
+                break
+            yield self._decode_block(db_key, db_value)
+
+    def _set_block(self, block):
+        db_key = self._encode_block_key(block.level, block.fence)
+        self._changed_blocks[db_key] = block
+        return db_key
+
+    def _get_element_start(self, lower):
+        if lower:
+            return self._score_prefix + lower + '\x00'
+        else:
+            return self._score_prefix
+
+    def _get_suffix(self, score, member):
+        return self._codec.encode_zset_score(self._key_id, member, score)[len(self._score_prefix):]
+
+    def _encode_block_key(self, level, fence):
+        return self._rank_prefix + chr(level) + fence
+
+    def _encode_block_value(self, count, size, lower):
+        return BLOCK_VALUE_STRUCT.pack(count, size) + lower
+
+    def _encode_block(self, block):
+        return (self._encode_block_key(block.level, block.fence),
+                self._encode_block_value(block.count, block.size, block.lower))
+
+    def _decode_block(self, db_key, db_value):
+        level = ord(db_key[len(self._rank_prefix)])
+        fence = db_key[len(self._rank_prefix) + 1:]
+        count, size = BLOCK_VALUE_STRUCT.unpack_from(db_value)
+        return Block(level, fence, count, size, db_value[BLOCK_VALUE_STRUCT.size:])
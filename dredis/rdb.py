@@ -6,15 +6,19 @@ This module is based on the following Redis files:
 * https://github.com/antirez/redis/blob/3.2.6/src/cluster.c
 
 """
+import contextlib
+import itertools
 import logging
+import mmap
 import os
 import struct
-from io import BytesIO
+from io import UnsupportedOperation
 
 import lzf
 
 import dredis
-from dredis import crc64
+from dredis import config, crc64
+from dredis.db import NUMBER_OF_REDIS_DATABASES
 from dredis.exceptions import DredisError
 
 logger = logging.getLogger(__name__)
@@ -56,6 +60,11 @@ RDB_ENC_INT16 = 1
 RDB_ENC_INT32 = 2
 RDB_ENC_LZF = 3
 
+# same as redis, only strings longer than 20 bytes are compressed
+# and only strings up to 11 bytes ("-2147483648") are integer-encoded
+LZF_MIN_STRING_LENGTH = 21
+INT_ENCODING_MAX_STRING_LENGTH = 11
+
 RDB_OPCODE_AUX = 250
 RDB_OPCODE_RESIZEDB = 251
 RDB_OPCODE_EXPIRETIME_MS = 252
@@ -65,6 +74,9 @@ RDB_OPCODE_EOF = 255
 
 RDB_VERSION = 7
 
+# collections are serialized in chunks of at least this size
+DUMP_CHUNK_SIZE = 64 * 1024
+
 BAD_DATA_FORMAT_ERR = DredisError("Bad data format")
 
 
@@ -85,40 +97,132 @@ def generate_payload(keyspace, key):
     if key_type == 'none':
         return None
     else:
-        object_dumper = ObjectDumper(keyspace)
-        payload = (
-                object_dumper.dump_type(key_type) +
-                object_dumper.dump(key, key_type) +
-                get_rdb_version()
-        )
-        checksum = crc64.checksum(payload)
-        return payload + checksum
+        return b''.join(iterate_payload(keyspace, key, key_type))
+
+
+def iterate_payload(keyspace, key, key_type):
+    """
+    :return: an iterator of the chunks of the `DUMP` payload of `key`, the last one is the checksum
+    """
+    object_dumper = ObjectDumper(keyspace)
+    payload_crc = crc64.CRC64()
+    chunks = itertools.chain(
+        [object_dumper.dump_type(key_type)],
+        object_dumper.iterate_dump(key, key_type),
+        [get_rdb_version()],
+    )
+    for chunk in chunks:
+        payload_crc.update(chunk)
+        yield chunk
+    yield payload_crc.digest()
 
 
 def verify_payload(payload):
     bad_payload = DredisError('DUMP payload version or checksum are wrong')
     if len(payload) < 10:
         raise bad_payload
-    data, footer = payload[:-10], payload[-10:]
-    rdb_version, crc = footer[:2], footer[2:]
+    rdb_version, crc = payload[-10:-8], payload[-8:]
     if rdb_version > get_rdb_version():
         raise bad_payload
-    if crc64.checksum(data + rdb_version) != crc:
+    # `data + rdb_version` without copying the payload
+    if crc64.checksum(buffer(payload, 0, len(payload) - len(crc))) != crc:
         raise bad_payload
 
 
 def load_rdb(keyspace, rdb_file):
-    object_loader = ObjectLoader(keyspace, rdb_file)
+    """
+    Load all databases of `rdb_file` into the databases of `keyspace`.
+    `keyspace.KeyspaceBulkLoader` writes them in large batches.
+    """
+    object_loader = ObjectLoader(keyspace, map_file(rdb_file))
     object_loader.load_rdb()
 
 
-def dump_rdb(keyspace, filename):
+def map_file(f):
+    """
+    :return: a `BufferReader` of a read-only memory map of `f`, thus reads don't need system calls.
+             Files without descriptors (e.g., BytesIO) or empty files are read into memory.
+    """
+    try:
+        fileno = f.fileno()
+    except (AttributeError, UnsupportedOperation):
+        return BufferReader(f.read())
+    try:
+        return BufferReader(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+    except ValueError:
+        return BufferReader(f.read())
+
+
+class BufferReader(object):
+    """
+    Read `data` (a string or a memory map) from an offset.
+    Numbers are unpacked in place with `struct.unpack_from()`, thus only the strings that are returned are copied.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, length):
+        start = self.offset
+        self.offset = start + length
+        return self.data[start:self.offset]
+
+    def read_byte(self):
+        offset = self.offset
+        self.offset = offset + 1
+        return ord(self.data[offset])
+
+    def unpack(self, struct_format):
+        """
+        :param struct_format: `struct.Struct` of a single number
+        """
+        result = struct_format.unpack_from(self.data, self.offset)[0]
+        self.offset += struct_format.size
+        return result
+
+
+def dump_rdb(keyspace, filename, lock=None):
+    """
+    Write the RDB file of all databases of `keyspace` to a temporary file and rename it to `filename`,
+    thus `filename` is never a partial dump.
+
+    :param lock: see `ObjectDumper.dump_rdb()`
+    """
     object_dumper = ObjectDumper(keyspace)
-    rdb_content = object_dumper.dump_rdb()
-    tmp_filename = 'temp-dump-pid-%d.rdb' % os.getpid()
-    with open(tmp_filename, 'wb') as f:
-        f.write(rdb_content)
-    os.rename(tmp_filename, filename)
+    tmp_filename = os.path.join(os.path.dirname(filename), 'temp-dump-pid-%d.rdb' % os.getpid())
+    try:
+        with open(tmp_filename, 'wb') as f:
+            object_dumper.dump_rdb(f, lock)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+
+@contextlib.contextmanager
+def no_lock():
+    yield
+
+
+class ChecksumWriter(object):
+    """
+    Write to a file and keep the CRC64 of everything written, thus the content isn't kept in memory
+    """
+
+    def __init__(self, f):
+        self._file = f
+        self._crc = crc64.CRC64()
+
+    def write(self, data):
+        self._crc.update(data)
+        self._file.write(data)
+
+    def write_checksum(self):
+        self._file.write(self._crc.digest())
 
 
 # NOTE: The classes ObjectLoader and ObjectDumper are symmetrical.
@@ -136,7 +240,7 @@ class ObjectLoader(object):
 
     def __init__(self, keyspace, rdb_file):
         self.keyspace = keyspace
-        self.file = rdb_file
+        self.file = rdb_file if isinstance(rdb_file, BufferReader) else map_file(rdb_file)
 
     def load_rdb(self):
         """
@@ -162,8 +266,7 @@ class ObjectLoader(object):
             elif obj_type == RDB_OPCODE_EOF:
                 break
             elif obj_type == RDB_OPCODE_SELECTDB:
-                # FIXME: at the moment only add keys to the default db
-                self.load_len()
+                self.keyspace.select(self.load_len())
                 continue
             elif obj_type == RDB_OPCODE_AUX:
                 # ignoring aux field=value
@@ -207,17 +310,17 @@ class ObjectLoader(object):
 
     def load_set(self, key):
         length = self.load_len()
-        for _ in xrange(length):
-            elem = self._load_string()
-            self.keyspace.sadd(key, elem)
+        members = [self._load_string() for _ in xrange(length)]
+        self.keyspace.sadd(key, *members)
 
     def load_intset(self, key):
         """
         based on intset.h and https://github.com/sripathikrishnan/redis-rdb-tools/blob/543a73e84702e911ddcd31325ecfde77d7fd230b/rdbtools/parser.py#L665-L681
         """  # noqa
-        intset = BytesIO(self._load_string())
+        intset = BufferReader(self._load_string())
         encoding = read_unsigned_int(intset)
         length = read_unsigned_int(intset)
+        entries = []
         for _ in xrange(length):
             if encoding == INTSET_ENC_INT16:
                 entry = read_signed_short(intset)
@@ -227,14 +330,17 @@ class ObjectLoader(object):
                 entry = read_signed_long(intset)
             else:
                 raise DredisError('Invalid encoding %r for intset (key = %r)' % (encoding, key))
-            self.keyspace.sadd(key, entry)
+            entries.append(entry)
+        self.keyspace.sadd(key, *entries)
 
     def load_zset(self, key):
         length = self.load_len()
+        elements = []
         for _ in xrange(length):
             value = self._load_string()
             score = self.load_double()
-            self.keyspace.zadd(key, score, value)
+            elements.append((score, value))
+        self.keyspace.zadd_many(key, elements)
 
     def _load_ziplist(self, key):
         """
@@ -243,7 +349,7 @@ class ObjectLoader(object):
             * The general layout of the ziplist is as follows:
             * <zlbytes><zltail><zllen><entry><entry><zlend>
         """
-        ziplist = BytesIO(self._load_string())
+        ziplist = BufferReader(self._load_string())
         zlbytes = read_unsigned_int(ziplist)  # noqa
         zltail = read_unsigned_int(ziplist)  # noqa
         zllen = read_unsigned_short(ziplist)
@@ -257,6 +363,7 @@ class ObjectLoader(object):
 
     def load_zset_ziplist(self, key):
         ziplist = self._load_ziplist(key)
+        elements = []
         while True:
             try:
                 member = next(ziplist)
@@ -264,10 +371,12 @@ class ObjectLoader(object):
             except StopIteration:
                 break
             else:
-                self.keyspace.zadd(key, score, member)
+                elements.append((score, member))
+        self.keyspace.zadd_many(key, elements)
 
     def load_hash_ziplist(self, key):
         ziplist = self._load_ziplist(key)
+        pairs = []
         while True:
             try:
                 field = next(ziplist)
@@ -275,7 +384,8 @@ class ObjectLoader(object):
             except StopIteration:
                 break
             else:
-                self.keyspace.hset(key, field, value)
+                pairs.append((field, value))
+        self.keyspace.hset_many(key, pairs)
 
     def _read_ziplist_entry(self, f, key):
         """
@@ -315,13 +425,11 @@ class ObjectLoader(object):
 
     def load_hash(self, key):
         length = self.load_len()
-        for _ in xrange(length):
-            field = self._load_string()
-            value = self._load_string()
-            self.keyspace.hset(key, field, value)
+        pairs = [(self._load_string(), self._load_string()) for _ in xrange(length)]
+        self.keyspace.hset_many(key, pairs)
 
     def load_double(self):
-        length = read_unsigned_char(self.file)
+        length = self.file.read_byte()
         if length == 255:
             result = float('-inf')
         elif length == 254:
@@ -333,18 +441,19 @@ class ObjectLoader(object):
         return result
 
     def load_len(self):
+        return self._load_len(self.file.read_byte())
+
+    def _load_len(self, first_byte):
         """
         :return: (int, str). the length of the string and the data after the string
 
         Based on rdbLoadLen() in rdb.c
         """
-        buff = [read_unsigned_char(self.file)]
-        len_type = (buff[0] & 0xC0) >> 6
+        len_type = (first_byte & 0xC0) >> 6
         if len_type == RDB_6BITLEN:
-            length = buff[0] & 0x3F
+            length = first_byte & 0x3F
         elif len_type == RDB_14BITLEN:
-            buff.append(read_unsigned_char(self.file))
-            length = ((buff[0] & 0x3F) << 8) | buff[1]
+            length = ((first_byte & 0x3F) << 8) | read_unsigned_char(self.file)
         elif len_type == RDB_32BITLEN:
             length = read_unsigned_int_be(self.file)
         else:
@@ -352,26 +461,32 @@ class ObjectLoader(object):
         return length
 
     def load_type(self):
-        result = read_unsigned_char(self.file)
+        result = self.file.read_byte()
         return result
 
     def _load_string(self):
-        length, is_encoded = self._load_string_len()
+        f = self.file
+        start = f.offset + 1
+        first_byte = ord(f.data[start - 1])
+        if first_byte >> 6 == RDB_6BITLEN:
+            # fast path for the most common case (strings shorter than 64 bytes)
+            f.offset = start + first_byte
+            return f.data[start:f.offset]
+        f.offset = start
+        length, is_encoded = self._load_string_len(first_byte)
         if is_encoded:
             obj = self._load_encoded_string(length)
         else:
             obj = self.file.read(length)
         return obj
 
-    def _load_string_len(self):
-        first_byte = read_unsigned_char(self.file)
+    def _load_string_len(self, first_byte):
         len_type = (first_byte & 0xC0) >> 6
         if len_type == RDB_ENCVAL:
             enctype = first_byte & 0x3F
             return enctype, True
         else:
-            self.file.seek(-1, 1)  # go back one byte
-            return self.load_len(), False
+            return self._load_len(first_byte), False
 
     def _load_encoded_string(self, enctype):
         if enctype == RDB_ENC_INT8:
@@ -395,36 +510,61 @@ class ObjectDumper(object):
     def __init__(self, keyspace):
         self.keyspace = keyspace
 
-    def dump_rdb(self):
-        aux_fields = chr(RDB_OPCODE_AUX).join([
+    def dump_rdb(self, rdb_file, lock=None):
+        """
+        Write all databases to `rdb_file` one key at a time, with the keys in the db order.
+
+        :param lock: a function returning the context manager held while every key is read,
+                     for keyspaces read from another thread (e.g., `keyspace.KeyspaceSnapshot`)
+        """
+        lock = lock or no_lock
+        writer = ChecksumWriter(rdb_file)
+        writer.write(chr(RDB_OPCODE_AUX).join([
             'REDIS%04d' % RDB_VERSION,
             '%cdredis-ver%c%s' % (len("dredis-ver"), len(dredis.__version__), dredis.__version__)
-        ])
-        result = bytearray()
-        result.extend(aux_fields)
-        # TODO: add support to multiple dbs
-        db = 0
-        result.append(RDB_OPCODE_SELECTDB)
-        result += self.dump_length(db)
-        # FIXME: `sorted` may not be worth it. keeping it to ensure consistency of RDB files
-        for key in sorted(self.keyspace.keys('*')):
-            obj_type = self.keyspace.type(key)
-            result.extend(self.dump_type(obj_type))
-            result.extend(self._dump_string(key))
-            result.extend(self.dump(key, obj_type))
-        result.append(RDB_OPCODE_EOF)
-        result.extend(crc64.checksum(result))
-        return result
+        ]))
+        for db in range(NUMBER_OF_REDIS_DATABASES):
+            self.keyspace.select(db)
+            keys = self.keyspace.iterate_keys()
+            is_empty = True
+            while True:
+                with lock():
+                    try:
+                        key, key_type = next(keys)
+                    except StopIteration:
+                        break
+                    chunks = self.iterate_dump(key, key_type)
+                if is_empty:
+                    # same as redis, empty databases aren't written
+                    writer.write(chr(RDB_OPCODE_SELECTDB) + self.dump_length(db))
+                    is_empty = False
+                writer.write(self.dump_type(key_type) + self._dump_string(key))
+                while True:
+                    # the lock isn't held while the chunks are written
+                    with lock():
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    writer.write(chunk)
+        writer.write(chr(RDB_OPCODE_EOF))
+        writer.write_checksum()
 
     def dump(self, key, key_type):
+        return b''.join(self.iterate_dump(key, key_type))
+
+    def iterate_dump(self, key, key_type):
+        """
+        :return: an iterator of the serialized value of `key` in chunks of about `DUMP_CHUNK_SIZE` bytes,
+                 thus large collections aren't serialized in memory at once
+        """
         if key_type == 'string':
-            return self.dump_string(key)
+            return iter([self.dump_string(key)])
         if key_type == 'set':
-            return self.dump_set(key)
+            return iterate_chunks(self._iterate_set(key))
         if key_type == 'hash':
-            return self.dump_hash(key)
+            return iterate_chunks(self._iterate_hash(key))
         if key_type == 'zset':
-            return self.dump_zset(key)
+            return iterate_chunks(self._iterate_zset(key))
         raise DredisError("Can't convert %r" % key_type)
 
     def dump_string(self, key):
@@ -432,34 +572,30 @@ class ObjectDumper(object):
         return self._dump_string(string)
 
     def dump_set(self, key):
-        members = self.keyspace.smembers(key)
-        length = len(members)
-        result = self.dump_length(length)
-        for member in members:
-            result += self._dump_string(member)
-        return result
+        return b''.join(self._iterate_set(key))
 
     def dump_hash(self, key):
-        keys_and_values = self.keyspace.hgetall(key)
-        length = len(keys_and_values) / 2
-        result = self.dump_length(length)
-        while keys_and_values:
-            hash_key = keys_and_values.pop(0)
-            hash_value = keys_and_values.pop(0)
-            result += self._dump_string(hash_key)
-            result += self._dump_string(hash_value)
-        return result
+        return b''.join(self._iterate_hash(key))
 
     def dump_zset(self, key):
-        values_and_scores = self.keyspace.zrange(key, 0, -1, with_scores=True)
-        length = len(values_and_scores) / 2
-        result = self.dump_length(length)
-        while values_and_scores:
-            value = values_and_scores.pop(0)
-            score = values_and_scores.pop(0)
-            result += self._dump_string(value)
-            result += self.dump_double(score)
-        return result
+        return b''.join(self._iterate_zset(key))
+
+    def _iterate_set(self, key):
+        yield self.dump_length(self.keyspace.scard(key))
+        for member in self.keyspace.iterate_set(key):
+            yield self._dump_string(member)
+
+    def _iterate_hash(self, key):
+        yield self.dump_length(self.keyspace.hlen(key))
+        for field, value in self.keyspace.iterate_hash(key):
+            yield self._dump_string(field)
+            yield self._dump_string(value)
+
+    def _iterate_zset(self, key):
+        yield self.dump_length(self.keyspace.zcard(key))
+        for member, score in self.keyspace.iterate_zset(key):
+            yield self._dump_string(member)
+            yield self.dump_double(score)
 
     def dump_length(self, len):
         """
@@ -499,14 +635,33 @@ class ObjectDumper(object):
         return struct.pack('<B', RDB_TYPES[key_type])
 
     def _dump_string(self, string):
+        """
+        This function is based on rdbSaveRawString() from rdb.c
+        """
+        length = len(string)
+        if length <= INT_ENCODING_MAX_STRING_LENGTH:
+            encoded_string = self._dump_encoded_string(string)
+            if encoded_string is not None:
+                return encoded_string
+        if length >= LZF_MIN_STRING_LENGTH and config.get('rdbcompression') == config.TRUE:
+            compressed_string = self._dump_lzf_string(string)
+            if compressed_string is not None:
+                return compressed_string
+        return self.dump_length(length) + string
+
+    def _dump_encoded_string(self, string):
+        """
+        :return: `string` encoded as an integer or None if `string` isn't the canonical representation
+                 of a 32-bit integer (e.g., "007", "+1", " 1")
+
+        This function is based on rdbTryIntegerEncoding() from rdb.c
+        """
         try:
-            int(string)
+            value = int(string)
         except ValueError:
-            return self.dump_length(len(string)) + string
-        else:
-            return self._dump_encoded_string(int(string))
-
-    def _dump_encoded_string(self, value):
+            return None
+        if bytes(value) != string:
+            return None
         if (value >= -(1 << 7)) and (value <= (1 << 7) - 1):
             return struct.pack('<Bb', (RDB_ENCVAL << 6) | RDB_ENC_INT8, value)
         elif (value >= -(1 << 15)) and (value <= (1 << 15) - 1):
@@ -514,46 +669,81 @@ class ObjectDumper(object):
         elif (value >= -(1 << 31)) and (value <= (1 << 31) - 1):
             return struct.pack('<Bi', (RDB_ENCVAL << 6) | RDB_ENC_INT32, value)
         else:
-            raise DredisError("can't encode %r as integer" % value)
+            return None
+
+    def _dump_lzf_string(self, string):
+        """
+        :return: `string` compressed with LZF or None if it doesn't save at least 4 bytes
+
+        This function is based on rdbSaveLzfStringObject() from rdb.c
+        """
+        compressed = lzf.compress(string, len(string) - 4)
+        if compressed is None:
+            return None
+        return (
+            struct.pack('>B', (RDB_ENCVAL << 6) | RDB_ENC_LZF) +
+            self.dump_length(len(compressed)) +
+            self.dump_length(len(string)) +
+            compressed
+        )
+
+
+def iterate_chunks(strings):
+    """
+    :return: an iterator of `strings` joined in chunks of at least `DUMP_CHUNK_SIZE` bytes (but the last one)
+    """
+    chunk = []
+    chunk_size = 0
+    for string in strings:
+        chunk.append(string)
+        chunk_size += len(string)
+        if chunk_size >= DUMP_CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+            chunk_size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+SIGNED_CHAR = struct.Struct('b')
+UNSIGNED_INT = struct.Struct('I')
+UNSIGNED_INT_BE = struct.Struct('>I')
+SIGNED_INT = struct.Struct('i')
+SIGNED_SHORT = struct.Struct('h')
+UNSIGNED_SHORT = struct.Struct('H')
+SIGNED_LONG = struct.Struct('l')
 
 
 def read_unsigned_char(f):
-    result = struct.unpack('B', f.read(1))[0]
-    return result
+    return f.read_byte()
 
 
 def read_signed_char(f):
-    result = struct.unpack('b', f.read(1))[0]
-    return result
+    return f.unpack(SIGNED_CHAR)
 
 
 def read_unsigned_int(f):
-    result = struct.unpack('I', f.read(4))[0]
-    return result
+    return f.unpack(UNSIGNED_INT)
 
 
 def read_unsigned_int_be(f):
-    result = struct.unpack('>I', f.read(4))[0]
-    return result
+    return f.unpack(UNSIGNED_INT_BE)
 
 
 def read_signed_int(f):
-    result = struct.unpack('i', f.read(4))[0]
-    return result
+    return f.unpack(SIGNED_INT)
 
 
 def read_signed_short(f):
-    result = struct.unpack('h', f.read(2))[0]
-    return result
+    return f.unpack(SIGNED_SHORT)
 
 
 def read_unsigned_short(f):
-    return struct.unpack('H', f.read(2))[0]
+    return f.unpack(UNSIGNED_SHORT)
 
 
 def read_signed_long(f):
-    result = struct.unpack('l', f.read(8))[0]
-    return result
+    return f.unpack(SIGNED_LONG)
 
 
 def read_24bit_signed_number(f):
@@ -12,20 +12,23 @@ import traceback
 import sys
 
 from dredis import __version__
-from dredis import db, rdb, config, gc
+from dredis import db, rdb, config, gc, compaction, converter
 from dredis.commands import run_command, SimpleString
 from dredis.exceptions import DredisError
-from dredis.keyspace import Keyspace, to_float_string
+from dredis.keyspace import Keyspace, KeyspaceBulkLoader, to_float_string
 from dredis.parser import Parser
 from dredis.path import Path
+from dredis.stats import COMMAND_STATS
 from dredis.utils import setup_logging
 
 logger = logging.getLogger('dredis')
 
 ROOT_DIR = None  # defined by `main()`
+EVENT_LOOP_TIMEOUT = 0.1  # seconds
 
 
 def execute_cmd(keyspace, send_fn, cmd, *args):
+    start_time = time.time()
     try:
         result = run_command(keyspace, cmd, args)
     except DredisError as exc:
@@ -37,6 +40,7 @@ def execute_cmd(keyspace, send_fn, cmd, *args):
         logger.exception(str(exc))
     else:
         transmit(send_fn, result)
+    COMMAND_STATS.record(start_time, time.time())
 
 
 def transform(obj):
@@ -139,6 +143,27 @@ class RedisServer(asyncore.dispatcher):
             CommandHandler(sock)
 
 
+def run_event_loop(periodic_tasks):
+    """
+    :param periodic_tasks: functions to run in the event loop thread between polls
+    """
+    if not periodic_tasks:
+        asyncore.loop(use_poll=True)
+    while True:
+        asyncore.loop(timeout=EVENT_LOOP_TIMEOUT, use_poll=True, count=1)
+        for task in periodic_tasks:
+            task()
+
+
+def check_key_counts(keyspace):
+    for db_id in range(db.NUMBER_OF_REDIS_DATABASES):
+        keyspace.select(db_id)
+        start_time = time.time()
+        if keyspace.check_key_count():
+            logger.info("Counted the keys of db %s (%.2f seconds)." % (db_id, time.time() - start_time))
+    keyspace.select(db.DEFAULT_REDIS_DB)
+
+
 def main():
     parser = argparse.ArgumentParser(version=__version__)
     parser.add_argument('--host', default='127.0.0.1', help='server host (defaults to %(default)s)')
@@ -159,8 +184,25 @@ def main():
     parser.add_argument('--gc-interval', default=gc.DEFAULT_GC_INTERVAL,
                         type=float, help='key gc interval in milliseconds (defaults to %(default)s)')
     parser.add_argument('--gc-batch-size', default=gc.DEFAULT_GC_BATCH_SIZE,
-                        type=float, help='key gc batch size (defaults to %(default)s)')
+                        type=float, help='maximum key gc batch size (defaults to %(default)s)')
+    parser.add_argument('--gc-target-latency', default=gc.DEFAULT_GC_TARGET_LATENCY, type=float,
+                        help='the key gc backs off while the average command latency in milliseconds is higher '
+                             '(defaults to %(default)s)')
+    parser.add_argument('--gc-mode', default=gc.DEFAULT_GC_MODE, choices=gc.GC_MODES,
+                        help='run the key gc in a thread or in a separate process (lmdb only, defaults to %(default)s)')
+    parser.add_argument('--compaction-threshold', default=compaction.DEFAULT_COMPACTION_THRESHOLD, type=int,
+                        help='compact a database after the key gc deleted this number of keys from it '
+                             '(0 disables it, defaults to %(default)s)')
+    parser.add_argument('--compaction-rate', default=compaction.DEFAULT_COMPACTION_RATE, type=float,
+                        help='maximum number of keys compacted per second (defaults to %(default)s)')
+    parser.add_argument('--compaction-window', default=None, type=compaction.parse_window,
+                        help='compact the databases with deleted keys during this local time window '
+                             '(e.g., 02:00-05:00)')
+    parser.add_argument('--convert-key-format', action='store_true',
+                        help='convert keys stored in older formats to the current format in the background')
     args = parser.parse_args()
+    if args.gc_mode == 'process' and args.backend != 'lmdb':
+        parser.error('--gc-mode=process requires --backend=lmdb')
 
     global ROOT_DIR
     if args.dir:
@@ -184,25 +226,46 @@ def main():
                 sys.exit(1)
             key, value = map(str.strip, option.split('='))
             db_backend_options[key] = json.loads(value)
+
+    if args.gc_mode == 'process':
+        # LMDB environments can't be used by forked processes, thus the gc process starts before they're opened
+        gc_worker = gc.KeyGarbageCollectorProcess(ROOT_DIR, db_backend_options, args.gc_interval, args.gc_batch_size,
+                                                  args.gc_target_latency)
+        gc_worker.start()
     db.DB_MANAGER.setup_dbs(ROOT_DIR, args.backend, db_backend_options)
 
     keyspace = Keyspace()
     if args.flushall:
         keyspace.flushall()
+    check_key_counts(keyspace)
 
     if args.rdb:
         logger.info("Loading %s..." % args.rdb)
         start_time = time.time()
-        with open(args.rdb, 'rb') as f:
-            rdb.load_rdb(keyspace, f)
+        with open(args.rdb, 'rb') as f, KeyspaceBulkLoader() as bulk_loader:
+            rdb.load_rdb(bulk_loader, f)
         logger.info("Finished loading (%.2f seconds)." % (time.time() - start_time))
 
     RedisServer(args.host, args.port)
-    gc_thread = gc.KeyGarbageCollector(args.gc_interval, args.gc_batch_size)
-    gc_thread.daemon = True
-    gc_thread.start()
+    if args.gc_mode == 'process':
+        gc_worker.start_collecting()
+    else:
+        gc_thread = gc.KeyGarbageCollector(args.gc_interval, args.gc_batch_size, args.gc_target_latency)
+        gc_thread.daemon = True
+        gc_thread.start()
+    compaction_scheduler = compaction.CompactionScheduler(args.compaction_threshold, args.compaction_rate,
+                                                          args.compaction_window)
+    compaction_scheduler.daemon = True
+    compaction_scheduler.start()
+
+    periodic_tasks = []
+    if args.backend == 'lmdb':
+        periodic_tasks.append(compaction_scheduler.finish_rebuild)
+    if args.convert_key_format:
+        periodic_tasks.append(converter.KeyFormatConverter().step)
 
     logger.info("Backend: {}".format(args.backend))
+    logger.info("GC mode: {}".format(args.gc_mode))
     logger.info("Port: {}".format(args.port))
     logger.info("Root directory: {}".format(ROOT_DIR))
     logger.info('PID: {}'.format(os.getpid()))
@@ -210,7 +273,7 @@ def main():
     logger.info('Ready to accept connections')
 
     try:
-        asyncore.loop(use_poll=True)
+        run_event_loop(periodic_tasks)
     except KeyboardInterrupt:
         logger.info("Shutting down...")
 
@@ -0,0 +1,42 @@
+import multiprocessing
+import time
+
+LATENCY_WEIGHT = 0.05  # weight of the latest command in the moving average of the latency
+IDLE_TIMEOUT = 1  # seconds without commands after which the server is considered idle
+
+
+class CommandStats(object):
+    """
+    Moving average of the latency of the commands run by the event loop.
+    Background tasks (e.g. `gc.KeyGarbageCollector`) read it to back off while clients are waiting.
+    The latency is stored in shared memory, thus processes forked by the server can read it too.
+    """
+
+    def __init__(self):
+        self.total_commands = 0
+        self._average_latency = multiprocessing.RawValue('d', 0.0)
+        self._last_command_time = multiprocessing.RawValue('d', 0.0)
+
+    def record(self, start_time, end_time):
+        self.total_commands += 1
+        average_latency = self._average_latency.value
+        self._average_latency.value = average_latency + LATENCY_WEIGHT * ((end_time - start_time) - average_latency)
+        self._last_command_time.value = end_time
+
+    def get_average_latency(self):
+        """
+        :return: the moving average of the latency in seconds (0 if the server is idle)
+        """
+        if time.time() - self._last_command_time.value > IDLE_TIMEOUT:
+            return 0.0
+        return self._average_latency.value
+
+
+COMMAND_STATS = CommandStats()
+
+
+def get_info():
+    return [
+        ('total_commands_processed', COMMAND_STATS.total_commands),
+        ('average_command_latency_usec', int(COMMAND_STATS.get_average_latency() * 1000000)),
+    ]
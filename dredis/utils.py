@@ -1,7 +1,15 @@
+import fnmatch
 import logging
+import re
 import struct
 import sys
 
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional, it speeds up `FloatCodec.encode_many()` and `FloatCodec.decode_many()`
+    numpy = None
+
 
 def to_float(s):
     # Redis uses `strtod` which converts empty string to 0
@@ -19,6 +27,9 @@ class FloatCodec(object):
     >>> sorted(floats, key=FloatCodec().encode)
     [-2.5, 1.5, 2.0, 3.2]
 
+    The IEEE 754 bits are handled as an unsigned 64-bit integer: negative numbers have all of their bits flipped
+    and positive numbers have only the sign bit flipped.
+
     References:
     * https://en.wikipedia.org/wiki/Floating-point_arithmetic#IEEE_754_design_rationale
     * https://stackoverflow.com/a/43305015/565999
@@ -28,36 +39,128 @@ class FloatCodec(object):
     """
 
     STRUCT = struct.Struct('>d')
+    UINT64_STRUCT = struct.Struct('>Q')
+    SIGN_MASK = 0x8000000000000000
+    ALL_BITS_MASK = 0xffffffffffffffff
+    # NumPy arrays have a fixed setup cost, it's not worth it for small batches
+    NUMPY_MIN_BATCH_SIZE = 64
 
     def encode(self, score):
-        score_bytes = bytearray(self.STRUCT.pack(score))
-        # if a negative number, flip all bits
-        if score_bytes[0] & 0x80 != 0x00:
-            score_bytes = self._flip_bits(score_bytes)
+        bits = self.UINT64_STRUCT.unpack(self.STRUCT.pack(score))[0]
+        if bits & self.SIGN_MASK:
+            # if a negative number, flip all bits
+            bits ^= self.ALL_BITS_MASK
         else:
             # flip the sign if it's a positive number
-            score_bytes[0] ^= 0x80  # flip the sign
-        return bytes(score_bytes)
+            bits ^= self.SIGN_MASK
+        return self.UINT64_STRUCT.pack(bits)
+
+    def encode_next(self, score):
+        """
+        :return: the lowest encoded value greater than the encoded `score`
+        """
+        bits = self.UINT64_STRUCT.unpack(self.encode(score))[0]
+        return self.UINT64_STRUCT.pack(bits + 1)
 
     def decode(self, bytestring):
-        score_bytes = bytearray(bytestring)
-        # if a negative number, flip all bits
-        if score_bytes[0] & 0x80 != 0x80:
-            score_bytes = self._flip_bits(score_bytes)
-        else:
+        bits = self.UINT64_STRUCT.unpack(bytestring)[0]
+        if bits & self.SIGN_MASK:
             # flip the sign if it's a positive number
-            score_bytes[0] ^= 0x80  # flip the sign
-        return self.STRUCT.unpack(score_bytes)[0]
+            bits ^= self.SIGN_MASK
+        else:
+            # if a negative number, flip all bits
+            bits ^= self.ALL_BITS_MASK
+        return self.STRUCT.unpack(self.UINT64_STRUCT.pack(bits))[0]
 
-    def _flip_bits(self, bytestring):
-        for i in xrange(len(bytestring)):
-            bytestring[i] ^= 0xff
-        return bytestring
+    def encode_many(self, scores):
+        """
+        :return: list of encoded scores, the same as `map(self.encode, scores)`
+        """
+        count = len(scores)
+        if numpy is not None and count >= self.NUMPY_MIN_BATCH_SIZE:
+            bits = numpy.array(scores, dtype=numpy.float64).view(numpy.uint64)
+            masks = numpy.where(bits >> 63, numpy.uint64(self.ALL_BITS_MASK), numpy.uint64(self.SIGN_MASK))
+            data = (bits ^ masks).astype('>u8').tobytes()
+        else:
+            bits = struct.unpack('>%dQ' % count, struct.pack('>%dd' % count, *scores))
+            data = struct.pack('>%dQ' % count, *[
+                b ^ self.ALL_BITS_MASK if b & self.SIGN_MASK else b ^ self.SIGN_MASK
+                for b in bits
+            ])
+        size = self.STRUCT.size
+        return [data[i:i + size] for i in xrange(0, len(data), size)]
+
+    def decode_many(self, bytestrings):
+        """
+        :return: list of decoded scores, the same as `map(self.decode, bytestrings)`
+        """
+        count = len(bytestrings)
+        data = b''.join(bytestrings)
+        if numpy is not None and count >= self.NUMPY_MIN_BATCH_SIZE:
+            bits = numpy.frombuffer(data, dtype='>u8').astype(numpy.uint64)
+            masks = numpy.where(bits >> 63, numpy.uint64(self.SIGN_MASK), numpy.uint64(self.ALL_BITS_MASK))
+            return (bits ^ masks).view(numpy.float64).tolist()
+        else:
+            bits = struct.unpack('>%dQ' % count, data)
+            return list(struct.unpack('>%dd' % count, struct.pack('>%dQ' % count, *[
+                b ^ self.SIGN_MASK if b & self.SIGN_MASK else b ^ self.ALL_BITS_MASK
+                for b in bits
+            ])))
 
 
 FLOAT_CODEC = FloatCodec()
 
 
+GLOB_SPECIAL_CHARS = re.compile(r'[*?[\\]')
+
+
+def compile_pattern(pattern):
+    """
+    :return: (literal prefix, match function) of the glob-style `pattern`.
+    All strings matching `pattern` start with the literal prefix, thus it can be used to seek to the first candidate.
+    """
+    if pattern is None:
+        return '', lambda string: True
+    special_char = GLOB_SPECIAL_CHARS.search(pattern)
+    prefix = pattern if special_char is None else pattern[:special_char.start()]
+    regex = re.compile(fnmatch.translate(pattern))
+    return prefix, lambda string: regex.match(string) is not None
+
+
+def encode_varint(number):
+    """
+    Encode a non-negative integer using 7 bits per byte (little endian base 128, the same as protobuf).
+    Numbers lower than 128 take a single byte.
+    >>> encode_varint(16)
+    '\\x10'
+    >>> encode_varint(300)
+    '\\xac\\x02'
+    """
+    if number < 0x80:
+        return chr(number)
+    result = bytearray()
+    while number >= 0x80:
+        result.append((number & 0x7f) | 0x80)
+        number >>= 7
+    result.append(number)
+    return bytes(result)
+
+
+def decode_varint(bytestring, offset=0):
+    """
+    :return: (int, int). the decoded number and the offset of the first byte after it
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = ord(bytestring[offset])
+        offset += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
 def setup_logging(level):
     logger = logging.getLogger('dredis')
     logger.setLevel(level)
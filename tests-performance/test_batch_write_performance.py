@@ -0,0 +1,50 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 with the LevelDB backend (LARGE_NUMBER == 1000, REPEAT == 100):
+
+before (one write batch per member):
+HSET with 1000 fields time = 0.02682s
+SADD with 1000 members time = 0.02138s
+ZADD with 1000 members time = 0.07587s
+
+after (one write batch per command):
+HSET with 1000 fields time = 0.02003s
+SADD with 1000 members time = 0.01048s
+ZADD with 1000 members time = 0.04560s
+"""
+
+import time
+
+from tests.helpers import fresh_redis
+
+
+PROFILE_PORT = 6376
+LARGE_NUMBER = 1000
+REPEAT = 100
+
+
+def test_multi_member_commands():
+    r = fresh_redis(port=PROFILE_PORT)
+    members = ['member{}'.format(i) for i in range(LARGE_NUMBER)]
+    hash_args = [x for member in members for x in (member, 'value')]
+    zset_args = [x for i, member in enumerate(members) for x in (i, member)]
+
+    before_hset = time.time()
+    for i in range(REPEAT):
+        r.execute_command('HSET', 'myhash{}'.format(i), *hash_args)
+    after_hset = time.time()
+    print '\nHSET with 1000 fields time = {:.5f}s'.format((after_hset - before_hset) / REPEAT)
+
+    before_sadd = time.time()
+    for i in range(REPEAT):
+        r.sadd('myset{}'.format(i), *members)
+    after_sadd = time.time()
+    print 'SADD with 1000 members time = {:.5f}s'.format((after_sadd - before_sadd) / REPEAT)
+
+    before_zadd = time.time()
+    for i in range(REPEAT):
+        r.zadd('myzset{}'.format(i), *zset_args)
+    after_zadd = time.time()
+    print 'ZADD with 1000 members time = {:.5f}s'.format((after_zadd - before_zadd) / REPEAT)
@@ -0,0 +1,73 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (NUMBER_OF_SETS == 50000, SET_SIZE == 10):
+
+leveldb KEYS * after the GC of 50k sets (x100) time = 6.84742s
+leveldb compaction time = 0.04775s
+leveldb KEYS * after the compaction (x100) time = 0.45388s
+lmdb KEYS * after the GC of 50k sets (x100) time = 0.00240s
+lmdb disk usage before the compaction = 74.03MB
+lmdb compaction time = 0.02076s
+lmdb KEYS * after the compaction (x100) time = 0.00258s
+lmdb disk usage after the compaction = 0.01MB
+"""
+
+import os
+import tempfile
+import time
+
+import pytest
+
+from dredis.compaction import CompactionScheduler
+from dredis.db import DB_MANAGER
+from dredis.gc import KeyGarbageCollector
+from dredis.keyspace import Keyspace
+
+
+NUMBER_OF_SETS = 50000
+SET_SIZE = 10
+
+
+def time_keys(keyspace):
+    before = time.time()
+    for _ in range(100):
+        assert keyspace.keys('*') == {'str'}
+    return time.time() - before
+
+
+def print_disk_usage(when):
+    # the LMDB file is sparse, its size is the map size
+    data_file = os.path.join(DB_MANAGER.get_directory(0), 'data.mdb')
+    print 'lmdb disk usage {} the compaction = {:.2f}MB'.format(when, os.stat(data_file).st_blocks * 512 / 2.0 ** 20)
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+def test_compaction_after_gc_of_small_sets(backend):
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend=backend, backend_options={})
+    keyspace = Keyspace()
+    keyspace.set('str', 'value')
+    members = map(str, range(SET_SIZE))
+    for i in range(NUMBER_OF_SETS):
+        keyspace.sadd('set{}'.format(i), *members)
+    for i in range(NUMBER_OF_SETS):
+        keyspace.delete('set{}'.format(i))
+    # the sets are smaller than `gc.COMPACTION_THRESHOLD`, thus the gc doesn't compact them
+    collector = KeyGarbageCollector()
+    while collector.collect():
+        pass
+
+    print '\n{} KEYS * after the GC of 50k sets (x100) time = {:.5f}s'.format(backend, time_keys(keyspace))
+    if backend == 'lmdb':
+        print_disk_usage('before')
+
+    scheduler = CompactionScheduler(rate=float('inf'))
+    before = time.time()
+    scheduler.compact(0)
+    scheduler.finish_rebuild()
+    after = time.time()
+    print '{} compaction time = {:.5f}s'.format(backend, after - before)
+    print '{} KEYS * after the compaction (x100) time = {:.5f}s'.format(backend, time_keys(keyspace))
+    if backend == 'lmdb':
+        print_disk_usage('after')
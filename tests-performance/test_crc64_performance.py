@@ -0,0 +1,49 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (PAYLOAD_SIZE == 100MB):
+byte-by-byte CRC64 time = 76.15442s
+slicing-by-8 CRC64 time = 23.93507s
+slicing-by-8 CRC64 in 1MB updates time = 22.75460s
+
+NumPy doesn't help here, every 8-byte word depends on the CRC of the previous ones.
+"""
+
+import os
+import time
+
+from dredis import crc64
+
+
+PAYLOAD_SIZE = 100 * 2 ** 20
+UPDATE_SIZE = 2 ** 20
+
+
+def crc64_byte_by_byte(crc, data):
+    for byte in bytearray(data):
+        crc = crc64.uint64_t(crc64.crc64_tab[crc64.uint8_t(crc) ^ byte] ^ (crc >> 8))
+    return crc
+
+
+def test_crc64():
+    payload = os.urandom(PAYLOAD_SIZE)
+
+    before = time.time()
+    expected_crc = crc64_byte_by_byte(0, payload)
+    after = time.time()
+    print '\nbyte-by-byte CRC64 time = {:.5f}s'.format(after - before)
+
+    before = time.time()
+    crc = crc64.crc64(0, payload)
+    after = time.time()
+    print 'slicing-by-8 CRC64 time = {:.5f}s'.format(after - before)
+    assert crc == expected_crc
+
+    before = time.time()
+    incremental_crc = crc64.CRC64()
+    for start in range(0, PAYLOAD_SIZE, UPDATE_SIZE):
+        incremental_crc.update(buffer(payload, start, UPDATE_SIZE))
+    after = time.time()
+    print 'slicing-by-8 CRC64 in 1MB updates time = {:.5f}s'.format(after - before)
+    assert incremental_crc.crc == expected_crc
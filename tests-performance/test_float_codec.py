@@ -0,0 +1,58 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (LARGE_NUMBER == 100000):
+
+before the uint64-based codec:
+FloatCodec.encode time = 0.11316s
+FloatCodec.decode time = 0.20029s
+
+after (NumPy 1.16.6 installed):
+FloatCodec.encode time = 0.11784s
+FloatCodec.decode time = 0.11694s
+FloatCodec.encode_many time = 0.02765s
+FloatCodec.decode_many time = 0.00564s
+"""
+
+import random
+import time
+
+from dredis.utils import FLOAT_CODEC
+
+
+LARGE_NUMBER = 100000
+
+
+def test_float_encoding():
+    floats = [random.uniform(-1e6, 1e6) for _ in range(LARGE_NUMBER)]
+    before = time.time()
+    for f in floats:
+        FLOAT_CODEC.encode(f)
+    after = time.time()
+    print '\nFloatCodec.encode time = {:.5f}s'.format(after - before)
+
+
+def test_float_decoding():
+    encoded_floats = [FLOAT_CODEC.encode(random.uniform(-1e6, 1e6)) for _ in range(LARGE_NUMBER)]
+    before = time.time()
+    for encoded_float in encoded_floats:
+        FLOAT_CODEC.decode(encoded_float)
+    after = time.time()
+    print '\nFloatCodec.decode time = {:.5f}s'.format(after - before)
+
+
+def test_float_batch_encoding():
+    floats = [random.uniform(-1e6, 1e6) for _ in range(LARGE_NUMBER)]
+    before = time.time()
+    FLOAT_CODEC.encode_many(floats)
+    after = time.time()
+    print '\nFloatCodec.encode_many time = {:.5f}s'.format(after - before)
+
+
+def test_float_batch_decoding():
+    encoded_floats = [FLOAT_CODEC.encode(random.uniform(-1e6, 1e6)) for _ in range(LARGE_NUMBER)]
+    before = time.time()
+    FLOAT_CODEC.decode_many(encoded_floats)
+    after = time.time()
+    print '\nFloatCodec.decode_many time = {:.5f}s'.format(after - before)
@@ -0,0 +1,59 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (LARGE_NUMBER == 1000000):
+
+leveldb FLUSHDB (1M storage keys) time = 0.00794s
+lmdb FLUSHDB (1M storage keys) time = 0.01489s
+leveldb FLUSHDB ASYNC (1M storage keys) time = 0.00474s
+lmdb FLUSHDB ASYNC (1M storage keys) time = 0.00411s
+leveldb SWAPDB (1M storage keys) time = 0.04019s
+lmdb SWAPDB (1M storage keys) time = 0.00013s
+
+The time of FLUSHDB grows with the number of files of the db (LevelDB creates a file per ~2MB),
+FLUSHDB ASYNC only renames the directory.
+SWAPDB opens LevelDB dbs again after their directories are renamed (it replays their logs).
+"""
+
+import tempfile
+import time
+
+import pytest
+
+from dredis.db import DB_MANAGER
+from dredis.keyspace import Keyspace
+
+
+LARGE_NUMBER = 1000000
+
+
+def setup_keyspace(backend):
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend=backend, backend_options={})
+    keyspace = Keyspace()
+    chunk_size = 10000
+    for i in range(0, LARGE_NUMBER, chunk_size):
+        keyspace.sadd('myset', *['member{}'.format(n) for n in range(i, i + chunk_size)])
+    return keyspace
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_flushdb(backend, asynchronous):
+    keyspace = setup_keyspace(backend)
+
+    before = time.time()
+    keyspace.flushdb(asynchronous=asynchronous)
+    after = time.time()
+    print '\n{} FLUSHDB{} (1M storage keys) time = {:.5f}s'.format(
+        backend, ' ASYNC' if asynchronous else '', after - before)
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+def test_swapdb(backend):
+    keyspace = setup_keyspace(backend)
+
+    before = time.time()
+    keyspace.swapdb(0, 1)
+    after = time.time()
+    print '\n{} SWAPDB (1M storage keys) time = {:.5f}s'.format(backend, after - before)
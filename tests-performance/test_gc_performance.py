@@ -0,0 +1,65 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (LARGE_NUMBER == 500000, BATCH_SIZE == 10000):
+
+before (every collection started from the first key of the deleted set):
+leveldb GC of a set with 500k members (51 collections) time = 4.49302s
+
+after (collections resume from the stored cursor):
+leveldb GC of a set with 500k members (50 collections) time = 0.95034s
+
+before the bulk deletions (one `delete()` per key in a write batch):
+leveldb GC of a set with 500k members (50 collections) time = 1.06546s
+leveldb KEYS * after the GC (x100) time = 3.75118s
+lmdb GC of a set with 500k members (50 collections) time = 1.48561s
+lmdb KEYS * after the GC (x100) time = 0.00158s
+
+after (LMDB cursor deletions, LevelDB compaction of large collections):
+leveldb GC of a set with 500k members (50 collections) time = 2.18762s
+leveldb KEYS * after the GC (x100) time = 0.00329s
+lmdb GC of a set with 500k members (50 collections) time = 0.43227s
+lmdb KEYS * after the GC (x100) time = 0.00208s
+"""
+
+import tempfile
+import time
+
+import pytest
+
+from dredis.db import DB_MANAGER, KEY_CODEC
+from dredis.gc import KeyGarbageCollector
+from dredis.keyspace import Keyspace
+
+
+LARGE_NUMBER = 500000
+BATCH_SIZE = 10000
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+def test_collect_large_set(backend):
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend=backend, backend_options={})
+    keyspace = Keyspace()
+    chunk_size = 10000
+    for i in range(0, LARGE_NUMBER, chunk_size):
+        keyspace.sadd('myset', *['member{}'.format(n) for n in range(i, i + chunk_size)])
+    keyspace.delete('myset')
+    db = DB_MANAGER.get_db('0')
+    collector = KeyGarbageCollector(batch_size=BATCH_SIZE)
+
+    before = time.time()
+    collections = 0
+    while any(True for _ in db.iterator(prefix=KEY_CODEC.MIN_DELETED_VALUE, include_value=False)):
+        collector.collect()
+        collections += 1
+    after = time.time()
+    print '\n{} GC of a set with 500k members ({} collections) time = {:.5f}s'.format(
+        backend, collections, after - before)
+
+    # LevelDB skips the deletion markers of deleted keys until they're compacted
+    before = time.time()
+    for _ in range(100):
+        assert keyspace.keys('*') == set()
+    after = time.time()
+    print '{} KEYS * after the GC (x100) time = {:.5f}s'.format(backend, after - before)
@@ -0,0 +1,79 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 with the LevelDB backend (LARGE_NUMBER == 200000):
+
+before (every key was matched with fnmatch):
+KEYS user:123:* (200k keys) time = 0.54327s
+KEYS * (200k keys) time = 1.99624s
+
+after (seeking to the literal prefix of the pattern):
+KEYS user:123:* (200k keys) time = 0.00059s
+KEYS * (200k keys) time = 2.07430s
+SCAN 0 MATCH user:123:* (200k keys) time = 0.00079s
+
+before the stored key count (DBSIZE loaded all keys in memory):
+DBSIZE (200k keys) time = 0.49049s
+SET (10k new keys) time = 1.28941s
+SET (10k existing keys) time = 1.29182s
+
+after:
+DBSIZE (200k keys) time = 0.00051s
+SET (10k new keys) time = 1.40296s
+SET (10k existing keys) time = 1.20318s
+"""
+
+import time
+
+from tests.helpers import fresh_redis
+
+
+PROFILE_PORT = 6376
+LARGE_NUMBER = 200000
+
+
+def test_keys_and_scan_with_prefix():
+    r = fresh_redis(port=PROFILE_PORT)
+    chunk_size = 1000
+    for i in range(0, LARGE_NUMBER, chunk_size):
+        r.execute_command('MSET', *[x for n in range(i, i + chunk_size) for x in ('user:{}:name'.format(n), 'test')])
+
+    before_keys = time.time()
+    assert r.keys('user:123:*') == ['user:123:name']
+    after_keys = time.time()
+    print '\nKEYS user:123:* (200k keys) time = {:.5f}s'.format(after_keys - before_keys)
+
+    before_keys = time.time()
+    assert len(r.keys('*')) == LARGE_NUMBER
+    after_keys = time.time()
+    print 'KEYS * (200k keys) time = {:.5f}s'.format(after_keys - before_keys)
+
+    before_scan = time.time()
+    assert r.scan(0, match='user:123:*', count=10) == (0, ['user:123:name'])
+    after_scan = time.time()
+    print 'SCAN 0 MATCH user:123:* (200k keys) time = {:.5f}s'.format(after_scan - before_scan)
+
+
+def test_dbsize():
+    r = fresh_redis(port=PROFILE_PORT)
+    chunk_size = 1000
+    for i in range(0, LARGE_NUMBER, chunk_size):
+        r.execute_command('MSET', *[x for n in range(i, i + chunk_size) for x in ('user:{}:name'.format(n), 'test')])
+
+    before_dbsize = time.time()
+    assert r.dbsize() == LARGE_NUMBER
+    after_dbsize = time.time()
+    print '\nDBSIZE (200k keys) time = {:.5f}s'.format(after_dbsize - before_dbsize)
+
+    before_set = time.time()
+    for n in range(10000):
+        r.set('new:{}'.format(n), 'test')
+    after_set = time.time()
+    print 'SET (10k new keys) time = {:.5f}s'.format(after_set - before_set)
+
+    before_set = time.time()
+    for n in range(10000):
+        r.set('new:{}'.format(n), 'test')
+    after_set = time.time()
+    print 'SET (10k existing keys) time = {:.5f}s'.format(after_set - before_set)
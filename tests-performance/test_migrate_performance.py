@@ -0,0 +1,72 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (NUMBER_OF_KEYS == 20000, LARGE_HASH_SIZE == 100000):
+DUMP of a hash with 100000 fields time = 1.52211s (6.86597s with `list.pop(0)` and string concatenation)
+DUMP + RESTORE of 20000 keys through a client time = 5.61179s
+MIGRATE of 20000 keys (1000 keys per command) time = 4.67632s
+
+The target server spends most of the MIGRATE time running the `RESTORE` commands (~3.2s).
+"""
+
+import tempfile
+import time
+
+from dredis.db import DB_MANAGER
+from dredis.keyspace import Keyspace
+from tests.helpers import fresh_redis
+
+
+# the keys are sent to the server started by `make performance-server`
+PROFILE_PORT = 6376
+NUMBER_OF_KEYS = 20000
+LARGE_HASH_SIZE = 100000
+KEYS_PER_MIGRATE = 1000
+
+
+def setup_keyspace():
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend='leveldb', backend_options={})
+    keyspace = Keyspace()
+    keys = ['key{}'.format(i) for i in range(NUMBER_OF_KEYS)]
+    for key in keys:
+        keyspace.set(key, 'value')
+    return keyspace, keys
+
+
+def test_dump_large_hash():
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend='leveldb', backend_options={})
+    keyspace = Keyspace()
+    keyspace.hset_many('hash', [('field{}'.format(i), 'value{}'.format(i)) for i in range(LARGE_HASH_SIZE)])
+
+    before = time.time()
+    keyspace.dump('hash')
+    after = time.time()
+    print '\nDUMP of a hash with {} fields time = {:.5f}s'.format(LARGE_HASH_SIZE, after - before)
+
+
+def test_dump_and_restore():
+    keyspace, keys = setup_keyspace()
+    target = fresh_redis(port=PROFILE_PORT)
+
+    before = time.time()
+    for key in keys:
+        target.restore(key, 0, keyspace.dump(key))
+        keyspace.delete(key)
+    after = time.time()
+    print '\nDUMP + RESTORE of {} keys through a client time = {:.5f}s'.format(NUMBER_OF_KEYS, after - before)
+    assert keyspace.dbsize() == 0
+    assert target.dbsize() == NUMBER_OF_KEYS
+
+
+def test_migrate():
+    keyspace, keys = setup_keyspace()
+    target = fresh_redis(port=PROFILE_PORT)
+
+    before = time.time()
+    for i in range(0, NUMBER_OF_KEYS, KEYS_PER_MIGRATE):
+        keyspace.migrate('127.0.0.1', PROFILE_PORT, keys[i:i + KEYS_PER_MIGRATE], 0, 1000, copy=False, replace=False)
+    after = time.time()
+    print '\nMIGRATE of {} keys ({} keys per command) time = {:.5f}s'.format(NUMBER_OF_KEYS, KEYS_PER_MIGRATE, after - before)
+    assert keyspace.dbsize() == 0
+    assert target.dbsize() == NUMBER_OF_KEYS
@@ -0,0 +1,64 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (LARGE_NUMBER == 1000, REPEAT == 100):
+
+LevelDB backend:
+pipelined GET x 1000 time = 0.07407s
+MGET with 1000 keys time = 0.01508s
+pipelined HGET x 1000 time = 0.08148s
+HMGET with 1000 fields time = 0.01510s
+
+LMDB backend:
+pipelined GET x 1000 time = 0.07905s
+MGET with 1000 keys time = 0.01863s
+pipelined HGET x 1000 time = 0.09396s
+HMGET with 1000 fields time = 0.01646s
+"""
+
+import time
+
+from tests.helpers import fresh_redis
+
+
+PROFILE_PORT = 6376
+LARGE_NUMBER = 1000
+REPEAT = 100
+
+
+def test_mget_and_hmget():
+    r = fresh_redis(port=PROFILE_PORT)
+    keys = ['key{}'.format(i) for i in range(LARGE_NUMBER)]
+    r.execute_command('MSET', *[x for key in keys for x in (key, 'value')])
+    r.execute_command('HSET', 'myhash', *[x for key in keys for x in (key, 'value')])
+
+    before_get = time.time()
+    for _ in range(REPEAT):
+        pipeline = r.pipeline(transaction=False)
+        for key in keys:
+            pipeline.get(key)
+        pipeline.execute()
+    after_get = time.time()
+    print '\npipelined GET x 1000 time = {:.5f}s'.format((after_get - before_get) / REPEAT)
+
+    before_mget = time.time()
+    for _ in range(REPEAT):
+        r.mget(keys)
+    after_mget = time.time()
+    print 'MGET with 1000 keys time = {:.5f}s'.format((after_mget - before_mget) / REPEAT)
+
+    before_hget = time.time()
+    for _ in range(REPEAT):
+        pipeline = r.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hget('myhash', key)
+        pipeline.execute()
+    after_hget = time.time()
+    print 'pipelined HGET x 1000 time = {:.5f}s'.format((after_hget - before_hget) / REPEAT)
+
+    before_hmget = time.time()
+    for _ in range(REPEAT):
+        r.hmget('myhash', keys)
+    after_hmget = time.time()
+    print 'HMGET with 1000 fields time = {:.5f}s'.format((after_hmget - before_hmget) / REPEAT)
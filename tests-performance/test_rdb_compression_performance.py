@@ -0,0 +1,51 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (NUMBER_OF_KEYS == 50000, JSON values of ~890 bytes):
+leveldb SAVE with rdbcompression=false: 43.66MB in 14.90844s
+leveldb SAVE with rdbcompression=true: 11.92MB in 5.89395s
+
+The compressed dump is faster because the CRC64 is computed over fewer bytes.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import pytest
+
+from dredis import config, rdb
+from dredis.db import DB_MANAGER
+from dredis.keyspace import Keyspace
+
+
+NUMBER_OF_KEYS = 50000
+
+
+@pytest.fixture(scope='module')
+def keyspace():
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend='leveldb', backend_options={})
+    keyspace = Keyspace()
+    for i in range(NUMBER_OF_KEYS):
+        value = json.dumps([
+            {'id': i * 10 + j, 'name': 'user{}'.format(i * 10 + j), 'email': 'user{}@example.com'.format(i * 10 + j), 'active': True}
+            for j in range(10)
+        ])
+        keyspace.set('user:{}'.format(i), value)
+        keyspace.set('counter:{}'.format(i), bytes(i))
+    return keyspace
+
+
+@pytest.mark.parametrize('rdbcompression', ['false', 'true'])
+def test_save(keyspace, rdbcompression):
+    config.set('rdbcompression', rdbcompression)
+    filename = os.path.join(tempfile.mkdtemp(prefix="dredis-perf-"), 'dump.rdb')
+
+    before = time.time()
+    rdb.dump_rdb(keyspace, filename)
+    after = time.time()
+    print '\nleveldb SAVE with rdbcompression={}: {:.2f}MB in {:.5f}s'.format(
+        rdbcompression, os.path.getsize(filename) / 2.0 ** 20, after - before)
+    config.set('rdbcompression', 'true')
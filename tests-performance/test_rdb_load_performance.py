@@ -0,0 +1,69 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (NUMBER_OF_KEYS == 20000, COLLECTION_SIZE == 10):
+
+leveldb load with Keyspace of 7.2MB (80000 keys) time = 18.99406s
+lmdb load with Keyspace of 7.2MB (80000 keys) time = 14.41084s
+leveldb load with KeyspaceBulkLoader of 7.2MB (80000 keys) time = 5.08447s
+lmdb load with KeyspaceBulkLoader of 7.2MB (80000 keys) time = 5.76147s
+
+`Keyspace` reads the db before every write and writes a batch per key.
+"""
+
+import os
+import tempfile
+import time
+
+import pytest
+
+from dredis import rdb
+from dredis.db import DB_MANAGER
+from dredis.keyspace import Keyspace, KeyspaceBulkLoader
+
+
+NUMBER_OF_KEYS = 20000
+COLLECTION_SIZE = 10
+
+
+@pytest.fixture(scope='module')
+def rdb_filename():
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend='leveldb', backend_options={})
+    keyspace = Keyspace()
+    members = ['member{}'.format(i) for i in range(COLLECTION_SIZE)]
+    for i in range(NUMBER_OF_KEYS):
+        keyspace.set('string{}'.format(i), 'value{}'.format(i))
+        keyspace.sadd('set{}'.format(i), *members)
+        keyspace.hset_many('hash{}'.format(i), [(member, 'value') for member in members])
+        keyspace.zadd_many('zset{}'.format(i), list(enumerate(members)))
+    filename = os.path.join(tempfile.mkdtemp(prefix="dredis-perf-"), 'dump.rdb')
+    rdb.dump_rdb(keyspace, filename)
+    return filename
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+def test_load_rdb_with_keyspace(backend, rdb_filename):
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend=backend, backend_options={})
+    keyspace = Keyspace()
+
+    before = time.time()
+    with open(rdb_filename, 'rb') as f:
+        rdb.load_rdb(keyspace, f)
+    after = time.time()
+    print '\n{} load with Keyspace of {:.1f}MB ({} keys) time = {:.5f}s'.format(
+        backend, os.path.getsize(rdb_filename) / 2.0 ** 20, NUMBER_OF_KEYS * 4, after - before)
+    assert keyspace.dbsize() == NUMBER_OF_KEYS * 4
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+def test_load_rdb_with_bulk_loader(backend, rdb_filename):
+    DB_MANAGER.setup_dbs(tempfile.mkdtemp(prefix="dredis-perf-"), backend=backend, backend_options={})
+
+    before = time.time()
+    with open(rdb_filename, 'rb') as f, KeyspaceBulkLoader() as bulk_loader:
+        rdb.load_rdb(bulk_loader, f)
+    after = time.time()
+    print '\n{} load with KeyspaceBulkLoader of {:.1f}MB ({} keys) time = {:.5f}s'.format(
+        backend, os.path.getsize(rdb_filename) / 2.0 ** 20, NUMBER_OF_KEYS * 4, after - before)
+    assert Keyspace().dbsize() == NUMBER_OF_KEYS * 4
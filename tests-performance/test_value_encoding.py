@@ -0,0 +1,53 @@
+"""
+The following results should serve as reference
+------
+
+Results from 2026-10-19 (LARGE_NUMBER == 100000):
+ASCII score encode+decode time = 0.14867s
+binary score encode+decode time = 0.11747s
+ASCII length decode time = 0.09985s
+binary length decode time = 0.08581s
+"""
+
+import time
+import uuid
+
+from dredis.db import KEY_CODEC
+from dredis.keyspace import to_float_string
+
+
+LARGE_NUMBER = 100000
+
+
+def test_score_encoding():
+    scores = [i * 1.5 for i in range(LARGE_NUMBER)]
+
+    before = time.time()
+    for score in scores:
+        KEY_CODEC.decode_score(to_float_string(score))
+    after = time.time()
+    print '\nASCII score encode+decode time = {:.5f}s'.format(after - before)
+
+    before = time.time()
+    for score in scores:
+        KEY_CODEC.decode_score(KEY_CODEC.encode_score(score))
+    after = time.time()
+    print 'binary score encode+decode time = {:.5f}s'.format(after - before)
+
+
+def test_length_decoding():
+    key_id = uuid.uuid4().bytes
+    ascii_values = [bytes(key_id) + bytes(length) for length in range(LARGE_NUMBER)]
+    binary_values = [KEY_CODEC.encode_key_id_and_length('key', key_id, length) for length in range(LARGE_NUMBER)]
+
+    before = time.time()
+    for db_value in ascii_values:
+        KEY_CODEC.decode_key_id_and_length('key', db_value)
+    after = time.time()
+    print '\nASCII length decode time = {:.5f}s'.format(after - before)
+
+    before = time.time()
+    for db_value in binary_values:
+        KEY_CODEC.decode_key_id_and_length('key', db_value)
+    after = time.time()
+    print 'binary length decode time = {:.5f}s'.format(after - before)
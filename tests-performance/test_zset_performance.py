@@ -23,15 +23,55 @@ ZCOUNT time = 0.00009s
 ZRANGE time = 0.00379s
 ZREM time = 0.06466s
 
+
+Results from 2026-10-19 with the LevelDB backend (LARGE_NUMBER == 1000, HUGE_NUMBER == 1000000):
+
+before the rank index:
+zset ZRANK (1M members) time = 3.81190s
+zset ZRANGE offset (1M members) time = 0.56151s
+(populating the zset with ZADD took 69.7s)
+
+after:
+zset ZRANK (1M members) time = 0.00149s
+zset ZREVRANK (1M members) time = 0.00054s
+zset ZRANGE offset (1M members) time = 0.00118s
+(populating the zset with ZADD took ~220s)
+
+ZRANGEBYSCORE and ZCOUNT seeking to the minimum score (before => after):
+zset ZCOUNT top 1% (1M members) time = 4.53342s => 0.02924s
+zset ZRANGEBYSCORE top 1% (1M members) time = 5.14664s => 0.00047s
+
+ZCOUNT and ZRANGEBYSCORE LIMIT offsets using the rank index (before => after):
+zset ZCOUNT top 1% (1M members) time = 0.04403s => 0.00228s
+zset ZCOUNT all (1M members) time = 4.24890s => 0.00152s
+zset ZRANGEBYSCORE LIMIT offset (1M members) time = 2.33245s => 0.00109s
+
+top 10 elements (ZRANGE -10 -1 took 0.56151s before the rank index):
+zset ZRANGE -10 -1 (1M members) time = 0.00118s
+zset ZREVRANGE 0 9 (1M members) time = 0.00036s
+zset ZREVRANGEBYSCORE LIMIT 0 10 (1M members) time = 0.00046s
+
+ZUNIONSTORE merging the sources by member and writing to a new key ID (UNION_NUMBER == 100000):
+zset ZUNIONSTORE (2 x 100k members) time = 27.69967s => 2.15236s
+
+ZINTERSTORE and ZDIFFSTORE iterating the smallest zset (before => after: ZRANGE of both zsets in the client):
+zset client-side intersection (100 x 100k members) time = 1.12880s
+zset ZINTERSTORE (100 x 100k members) time = 0.00323s
+zset ZDIFFSTORE (100 - 100k members) time = 0.00075s
+
 """
 
 import time
 
+import pytest
+
 from tests.helpers import fresh_redis
 
 
 PROFILE_PORT = 6376
 LARGE_NUMBER = 1000
+HUGE_NUMBER = 1000000
+UNION_NUMBER = 100000
 
 
 def test_zadd_same_score_all_elements():
@@ -108,3 +148,131 @@ def test_zrem():
     after_zrem = time.time()
 
     print '\nzset ZREM time = {:.5f}s'.format(after_zrem - before_zrem)
+
+
+@pytest.fixture(scope='module')
+def huge_zset():
+    r = fresh_redis(port=PROFILE_PORT)
+    chunk_size = 1000
+    for i in range(0, HUGE_NUMBER, chunk_size):
+        args = []
+        for score in range(i, i + chunk_size):
+            args.extend([score, 'value{}'.format(score)])
+        r.zadd('myhugezset', *args)
+    return r
+
+
+def test_zrank_and_zrange_huge_zset(huge_zset):
+    r = huge_zset
+
+    before_zrank = time.time()
+    assert r.zrank('myhugezset', 'value{}'.format(HUGE_NUMBER - 1)) == HUGE_NUMBER - 1
+    after_zrank = time.time()
+    print '\nzset ZRANK (1M members) time = {:.5f}s'.format(after_zrank - before_zrank)
+
+    before_zrevrank = time.time()
+    assert r.zrevrank('myhugezset', 'value0') == HUGE_NUMBER - 1
+    after_zrevrank = time.time()
+    print 'zset ZREVRANK (1M members) time = {:.5f}s'.format(after_zrevrank - before_zrevrank)
+
+    offset = HUGE_NUMBER - 100
+    before_zrange = time.time()
+    assert len(r.zrange('myhugezset', offset, offset + 9)) == 10
+    after_zrange = time.time()
+    print 'zset ZRANGE offset (1M members) time = {:.5f}s'.format(after_zrange - before_zrange)
+
+
+def test_zcount_and_zrangebyscore_huge_zset(huge_zset):
+    r = huge_zset
+    min_score = HUGE_NUMBER - HUGE_NUMBER / 100
+
+    before_zcount = time.time()
+    assert r.zcount('myhugezset', min_score, '+inf') == HUGE_NUMBER / 100
+    after_zcount = time.time()
+    print '\nzset ZCOUNT top 1% (1M members) time = {:.5f}s'.format(after_zcount - before_zcount)
+
+    before_zrangebyscore = time.time()
+    assert len(r.zrangebyscore('myhugezset', '({}'.format(min_score), '+inf', start=0, num=10)) == 10
+    after_zrangebyscore = time.time()
+    print 'zset ZRANGEBYSCORE top 1% (1M members) time = {:.5f}s'.format(after_zrangebyscore - before_zrangebyscore)
+
+
+def test_zcount_and_zrangebyscore_offset_huge_zset(huge_zset):
+    r = huge_zset
+
+    before_zcount = time.time()
+    assert r.zcount('myhugezset', '-inf', '+inf') == HUGE_NUMBER
+    after_zcount = time.time()
+    print '\nzset ZCOUNT all (1M members) time = {:.5f}s'.format(after_zcount - before_zcount)
+
+    before_zrangebyscore = time.time()
+    assert len(r.zrangebyscore('myhugezset', 0, '+inf', start=HUGE_NUMBER / 2, num=10)) == 10
+    after_zrangebyscore = time.time()
+    print 'zset ZRANGEBYSCORE LIMIT offset (1M members) time = {:.5f}s'.format(after_zrangebyscore - before_zrangebyscore)
+
+
+def test_top_n_huge_zset(huge_zset):
+    r = huge_zset
+
+    before_zrange = time.time()
+    assert len(r.zrange('myhugezset', -10, -1)) == 10
+    after_zrange = time.time()
+    print '\nzset ZRANGE -10 -1 (1M members) time = {:.5f}s'.format(after_zrange - before_zrange)
+
+    before_zrevrange = time.time()
+    assert len(r.zrevrange('myhugezset', 0, 9)) == 10
+    after_zrevrange = time.time()
+    print 'zset ZREVRANGE 0 9 (1M members) time = {:.5f}s'.format(after_zrevrange - before_zrevrange)
+
+    before_zrevrangebyscore = time.time()
+    assert len(r.zrevrangebyscore('myhugezset', '+inf', '-inf', start=0, num=10)) == 10
+    after_zrevrangebyscore = time.time()
+    print 'zset ZREVRANGEBYSCORE LIMIT 0 10 (1M members) time = {:.5f}s'.format(
+        after_zrevrangebyscore - before_zrevrangebyscore)
+
+
+def test_zunionstore_large_zsets():
+    r = fresh_redis(port=PROFILE_PORT)
+    chunk_size = 1000
+    for i in range(0, UNION_NUMBER, chunk_size):
+        args1 = []
+        args2 = []
+        for score in range(i, i + chunk_size):
+            args1.extend([score, 'value{}'.format(score)])
+            args2.extend([score, 'value{}'.format(score + UNION_NUMBER / 2)])
+        r.zadd('myzset1', *args1)
+        r.zadd('myzset2', *args2)
+
+    before_zunionstore = time.time()
+    assert r.zunionstore('myunion', ['myzset1', 'myzset2']) == UNION_NUMBER * 3 / 2
+    after_zunionstore = time.time()
+    print '\nzset ZUNIONSTORE (2 x 100k members) time = {:.5f}s'.format(after_zunionstore - before_zunionstore)
+
+
+def test_zinterstore_small_and_large_zsets():
+    r = fresh_redis(port=PROFILE_PORT)
+    chunk_size = 1000
+    for i in range(0, UNION_NUMBER, chunk_size):
+        args = []
+        for score in range(i, i + chunk_size):
+            args.extend([score, 'value{}'.format(score)])
+        r.zadd('mylargezset', *args)
+    r.zadd('mysmallzset', *[x for i in range(0, UNION_NUMBER, UNION_NUMBER / 100) for x in (i, 'value{}'.format(i))])
+
+    before_client_side = time.time()
+    small = dict(r.zrange('mysmallzset', 0, -1, withscores=True))
+    large = dict(r.zrange('mylargezset', 0, -1, withscores=True))
+    assert len(set(small) & set(large)) == 100
+    after_client_side = time.time()
+    print '\nzset client-side intersection (100 x 100k members) time = {:.5f}s'.format(
+        after_client_side - before_client_side)
+
+    before_zinterstore = time.time()
+    assert r.zinterstore('myinter', ['mylargezset', 'mysmallzset']) == 100
+    after_zinterstore = time.time()
+    print 'zset ZINTERSTORE (100 x 100k members) time = {:.5f}s'.format(after_zinterstore - before_zinterstore)
+
+    before_zdiffstore = time.time()
+    assert r.execute_command('ZDIFFSTORE', 'mydiff', 2, 'mysmallzset', 'mylargezset') == 0
+    after_zdiffstore = time.time()
+    print 'zset ZDIFFSTORE (100 - 100k members) time = {:.5f}s'.format(after_zdiffstore - before_zdiffstore)
@@ -189,6 +189,21 @@ def test_hscan_with_a_subset_of_matching_elements_returned():
     }
 
 
+def test_hscan_with_literal_prefix():
+    r = fresh_redis()
+
+    for field in ['a', 'ab', 'abc', 'b', 'bab']:
+        r.hset('myhash', field, field.upper())
+    r.hset('myhash2', 'abcd', 'test')
+
+    assert r.hscan('myhash', 0, match='ab*') == (0, {'ab': 'AB', 'abc': 'ABC'})
+    assert r.hscan('myhash', 0, match='a') == (0, {'a': 'A'})
+    cursor, elements = r.hscan('myhash', 0, match='a*', count=1)
+    assert cursor != 0
+    assert elements == {'a': 'A'}
+    assert r.hscan('myhash', cursor, match='a*', count=10) == (0, {'ab': 'AB', 'abc': 'ABC'})
+
+
 def test_hscan_invalid_cursor():
     r = fresh_redis()
     with pytest.raises(redis.ResponseError) as exc:
@@ -207,3 +222,30 @@ def test_hscan_invalid_count():
 def test_hscan_with_a_cursor_that_doesnt_exist():
     r = fresh_redis()
     assert r.hscan('myhash', 123) == (0, {})
+
+
+def test_hset_with_repeated_fields():
+    r = fresh_redis()
+
+    assert r.execute_command('HSET', 'myhash', 'k1', 'v1', 'k2', 'v2', 'k1', 'v3') == 2
+    assert r.hgetall('myhash') == {'k1': 'v3', 'k2': 'v2'}
+    assert r.execute_command('HSET', 'myhash', 'k2', 'v4', 'k3', 'v5') == 1
+    assert r.hlen('myhash') == 3
+
+
+def test_hmget():
+    r = fresh_redis()
+    r.hset('myhash', 'k1', 'v1')
+    r.hset('myhash', 'k2', '')
+
+    assert r.hmget('myhash', ['k1', 'notfound', 'k2', 'k1']) == ['v1', None, '', 'v1']
+    assert r.hmget('notfound', ['k1', 'k2']) == [None, None]
+
+
+def test_hexists():
+    r = fresh_redis()
+    r.hset('myhash', 'k1', 'v1')
+
+    assert r.hexists('myhash', 'k1') is True
+    assert r.hexists('myhash', 'k2') is False
+    assert r.hexists('notfound', 'k1') is False
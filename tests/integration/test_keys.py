@@ -1,3 +1,5 @@
+import socket
+
 import pytest
 import redis
 
@@ -44,6 +46,79 @@ def test_keys():
     assert r.keys('my?et') == ['myset']
 
 
+def test_keys_with_literal_prefix():
+    r = fresh_redis()
+
+    for key in ['user:1', 'user:10', 'user:2', 'users', 'user', 'other:1']:
+        r.set(key, 'test')
+    r.sadd('user:1:set', 'test')
+    r.hset('user:1:hash', 'test', 'test')
+
+    assert sorted(r.keys('user:1*')) == ['user:1', 'user:10', 'user:1:hash', 'user:1:set']
+    assert sorted(r.keys('user:?')) == ['user:1', 'user:2']
+    assert r.keys('user') == ['user']
+    assert r.keys('user:[2-9]') == ['user:2']
+    assert r.keys('notfound*') == []
+
+
+def test_scan():
+    r = fresh_redis()
+
+    keys = ['key{}'.format(i) for i in range(20)]
+    for key in keys:
+        r.set(key, 'test')
+    r.sadd('myset', 'test')
+    r.zadd('myzset', 0, 'test')
+    r.hset('myhash', 'test', 'test')
+
+    found_keys = []
+    cursor = 0
+    while True:
+        cursor, found = r.scan(cursor, count=3)
+        assert len(found) <= 3
+        found_keys.extend(found)
+        if cursor == 0:
+            break
+    assert sorted(found_keys) == sorted(keys + ['myset', 'myzset', 'myhash'])
+
+    cursor, found = r.scan(0, match='key1*', count=100)
+    assert cursor == 0
+    assert sorted(found) == sorted(['key1'] + ['key1{}'.format(i) for i in range(10)])
+
+    cursor, found = r.scan(0, match='my*', count=1)
+    assert cursor != 0
+    assert len(found) <= 1
+
+
+def test_scan_with_type():
+    r = fresh_redis()
+
+    r.set('mystr', 'test')
+    r.sadd('myset', 'test')
+    r.zadd('myzset', 0, 'test')
+    r.hset('myhash', 'test', 'test')
+
+    assert r.execute_command('SCAN', 0, 'TYPE', 'zset') == (0, ['myzset'])
+    assert r.execute_command('SCAN', 0, 'TYPE', 'SET', 'MATCH', 'my*') == (0, ['myset'])
+    assert r.execute_command('SCAN', 0, 'TYPE', 'list') == (0, [])
+
+
+def test_scan_with_invalid_parameters():
+    r = fresh_redis()
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.scan('a1')
+    assert str(exc.value) == 'invalid cursor'
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('SCAN', 0, 'COUNT')
+    assert str(exc.value) == 'syntax error'
+    for count in [0, -1]:
+        with pytest.raises(redis.ResponseError) as exc:
+            r.scan(0, count=count)
+        assert str(exc.value) == 'syntax error'
+    assert r.scan(123) == (0, [])
+
+
 def test_exists():
     r = fresh_redis()
 
@@ -100,6 +175,26 @@ def test_restore():
     assert r.get('str2') == 'test'
 
 
+def test_migrate_without_existing_keys():
+    r = fresh_redis()
+
+    assert r.execute_command('MIGRATE', 'localhost', '6379', 'missing', '1', '1000') == 'NOKEY'
+
+
+def test_migrate_to_closed_port():
+    r = fresh_redis()
+    r.set('str', 'test')
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    closed_port = sock.getsockname()[1]
+    sock.close()
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('MIGRATE', '127.0.0.1', closed_port, '', '0', '1000', 'COPY', 'KEYS', 'str')
+    assert str(exc.value) == 'IOERR error or timeout connecting to the client'
+    assert r.get('str') == 'test'
+
+
 def test_restore_with_valid_params():
     r = fresh_redis()
 
@@ -2,7 +2,7 @@ import tempfile
 
 from dredis.gc import KeyGarbageCollector
 from dredis.keyspace import Keyspace
-from dredis.db import DB_MANAGER
+from dredis.db import DB_MANAGER, KEY_CODEC, KEY_COUNT_METADATA, SCAN_CURSOR_SECRET_METADATA, get_key_count
 
 
 def test_delete():
@@ -20,4 +20,8 @@ def test_delete():
 
     KeyGarbageCollector().collect()
 
-    assert list(DB_MANAGER.get_db('0').iterator()) == []
+    db = DB_MANAGER.get_db('0')
+    assert [db_key for db_key, _ in db.iterator()] == sorted([
+        KEY_CODEC.encode_metadata(KEY_COUNT_METADATA), KEY_CODEC.encode_metadata(SCAN_CURSOR_SECRET_METADATA),
+    ])
+    assert get_key_count(db) == 0
@@ -1,5 +1,6 @@
 import glob
 import os.path
+import time
 
 import pytest
 import redis
@@ -33,6 +34,43 @@ def test_flush_db():
     assert r1.keys('*') == ['test2']
 
 
+def test_async_flushes():
+    r0 = fresh_redis(db=0)
+    r1 = fresh_redis(db=1)
+    r0.set('test1', 'value1')
+    r1.set('test2', 'value2')
+
+    assert r1.execute_command('FLUSHDB', 'ASYNC') is True
+    assert r0.keys('*') == ['test1']
+    assert r1.keys('*') == []
+    assert r0.execute_command('FLUSHALL', 'ASYNC') is True
+    assert r0.keys('*') == []
+    assert r0.execute_command('FLUSHALL', 'SYNC') is True
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r0.execute_command('FLUSHDB', 'foo')
+    assert str(exc.value) == 'syntax error'
+
+
+def test_swapdb():
+    r0 = fresh_redis(db=0)
+    r1 = fresh_redis(db=1)
+    r0.set('test1', 'value1')
+    r0.sadd('set', 'a')
+
+    assert r0.execute_command('SWAPDB', 0, 1) == 'OK'
+    assert r0.keys('*') == []
+    assert sorted(r1.keys('*')) == ['set', 'test1']
+    assert r1.smembers('set') == {'a'}
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r0.execute_command('SWAPDB', 'a', '1')
+    assert str(exc.value) == 'invalid first DB index'
+    with pytest.raises(redis.ResponseError) as exc:
+        r0.execute_command('SWAPDB', '0', '16')
+    assert str(exc.value) == 'DB index is out of range'
+
+
 def test_ping():
     r = fresh_redis()
 
@@ -52,6 +90,40 @@ def test_dbsize():
     assert r1.dbsize() == 0
 
 
+def test_dbsize_after_writes():
+    r = fresh_redis()
+
+    r.set('str', 'value')
+    r.set('str', 'new value')
+    r.mset({'str': 'value', 'str2': 'value'})
+    r.sadd('set', 'a', 'b')
+    r.hset('hash', 'field', 'value')
+    r.hsetnx('hash2', 'field', 'value')
+    r.zadd('zset', 1, 'a')
+    r.zadd('zset', 2, 'b')
+    assert r.dbsize() == 6
+
+    r.srem('set', 'a', 'b')
+    r.hdel('hash2', 'field')
+    r.zrem('zset', 'a')
+    assert r.dbsize() == 4
+
+    r.rename('str2', 'str')
+    r.rename('hash', 'newhash')
+    assert r.dbsize() == 3
+
+    r.sadd('set1', 'a')
+    r.sadd('set2', 'b')
+    assert r.sunionstore('union', 'set1', 'set2') == 2
+    assert r.sinterstore('str', 'set1', 'set2') == 0
+    assert r.zunionstore('zset', ['zset', 'notfound']) == 1
+    assert r.dbsize() == 5
+
+    r.delete('set1', 'set2', 'union', 'notfound')
+    assert r.dbsize() == 2
+    assert r.dbsize() == len(r.keys('*'))
+
+
 def test_save_creates_an_rdb_file():
     r = fresh_redis()
     root_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # 2 directory levels up
@@ -62,6 +134,24 @@ def test_save_creates_an_rdb_file():
     assert len(set(glob.glob(os.path.join(root_dir, 'dump*.rdb'))) - rdb_files_before) == 1
 
 
+def test_bgsave_creates_an_rdb_file():
+    r = fresh_redis()
+    root_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # 2 directory levels up
+    lastsave_before = r.lastsave()
+
+    r.set('test', 'value')
+    started = time.time()
+    assert r.bgsave()
+    deadline = time.time() + 5
+    while r.info('persistence')['rdb_bgsave_in_progress']:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert r.info('persistence')['rdb_last_bgsave_status'] == 'ok'
+    assert r.lastsave() >= lastsave_before
+    # the file name has a precision of seconds, thus the file of the previous test may be replaced
+    assert max(os.path.getmtime(filename) for filename in glob.glob(os.path.join(root_dir, 'dump*.rdb'))) >= int(started)
+
+
 def test_config_help():
     r = fresh_redis()
     result = r.execute_command('CONFIG', 'HELP')
@@ -99,7 +189,7 @@ def test_config_set_with_unknown_config():
 def test_config_get():
     r = fresh_redis()
 
-    assert sorted(r.config_get('*').keys()) == sorted(['debug', 'readonly', 'requirepass'])
+    assert sorted(r.config_get('*').keys()) == sorted(['debug', 'rdbcompression', 'readonly', 'requirepass'])
     assert r.config_get('*deb*').keys() == ['debug']
 
 
@@ -117,3 +207,33 @@ def test_config_set():
     finally:
         # undo it to not affect other tests
         assert r.config_set('debug', original_value)
+
+
+def test_info():
+    r = fresh_redis()
+
+    info = r.info()
+    assert info['dredis_version']
+    assert info['total_commands_processed'] > 0
+    assert 'gc_pending_markers' in info
+    assert set(r.info('gc')) == {
+        'gc_pending_markers', 'gc_pending_keys_estimate', 'gc_deleted_keys', 'gc_deletion_rate', 'gc_last_pause_ms',
+        'gc_total_pause_ms', 'gc_batch_size', 'gc_interval_ms',
+    }
+
+
+def test_compact():
+    r = fresh_redis()
+    r.sadd('myset', 'a', 'b')
+    completed = r.info('compaction')['compaction_completed']
+
+    assert r.execute_command('COMPACT') == 'Background compaction scheduled'
+    deadline = time.time() + 5
+    while r.info('compaction')['compaction_completed'] == completed:
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert r.smembers('myset') == {'a', 'b'}
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('COMPACT', 'foo')
+    assert str(exc.value) == 'syntax error'
@@ -1,3 +1,6 @@
+import pytest
+import redis
+
 from tests.helpers import fresh_redis
 
 
@@ -8,6 +11,26 @@ def test_sadd():
     assert r.sadd('myset', 'myvalue2') == 1
 
 
+def test_sadd_with_multiple_members():
+    r = fresh_redis()
+    assert r.sadd('myset', 'a', 'b', 'a') == 2
+    assert r.sadd('myset', 'b', 'c') == 1
+    assert r.scard('myset') == 3
+    assert r.smembers('myset') == {'a', 'b', 'c'}
+
+
+def test_srem():
+    r = fresh_redis()
+    r.sadd('myset', 'a', 'b', 'c')
+
+    assert r.srem('myset', 'a', 'a', 'notfound') == 1
+    assert r.smembers('myset') == {'b', 'c'}
+    assert r.scard('myset') == 2
+    assert r.srem('notfound', 'a') == 0
+    assert r.srem('myset', 'b', 'c') == 2
+    assert r.exists('myset') == 0
+
+
 def test_sismember():
     r = fresh_redis()
     r.sadd('myset', 'myvalue1')
@@ -18,6 +41,14 @@ def test_sismember():
     assert r.sismember('myset', 'myvalue3') is False
 
 
+def test_smismember():
+    r = fresh_redis()
+    r.sadd('myset', 'a', 'b')
+
+    assert r.execute_command('SMISMEMBER', 'myset', 'a', 'c', 'b') == [1, 0, 1]
+    assert r.execute_command('SMISMEMBER', 'notfound', 'a', 'b') == [0, 0]
+
+
 def test_smembers():
     r = fresh_redis()
     r.sadd('myset', 'myvalue1')
@@ -33,3 +64,117 @@ def test_scard():
 
     assert r.scard('myset') == 2
     assert r.scard('notfound') == 0
+
+
+def test_sinter():
+    r = fresh_redis()
+    r.sadd('myset1', 'a', 'b', 'c', 'd')
+    r.sadd('myset2', 'c', 'd', 'e')
+    r.sadd('myset3', 'a', 'c', 'd')
+
+    assert r.sinter('myset1', 'myset2', 'myset3') == {'c', 'd'}
+    assert r.sinter('myset1') == {'a', 'b', 'c', 'd'}
+    assert r.sinter('myset1', 'notfound') == set()
+
+
+def test_sinterstore():
+    r = fresh_redis()
+    r.sadd('myset1', 'a', 'b', 'c')
+    r.sadd('myset2', 'b', 'c', 'd')
+    r.set('result', 'test')
+
+    assert r.sinterstore('result', 'myset1', 'myset2') == 2
+    assert r.smembers('result') == {'b', 'c'}
+    assert r.sinterstore('myset1', 'myset1', 'result') == 2
+    assert r.smembers('myset1') == {'b', 'c'}
+    assert r.sinterstore('result', 'myset1', 'notfound') == 0
+    assert r.exists('result') == 0
+
+
+def test_sintercard():
+    r = fresh_redis()
+    r.sadd('myset1', 'a', 'b', 'c', 'd')
+    r.sadd('myset2', 'b', 'c', 'd', 'e')
+
+    assert r.execute_command('SINTERCARD', 2, 'myset1', 'myset2') == 3
+    assert r.execute_command('SINTERCARD', 2, 'myset1', 'myset2', 'LIMIT', 2) == 2
+    assert r.execute_command('SINTERCARD', 2, 'myset1', 'myset2', 'LIMIT', 0) == 3
+    assert r.execute_command('SINTERCARD', 2, 'myset1', 'notfound') == 0
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('SINTERCARD', 0, 'myset1')
+    assert str(exc.value) == 'numkeys should be greater than 0'
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('SINTERCARD', 3, 'myset1', 'myset2')
+    assert str(exc.value) == "Number of keys can't be greater than number of args"
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('SINTERCARD', 1, 'myset1', 'LIMIT', -1)
+    assert str(exc.value) == "LIMIT can't be negative"
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('SINTERCARD', 1, 'myset1', 'myset2')
+    assert str(exc.value) == 'syntax error'
+
+
+def test_sunion_and_sunionstore():
+    r = fresh_redis()
+    r.sadd('myset1', 'a', 'b')
+    r.sadd('myset2', 'b', 'c')
+
+    assert r.sunion('myset1', 'myset2', 'notfound') == {'a', 'b', 'c'}
+    assert r.sunionstore('result', 'myset1', 'myset2') == 3
+    assert r.smembers('result') == {'a', 'b', 'c'}
+    assert r.sunionstore('result', 'notfound') == 0
+    assert r.exists('result') == 0
+
+
+def test_sdiff_and_sdiffstore():
+    r = fresh_redis()
+    r.sadd('myset1', 'a', 'b', 'c', 'd')
+    r.sadd('myset2', 'b')
+    r.sadd('myset3', 'd', 'e')
+
+    assert r.sdiff('myset1', 'myset2', 'myset3') == {'a', 'c'}
+    assert r.sdiff('myset1', 'notfound') == {'a', 'b', 'c', 'd'}
+    assert r.sdiff('notfound', 'myset1') == set()
+    assert r.sdiffstore('result', 'myset1', 'myset2', 'myset3') == 2
+    assert r.smembers('result') == {'a', 'c'}
+    assert r.sdiffstore('myset1', 'myset1', 'result') == 2
+    assert r.smembers('myset1') == {'b', 'd'}
+
+
+def test_sscan():
+    r = fresh_redis()
+    r.sadd('myset', 'user:1', 'user:2', 'user:3', 'other')
+
+    members = []
+    cursor = 0
+    while True:
+        cursor, batch = r.sscan('myset', cursor, count=1)
+        assert len(batch) <= 1
+        members.extend(batch)
+        if cursor == 0:
+            break
+    assert members == ['other', 'user:1', 'user:2', 'user:3']
+    assert r.sscan('myset', 0, match='user:*', count=10) == (0, ['user:1', 'user:2', 'user:3'])
+    assert r.sscan('notfound', 0) == (0, [])
+
+
+def test_sscan_with_invalid_cursor():
+    r = fresh_redis()
+    r.sadd('myset1', 'a', 'b')
+    r.sadd('myset2', 'a', 'b')
+
+    cursor, _ = r.sscan('myset1', 0, count=1)
+    assert r.sscan('myset1', 123) == (0, [])
+    # cursors are only valid for the key they were created for
+    assert r.sscan('myset2', cursor) == (0, [])
+    assert r.sscan('myset1', cursor) == (0, ['b'])
+
+
+def test_sscan_with_invalid_count():
+    r = fresh_redis()
+    r.sadd('myset', 'a', 'b')
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.sscan('myset', 0, count=0)
+    assert str(exc.value) == 'syntax error'
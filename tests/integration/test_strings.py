@@ -82,3 +82,36 @@ def test_get_arity():
     with pytest.raises(redis.ResponseError) as exc:
         r.execute_command('GET')
     assert str(exc.value) == "wrong number of arguments for 'get' command"
+
+
+def test_mget():
+    r = fresh_redis()
+    r.set('foo', 'bar')
+    r.set('empty', '')
+    r.sadd('myset', 'a')
+
+    assert r.mget('foo', 'notfound', 'empty', 'myset', 'foo') == ['bar', None, '', None, 'bar']
+
+
+def test_mset():
+    r = fresh_redis()
+    r.set('foo', 'old')
+
+    assert r.execute_command('MSET', 'foo', 'bar', 'baz', 'qux', 'foo', 'new') is True
+    assert r.mget('foo', 'baz') == ['new', 'qux']
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('MSET', 'foo', 'bar', 'baz')
+    assert str(exc.value) == "wrong number of arguments for 'mset' command"
+
+
+def test_msetnx():
+    r = fresh_redis()
+    r.set('foo', 'bar')
+    r.sadd('myset', 'a')
+
+    assert r.execute_command('MSETNX', 'key1', 'value1', 'foo', 'new') == 0
+    assert r.execute_command('MSETNX', 'key1', 'value1', 'myset', 'new') == 0
+    assert r.mget('key1', 'foo') == [None, 'bar']
+    assert r.execute_command('MSETNX', 'key1', 'value1', 'key2', 'value2') == 1
+    assert r.mget('key1', 'key2') == ['value1', 'value2']
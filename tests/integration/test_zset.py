@@ -118,6 +118,19 @@ def test_zrem():
     assert r.zcard('myzset') == 3
 
 
+def test_zrem_with_repeated_members():
+    r = fresh_redis()
+    r.zadd('myzset', 0, 'a', 1, 'b', 2, 'c')
+
+    assert r.zrem('myzset', 'a', 'a') == 1
+    assert r.zcard('myzset') == 2
+    assert r.zadd('myzset', 3, 'd') == 1
+    assert r.zrank('myzset', 'd') == 2
+    assert r.zrem('myzset', 'b', 'b', 'notfound') == 1
+    assert r.zrange('myzset', 0, -1, withscores=True) == [('c', 2), ('d', 3)]
+    assert r.zrank('myzset', 'd') == 1
+
+
 def test_zscore():
     r = fresh_redis()
 
@@ -187,6 +200,92 @@ def test_zrank():
     assert r.zrank('myzset', 'notfound') is None
 
 
+def test_zrevrank():
+    r = fresh_redis()
+
+    r.zadd('myzset', 0, 'zero')
+    r.zadd('myzset', 100, 'one')
+    r.zadd('myzset', 200, 'two')
+
+    assert r.zrevrank('myzset', 'zero') == 2
+    assert r.zrevrank('myzset', 'one') == 1
+    assert r.zrevrank('myzset', 'two') == 0
+    assert r.zrevrank('myzset', 'notfound') is None
+    assert r.zrevrank('notfound', 'zero') is None
+
+
+def test_zrevrange():
+    r = fresh_redis()
+
+    r.zadd('myzset', 0, 'zero', 1, 'one', 2, 'two', 3, 'three')
+
+    assert r.zrevrange('myzset', 0, -1) == ['three', 'two', 'one', 'zero']
+    assert r.zrevrange('myzset', 0, 1, withscores=True) == [('three', 3), ('two', 2)]
+    assert r.zrevrange('myzset', 1, 2) == ['two', 'one']
+    assert r.zrevrange('myzset', -2, -1) == ['one', 'zero']
+    assert r.zrevrange('myzset', 2, 100) == ['one', 'zero']
+    assert r.zrevrange('myzset', 4, 10) == []
+    assert r.zrevrange('myzset', 2, 1) == []
+    assert r.zrevrange('notfound', 0, -1) == []
+
+
+def test_zrevrangebyscore():
+    r = fresh_redis()
+
+    r.zadd('myzset', 0, 'zero', 1, 'one', 1, 'uno', 2, 'two', 3, 'three')
+    r.zadd('otherzset', 10, 'ten')
+
+    assert r.zrevrangebyscore('myzset', '+inf', '-inf') == ['three', 'two', 'uno', 'one', 'zero']
+    assert r.zrevrangebyscore('myzset', 2, 1, withscores=True) == [('two', 2), ('uno', 1), ('one', 1)]
+    assert r.zrevrangebyscore('myzset', '(2', '(0') == ['uno', 'one']
+    assert r.zrevrangebyscore('myzset', '+inf', 0, start=1, num=2) == ['two', 'uno']
+    assert r.zrevrangebyscore('myzset', 1, '-inf', start=2, num=5) == ['zero']
+    assert r.zrevrangebyscore('myzset', 1, '-inf', start=3, num=5) == []
+    assert r.zrevrangebyscore('myzset', 0, 1) == []
+
+
+def test_zrange_rev_byscore_limit():
+    r = fresh_redis()
+
+    r.zadd('myzset', 0, 'zero', 1, 'one', 2, 'two', 3, 'three')
+
+    assert r.execute_command('ZRANGE', 'myzset', 0, 1, 'REV') == ['three', 'two']
+    assert r.execute_command('ZRANGE', 'myzset', 1, 2, 'BYSCORE') == ['one', 'two']
+    assert r.execute_command('ZRANGE', 'myzset', '+inf', 1, 'BYSCORE', 'REV', 'LIMIT', 1, 2, 'WITHSCORES') == \
+        ['two', '2', 'one', '1']
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZRANGE', 'myzset', 0, 1, 'LIMIT', 0, 1)
+    assert str(exc.value) == 'syntax error, LIMIT is only supported in combination with either BYSCORE or BYLEX'
+
+
+def test_zrank_and_zrange_with_large_zsets():
+    r = fresh_redis()
+    members = ['member{:04}'.format(i) for i in range(1000)]
+    for i, member in enumerate(members):
+        r.zadd('myzset', i % 10, member)
+    expected = sorted(members, key=lambda m: (int(m[6:]) % 10, m))
+
+    assert r.zrank('myzset', expected[0]) == 0
+    assert r.zrank('myzset', expected[567]) == 567
+    assert r.zrange('myzset', 990, -1) == expected[990:]
+    assert r.zrange('myzset', 500, 502, withscores=True) == [(m, int(m[6:]) % 10) for m in expected[500:503]]
+    assert r.zrange('myzset', 1000, 2000) == []
+
+    assert r.zcount('myzset', 3, '(5') == 200
+    assert r.zrangebyscore('myzset', 3, '(5', start=150, num=3) == expected[450:453]
+    assert r.zrangebyscore('myzset', 3, '(5', start=199, num=3) == expected[499:500]
+    assert r.zrangebyscore('myzset', 3, '(5', start=200, num=3) == []
+
+    assert r.zrevrange('myzset', 0, 2) == expected[:-4:-1]
+    assert r.zrevrange('myzset', 600, 601) == [expected[399], expected[398]]
+    assert r.zrevrank('myzset', expected[0]) == 999
+    assert r.zrevrangebyscore('myzset', '(5', 3, start=10, num=2) == [expected[489], expected[488]]
+
+    r.zrem('myzset', *expected[:900])
+    assert r.zrank('myzset', expected[950]) == 50
+    assert r.zrange('myzset', 50, 51) == expected[950:952]
+
+
 def test_zsets_should_support_floats_as_score_and_ranges():
     r = fresh_redis()
 
@@ -225,6 +324,26 @@ def test_zcount():
     assert r.zcount('myzset', 0, 10) == 2
 
 
+def test_zcount_and_zrangebyscore_bounds():
+    r = fresh_redis()
+
+    r.zadd('myzset', '-inf', 'minf', -1, 'a', '-0', 'b', 0, 'c', 1, 'd', 1, 'e', '+inf', 'pinf')
+    r.zadd('otherzset', 0, 'x')
+
+    assert r.zcount('myzset', '-inf', '+inf') == 7
+    assert r.zcount('myzset', '(-inf', '(+inf') == 5
+    assert r.zcount('myzset', 0, 0) == 2
+    assert r.zcount('myzset', '(0', '+inf') == 3
+    assert r.zcount('myzset', '-inf', '(0') == 2
+    assert r.zcount('myzset', '(1', '(1') == 0
+    assert r.zcount('myzset', 2, 1) == 0
+    assert r.zrangebyscore('myzset', '(0', 1) == ['d', 'e']
+    assert r.zrangebyscore('myzset', '-0', '(1') == ['b', 'c']
+    assert r.zrangebyscore('myzset', '(1', '+inf') == ['pinf']
+    assert r.zrangebyscore('myzset', 5, '+inf') == ['pinf']
+    assert r.zrangebyscore('myzset', 5, 10) == []
+
+
 def test_zuinionstore():
     # doesn't support AGGREGATE at the moment
     '''ZUNIONSTORE destination numkeys key [key ...] [WEIGHTS weight [weight ...]] [AGGREGATE SUM|MIN|MAX]'''
@@ -260,6 +379,113 @@ def test_zuinionstore():
     ]
 
 
+def test_zunionstore_aggregate():
+    r = fresh_redis()
+
+    r.zadd('myzset1', 1, 'a', 2, 'b')
+    r.zadd('myzset2', 3, 'b', 4, 'c')
+
+    assert r.zunionstore('result', ['myzset1', 'myzset2'], aggregate='MIN') == 3
+    assert r.zrange('result', 0, -1, withscores=True) == [('a', 1), ('b', 2), ('c', 4)]
+    assert r.zunionstore('result', {'myzset1': 2, 'myzset2': 1}, aggregate='max') == 3
+    assert r.zrange('result', 0, -1, withscores=True) == [('a', 2), ('b', 4), ('c', 4)]
+    assert r.zunionstore('result', ['myzset1', 'myzset2'], aggregate='sum') == 3
+    assert r.zrange('result', 0, -1, withscores=True) == [('a', 1), ('c', 4), ('b', 5)]
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZUNIONSTORE', 'result', 2, 'myzset1', 'myzset2', 'AGGREGATE', 'avg')
+    assert str(exc.value) == 'syntax error'
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZUNIONSTORE', 'result', 2, 'myzset1', 'myzset2', 'WEIGHTS', 1, 'x')
+    assert str(exc.value) == 'weight value is not a float'
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZUNIONSTORE', 'result', 0, 'myzset1')
+    assert 'at least 1 input key is needed' in str(exc.value)
+
+
+def test_zunionstore_replaces_destination():
+    r = fresh_redis()
+
+    r.zadd('myzset1', 1, 'a', 2, 'b')
+    r.zadd('result', 10, 'old')
+    r.set('mystring', 'test')
+
+    assert r.zunionstore('result', ['myzset1']) == 2
+    assert r.zrange('result', 0, -1, withscores=True) == [('a', 1), ('b', 2)]
+    assert r.zunionstore('mystring', ['myzset1', 'notfound']) == 2
+    assert r.type('mystring') == 'zset'
+    assert r.zunionstore('myzset1', {'myzset1': 2, 'result': 1}) == 2
+    assert r.zrange('myzset1', 0, -1, withscores=True) == [('a', 3), ('b', 6)]
+    assert r.zrank('myzset1', 'b') == 1
+    assert r.zunionstore('result', ['notfound']) == 0
+    assert r.exists('result') == 0
+
+
+def test_zinterstore():
+    r = fresh_redis()
+
+    r.zadd('myzset1', 1, 'a', 2, 'b', 3, 'c')
+    r.zadd('myzset2', 10, 'b', 20, 'c', 30, 'd')
+    r.zadd('myzset3', 100, 'c', 200, 'b', 300, 'e')
+    r.zadd('result', 1, 'old')
+
+    assert r.zinterstore('result', ['myzset1', 'myzset2', 'myzset3']) == 2
+    assert r.zrange('result', 0, -1, withscores=True) == [('c', 123), ('b', 212)]
+    assert r.zinterstore('result', {'myzset1': 2, 'myzset2': 0.5}, aggregate='MAX') == 2
+    assert r.zrange('result', 0, -1, withscores=True) == [('b', 5), ('c', 10)]
+    assert r.zinterstore('result', ['myzset1', 'myzset2'], aggregate='min') == 2
+    assert r.zrange('result', 0, -1, withscores=True) == [('b', 2), ('c', 3)]
+    assert r.zinterstore('myzset1', ['myzset1', 'myzset1']) == 3
+    assert r.zrange('myzset1', 0, -1, withscores=True) == [('a', 2), ('b', 4), ('c', 6)]
+    assert r.zinterstore('result', ['myzset1', 'notfound']) == 0
+    assert r.exists('result') == 0
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZINTERSTORE', 'result', 2, 'myzset1')
+    assert str(exc.value) == 'syntax error'
+
+
+def test_zinter():
+    r = fresh_redis()
+
+    r.zadd('myzset1', 1, 'a', 2, 'b', 3, 'c')
+    r.zadd('myzset2', 30, 'a', 20, 'b', 10, 'd')
+
+    assert r.execute_command('ZINTER', 2, 'myzset1', 'myzset2') == ['b', 'a']
+    assert r.execute_command('ZINTER', 2, 'myzset1', 'myzset2', 'WITHSCORES') == ['b', '22', 'a', '31']
+    assert r.execute_command('ZINTER', 2, 'myzset1', 'myzset2', 'WEIGHTS', 1, 0, 'AGGREGATE', 'MAX', 'WITHSCORES') == \
+        ['a', '1', 'b', '2']
+    assert r.execute_command('ZINTER', 2, 'myzset1', 'notfound') == []
+    assert r.zcard('myzset1') == 3
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZINTER', 0, 'myzset1')
+    assert str(exc.value) == 'at least 1 input key is needed for ZINTER'
+
+
+def test_zdiffstore():
+    r = fresh_redis()
+
+    r.zadd('myzset1', 1, 'a', 2, 'b', 3, 'c', 4, 'd')
+    r.zadd('myzset2', 10, 'b')
+    r.zadd('myzset3', 10, 'c', 20, 'e')
+    r.set('result', 'test')
+
+    assert r.execute_command('ZDIFFSTORE', 'result', 3, 'myzset1', 'myzset2', 'myzset3') == 2
+    assert r.zrange('result', 0, -1, withscores=True) == [('a', 1), ('d', 4)]
+    assert r.execute_command('ZDIFFSTORE', 'result', 2, 'myzset1', 'notfound') == 4
+    assert r.zcard('result') == 4
+    assert r.execute_command('ZDIFFSTORE', 'result', 2, 'myzset2', 'myzset1') == 0
+    assert r.exists('result') == 0
+
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZDIFFSTORE', 'result', 2, 'myzset1')
+    assert str(exc.value) == 'syntax error'
+    with pytest.raises(redis.ResponseError) as exc:
+        r.execute_command('ZDIFFSTORE', 'result', 0, 'myzset1')
+    assert str(exc.value) == 'at least 1 input key is needed for ZDIFFSTORE'
+
+
 def test_empty_zset_after_zrem_should_be_removed_from_keyspace():
     r = fresh_redis()
 
@@ -431,6 +657,17 @@ def test_zscan_with_a_subset_of_elements_returned():
     assert sorted(pairs) == sorted(found_elems)
 
 
+def test_zscan_with_literal_prefix():
+    r = fresh_redis()
+
+    r.zadd('myzset', 3, 'a', 2, 'ab', 1, 'abc', 0, 'b')
+    r.zadd('myzset2', 0, 'abcd')
+
+    cursor, elements = r.zscan('myzset', 0, match='ab*')
+    assert cursor == 0
+    assert sorted(elements) == [('ab', 2), ('abc', 1)]
+
+
 def test_zscan_with_a_subset_of_matching_elements_returned():
     r = fresh_redis()
 
@@ -500,6 +737,33 @@ def test_zadd_nx_should_only_add_if_element_isnt_present():
     ]
 
 
+def test_zmscore():
+    r = fresh_redis()
+    r.zadd('myzset', 1.5, 'a', -2, 'b')
+
+    assert r.execute_command('ZMSCORE', 'myzset', 'a', 'c', 'b') == ['1.5', None, '-2']
+    assert r.execute_command('ZMSCORE', 'notfound', 'a') == [None]
+
+
+def test_zadd_with_repeated_members():
+    r = fresh_redis()
+
+    assert r.execute_command('ZADD', 'myzset', 1, 'a', 2, 'b', 3, 'a') == 2
+    assert r.zrange('myzset', 0, -1, withscores=True) == [('b', 2), ('a', 3)]
+    assert r.execute_command('ZADD', 'myzset', 'NX', 5, 'c', 6, 'c', 7, 'a') == 1
+    assert r.zrange('myzset', 0, -1, withscores=True) == [('b', 2), ('a', 3), ('c', 5)]
+    assert r.execute_command('ZADD', 'myzset', 'XX', 5, 'd', 4, 'a', 1, 'b') == 0
+    assert r.zrange('myzset', 0, -1, withscores=True) == [('b', 1), ('a', 4), ('c', 5)]
+
+
+def test_zadd_should_validate_all_scores_before_adding():
+    r = fresh_redis()
+
+    with pytest.raises(redis.ResponseError):
+        r.execute_command('ZADD', 'myzset', 1, 'a', 'invalid', 'b')
+    assert r.exists('myzset') == 0
+
+
 def test_zadd_xx_should_never_add_new_elements():
     r = fresh_redis()
 
@@ -26,6 +26,7 @@ EXPECTED_ARITY = {
     'client': -2,
     'cluster': -2,
     'command': 0,
+    'compact': -1,
     'config': -2,
     'dbsize': 1,
     'debug': -1,
@@ -143,11 +144,13 @@ EXPECTED_ARITY = {
     'setrange': 4,
     'shutdown': -1,
     'sinter': -2,
+    'sintercard': -3,
     'sinterstore': -3,
     'sismember': 3,
     'slaveof': 3,
     'slowlog': -2,
     'smembers': 2,
+    'smismember': -3,
     'smove': 4,
     'sort': -2,
     'spop': -2,
@@ -173,9 +176,12 @@ EXPECTED_ARITY = {
     'zadd': -4,
     'zcard': 2,
     'zcount': 4,
+    'zdiffstore': -4,
     'zincrby': 4,
+    'zinter': -3,
     'zinterstore': -4,
     'zlexcount': 4,
+    'zmscore': -3,
     'zrange': -4,
     'zrangebylex': -4,
     'zrangebyscore': -4,
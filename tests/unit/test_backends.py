@@ -0,0 +1,81 @@
+import pytest
+
+from dredis.db import DB_BACKENDS, compact_range, delete_range, get_many, get_prefix_upper_bound
+
+
+@pytest.fixture(params=sorted(DB_BACKENDS))
+def db(request, tmpdir):
+    db = DB_BACKENDS[request.param](bytes(tmpdir))
+    for key in ['a', 'b', 'ba', 'bb', 'b\xff', 'c', '\xff']:
+        db.put(key, key.upper())
+    yield db
+    db.close()
+
+
+def keys(db, **kwargs):
+    return list(db.iterator(include_value=False, **kwargs))
+
+
+def test_iterator(db):
+    assert keys(db) == ['a', 'b', 'ba', 'bb', 'b\xff', 'c', '\xff']
+    assert keys(db, prefix='b') == ['b', 'ba', 'bb', 'b\xff']
+    assert keys(db, start='b') == ['b', 'ba', 'bb', 'b\xff', 'c', '\xff']
+    assert keys(db, start='bb', stop='c') == ['bb', 'b\xff']
+    assert keys(db, start='d') == ['\xff']
+    assert keys(db, prefix='d') == []
+    assert list(db.iterator(prefix='ba')) == [('ba', 'BA')]
+
+
+def test_reverse_iterator(db):
+    assert keys(db, reverse=True) == ['\xff', 'c', 'b\xff', 'bb', 'ba', 'b', 'a']
+    assert keys(db, stop='c', reverse=True) == ['b\xff', 'bb', 'ba', 'b', 'a']
+    assert keys(db, stop='bb', reverse=True) == ['ba', 'b', 'a']
+    assert keys(db, stop='a', reverse=True) == []
+    assert list(db.iterator(stop='\xff', reverse=True))[0] == ('c', 'C')
+
+
+def test_reverse_iterator_with_keys_deleted_while_iterating(db):
+    result = []
+    for key in db.iterator(stop='c', reverse=True, include_value=False):
+        db.delete(key)
+        result.append(key)
+    assert result == ['b\xff', 'bb', 'ba', 'b', 'a']
+    assert keys(db) == ['c', '\xff']
+
+
+def test_get_many(db):
+    assert get_many(db, ['b', 'notfound', 'a', 'b']) == ['B', None, 'A', 'B']
+    assert get_many(db, ['c']) == ['C']
+    assert get_many(db, []) == []
+
+
+def test_write_batch(db):
+    with db.write_batch() as batch:
+        batch.put('\xff\xff', 'FF')
+        batch.put('0', 'ZERO')
+        batch.put('bb', 'BB2')
+        batch.delete('c')
+    assert list(db.iterator()) == [('0', 'ZERO'), ('a', 'A'), ('b', 'B'), ('ba', 'BA'), ('bb', 'BB2'), ('b\xff', 'B\xff'),
+                                   ('\xff', '\xff'), ('\xff\xff', 'FF')]
+    # keys after all stored keys are appended
+    with db.write_batch() as batch:
+        batch.put('\xff\xff\xff', 'FFF')
+        batch.put('\xff\xff\x00', 'FF0')
+    assert keys(db, start='\xff\xff') == ['\xff\xff', '\xff\xff\x00', '\xff\xff\xff']
+
+
+def test_delete_range(db):
+    assert delete_range(db, 'b', 'c', limit=2) == (2, 'bb')
+    assert keys(db) == ['a', 'bb', 'b\xff', 'c', '\xff']
+    assert delete_range(db, 'bb', 'c', limit=2) == (2, None)
+    assert delete_range(db, 'bb', 'c') == (0, None)
+    assert delete_range(db, 'c', None) == (2, None)
+    assert keys(db) == ['a']
+    compact_range(db, 'b', 'c')
+    assert keys(db) == ['a']
+
+
+def test_prefix_upper_bound():
+    assert get_prefix_upper_bound('ab') == 'ac'
+    assert get_prefix_upper_bound('a\xff') == 'b'
+    assert get_prefix_upper_bound('\xff\xff') is None
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+
+import pytest
+
+from dredis import compaction, db, persistence
+from dredis.compaction import CompactionScheduler, CompactionStats, get_garbage_estimate, parse_window, is_in_window
+from dredis.db import DB_MANAGER
+from dredis.gc import KeyGarbageCollector, GC_STATS
+from dredis.keyspace import Keyspace
+
+
+@pytest.fixture
+def compaction_stats(monkeypatch):
+    stats = CompactionStats()
+    stats.gc_deleted_keys_at_compaction = list(GC_STATS.deleted_keys_per_db)
+    monkeypatch.setattr(compaction, 'COMPACTION_STATS', stats)
+    return stats
+
+
+def setup_keyspace(tmpdir, backend):
+    DB_MANAGER.setup_dbs(bytes(tmpdir), backend=backend, backend_options={})
+    keyspace = Keyspace()
+    keyspace.set('str', 'value')
+    keyspace.sadd('myset', *map(str, range(10000)))
+    keyspace.delete('myset')
+    while KeyGarbageCollector().collect():
+        pass
+    return keyspace
+
+
+def test_parse_window():
+    assert parse_window('02:00-05:30') == (120, 330)
+    with pytest.raises(ValueError):
+        parse_window('02:00')
+    with pytest.raises(ValueError):
+        parse_window('25:00-05:00')
+
+
+def test_is_in_window():
+    def at(hour, minute):
+        return time.mktime((2020, 1, 1, hour, minute, 0, 0, 0, -1))
+
+    assert is_in_window((120, 300), at(2, 0))
+    assert not is_in_window((120, 300), at(5, 0))
+    # windows can end after midnight
+    assert is_in_window((23 * 60, 60), at(23, 30))
+    assert is_in_window((23 * 60, 60), at(0, 30))
+    assert not is_in_window((23 * 60, 60), at(12, 0))
+
+
+def test_gc_volume_triggers_compaction(tmpdir, compaction_stats):
+    keyspace = setup_keyspace(tmpdir, 'leveldb')
+    assert get_garbage_estimate(0) == 10001
+
+    assert not CompactionScheduler(threshold=20000).step()
+    scheduler = CompactionScheduler(threshold=10000)
+    assert scheduler.step()
+    assert get_garbage_estimate(0) == 0
+    assert compaction_stats.completed == 1
+    assert compaction_stats.progress == 100.0
+    assert compaction_stats.current_db is None
+    assert not scheduler.step()
+    assert keyspace.get('str') == 'value'
+
+
+def test_window_triggers_compaction(tmpdir, compaction_stats, monkeypatch):
+    setup_keyspace(tmpdir, 'leveldb')
+    monkeypatch.setattr(compaction, 'is_in_window', lambda window, now: False)
+    assert not CompactionScheduler(threshold=0, window=(0, 60)).step()
+    monkeypatch.setattr(compaction, 'is_in_window', lambda window, now: True)
+    assert CompactionScheduler(threshold=0, window=(0, 60)).step()
+    assert compaction_stats.completed == 1
+
+
+def test_leveldb_compaction_in_slices(tmpdir, compaction_stats, monkeypatch):
+    keyspace = setup_keyspace(tmpdir, 'leveldb')
+    keyspace.sadd('myset2', *map(str, range(100)))
+    monkeypatch.setattr(compaction, 'SLICE_SIZE', 10)
+    keyspace.compact()
+
+    assert CompactionScheduler().step()
+    assert compaction_stats.compacted_keys == len(list(DB_MANAGER.get_db(0).iterator()))
+    assert keyspace.scard('myset2') == 100
+
+
+def test_lmdb_rebuild(tmpdir, compaction_stats):
+    keyspace = setup_keyspace(tmpdir, 'lmdb')
+    data_file = os.path.join(DB_MANAGER.get_directory(0), 'data.mdb')
+    # the file is sparse, its size is the map size
+    disk_usage_before = os.stat(data_file).st_blocks
+    keyspace.compact()
+    scheduler = CompactionScheduler()
+
+    assert scheduler.step()
+    assert compaction_stats.current_db == 0
+    # the files are replaced by the event loop
+    assert not scheduler.step()
+    scheduler.finish_rebuild()
+
+    assert compaction_stats.completed == 1
+    assert compaction_stats.current_db is None
+    assert os.stat(data_file).st_blocks < disk_usage_before
+    assert keyspace.get('str') == 'value'
+    assert keyspace.dbsize() == 1
+    keyspace.sadd('myset', 'a')
+    assert keyspace.smembers('myset') == {'a'}
+
+
+def test_lmdb_rebuild_keeps_writes_during_the_copy(tmpdir, compaction_stats):
+    keyspace = setup_keyspace(tmpdir, 'lmdb')
+    keyspace.set('str2', 'value')
+    keyspace.compact()
+    scheduler = CompactionScheduler()
+    assert scheduler.step()
+
+    keyspace.set('str', 'new value')
+    keyspace.sadd('myset', 'a', 'b')
+    keyspace.delete('str2')
+    scheduler.finish_rebuild()
+    assert compaction_stats.completed == 1
+    assert keyspace.get('str') == 'new value'
+    assert keyspace.smembers('myset') == {'a', 'b'}
+    assert keyspace.get('str2') is None
+    assert keyspace.dbsize() == 2
+    assert not os.path.exists(DB_MANAGER.get_directory(0) + compaction.COPY_DIRECTORY_SUFFIX)
+
+
+def test_lmdb_rebuild_is_discarded_after_many_writes(tmpdir, compaction_stats, monkeypatch):
+    keyspace = setup_keyspace(tmpdir, 'lmdb')
+    monkeypatch.setattr(db, 'MAX_JOURNAL_SIZE', 2)
+    keyspace.compact()
+    scheduler = CompactionScheduler()
+
+    for attempt in range(compaction.MAX_REBUILD_ATTEMPTS):
+        assert scheduler.step()
+        keyspace.sadd('myset', *map(str, range(attempt * 3, attempt * 3 + 3)))
+        scheduler.finish_rebuild()
+        assert compaction_stats.completed == 0
+        assert keyspace.scard('myset') == attempt * 3 + 3
+        assert not os.path.exists(DB_MANAGER.get_directory(0) + compaction.COPY_DIRECTORY_SUFFIX)
+    # it gives up after `MAX_REBUILD_ATTEMPTS`
+    assert compaction_stats.pending_dbs == []
+    assert dict(compaction.get_info())['compaction_failed'] == 1
+
+
+def test_lmdb_copy_doesnt_block_flushdb(tmpdir, compaction_stats, monkeypatch):
+    keyspace = setup_keyspace(tmpdir, 'lmdb')
+    copy_started = threading.Event()
+    finish_copy = threading.Event()
+    original_copy = db.LMDBBackend.copy
+
+    def slow_copy(self, path, compact=True):
+        copy_started.set()
+        finish_copy.wait(10)
+        original_copy(self, path, compact)
+
+    monkeypatch.setattr(db.LMDBBackend, 'copy', slow_copy)
+    keyspace.compact()
+    scheduler = CompactionScheduler()
+    thread = threading.Thread(target=scheduler.step)
+    thread.start()
+    assert copy_started.wait(10)
+
+    before = time.time()
+    keyspace.flushdb()
+    keyspace.set('str2', 'value')
+    # the copy waits for `finish_copy` (10 seconds)
+    assert time.time() - before < 5
+    finish_copy.set()
+    thread.join()
+
+    scheduler.finish_rebuild()
+    # the copy of the previous files is discarded
+    assert compaction_stats.completed == 0
+    assert keyspace.get('str') is None
+    assert keyspace.get('str2') == 'value'
+
+
+def test_lmdb_rebuild_waits_for_bgsave(tmpdir, compaction_stats, monkeypatch):
+    keyspace = setup_keyspace(tmpdir, 'lmdb')
+    keyspace.compact()
+    scheduler = CompactionScheduler()
+    assert scheduler.step()
+
+    # the snapshot of `BGSAVE` would be closed with the files
+    monkeypatch.setattr(persistence, 'is_saving', lambda: True)
+    scheduler.finish_rebuild()
+    assert compaction_stats.completed == 0
+    monkeypatch.setattr(persistence, 'is_saving', lambda: False)
+    scheduler.finish_rebuild()
+    assert compaction_stats.completed == 1
+    assert keyspace.get('str') == 'value'
+
+
+def test_compact_all_dbs(keyspace, compaction_stats):
+    keyspace.compact(all_dbs=True)
+    scheduler = CompactionScheduler()
+    while scheduler.step():
+        pass
+    assert compaction_stats.completed == 16
+    info = dict(compaction.get_info())
+    assert info['compaction_in_progress'] == 0
+    assert info['compaction_pending_dbs'] == 0
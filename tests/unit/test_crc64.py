@@ -0,0 +1,34 @@
+import os
+import struct
+
+import pytest
+
+from dredis import crc64
+
+
+def crc64_byte_by_byte(crc, data):
+    for byte in bytearray(data):
+        crc = crc64.crc64_tab[(crc ^ byte) & 0xff] ^ (crc >> 8)
+    return crc
+
+
+def test_check_value():
+    assert crc64.crc64(0, '123456789') == 0xe9c6d914c4b8d9ca
+    assert crc64.checksum('123456789') == struct.pack('<Q', 0xe9c6d914c4b8d9ca)
+
+
+@pytest.mark.parametrize('size', [0, 1, 7, 8, 9, 63, 64, 1000, crc64.CHUNK_SIZE * 2 + 13])
+def test_slicing_by_8_matches_the_crc64_table(size):
+    data = os.urandom(size)
+    assert crc64.crc64(0, data) == crc64_byte_by_byte(0, data)
+    assert crc64.crc64(0, bytearray(data)) == crc64_byte_by_byte(0, data)
+    assert crc64.crc64(0, buffer(data)) == crc64_byte_by_byte(0, data)
+
+
+def test_incremental_update():
+    data = os.urandom(crc64.CHUNK_SIZE + 100)
+    crc = crc64.CRC64()
+    for start in range(0, len(data), 999):
+        crc.update(data[start:start + 999])
+    assert crc.crc == crc64_byte_by_byte(0, data)
+    assert crc.digest() == crc64.checksum(data)
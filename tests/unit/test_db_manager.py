@@ -0,0 +1,93 @@
+import os
+import time
+
+import pytest
+
+from dredis.db import DB_MANAGER
+from dredis.keyspace import Keyspace
+from dredis.path import Path
+
+
+@pytest.fixture(params=['leveldb', 'lmdb'])
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def root_dir(backend, tmpdir):
+    DB_MANAGER.setup_dbs(bytes(tmpdir), backend=backend, backend_options={})
+    return bytes(tmpdir)
+
+
+def reopen_dbs(root_dir, backend):
+    for db_id in range(16):
+        DB_MANAGER.get_db(db_id).close()
+    DB_MANAGER.setup_dbs(root_dir, backend=backend, backend_options={})
+
+
+def wait_for_deleted_directories(root_dir, timeout=5):
+    deadline = time.time() + timeout
+    while any('.deleted-' in filename for filename in os.listdir(root_dir)):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_async_flush_deletes_the_files_in_the_background(root_dir):
+    keyspace = Keyspace()
+    keyspace.set('str', 'value')
+    keyspace.select(1)
+    keyspace.set('str', 'value')
+    generation = DB_MANAGER.get_generation(1)
+
+    keyspace.flushdb(asynchronous=True)
+    assert keyspace.get('str') is None
+    assert keyspace.dbsize() == 0
+    assert DB_MANAGER.get_generation(1) == generation + 2
+    keyspace.select(0)
+    assert keyspace.get('str') == 'value'
+    wait_for_deleted_directories(root_dir)
+
+    keyspace.flushall(asynchronous=True)
+    assert keyspace.get('str') is None
+    keyspace.set('str', 'new value')
+    assert keyspace.get('str') == 'new value'
+    wait_for_deleted_directories(root_dir)
+    assert sorted(os.listdir(root_dir), key=int) == map(str, range(16))
+
+
+def test_leftovers_of_async_flushes_are_deleted_on_startup(root_dir, backend):
+    Path(root_dir).join('0.deleted-123').makedirs()
+    reopen_dbs(root_dir, backend)
+    wait_for_deleted_directories(root_dir)
+
+
+def test_swapdb(root_dir, backend):
+    keyspace = Keyspace()
+    keyspace.set('str', 'db0')
+    keyspace.sadd('set', 'a')
+    keyspace.select(1)
+    keyspace.set('str', 'db1')
+
+    keyspace.swapdb(0, 1)
+    assert keyspace.get('str') == 'db0'
+    assert keyspace.smembers('set') == {'a'}
+    keyspace.set('str2', 'value')
+    keyspace.select(0)
+    assert keyspace.get('str') == 'db1'
+    assert keyspace.dbsize() == 1
+
+    # the directories are swapped too
+    reopen_dbs(root_dir, backend)
+    assert keyspace.get('str') == 'db1'
+    keyspace.select(1)
+    assert keyspace.get('str') == 'db0'
+    assert keyspace.get('str2') == 'value'
+    assert keyspace.dbsize() == 3
+
+
+def test_swapdb_with_memory_backend(keyspace):
+    keyspace.set('str', 'db0')
+    keyspace.swapdb(0, 15)
+    assert keyspace.get('str') is None
+    keyspace.select(15)
+    assert keyspace.get('str') == 'db0'
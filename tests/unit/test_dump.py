@@ -1,6 +1,8 @@
 import struct
 
-from dredis import rdb
+import lzf
+
+from dredis import config, rdb
 from dredis.rdb import ObjectDumper
 
 
@@ -9,9 +11,8 @@ def test_dump_not_found_key(keyspace):
 
 
 def test_dump_string(keyspace):
-    # dredis serializes strings verbatim,
-    # it doesn't encode int strings differently than raw strings,
-    # and doesn't use LZF compresssion
+    # without `rdbcompression`, dredis serializes strings verbatim
+    config.set('rdbcompression', 'false')
 
     str1 = 'test'
     str2 = 'a' * (1 << 6)
@@ -26,6 +27,27 @@ def test_dump_string(keyspace):
     assert keyspace.dump('str3') == b'\x00\x80\x00\x00@\x00' + str3 + b'\x07\x00\xe9\x9e\x16)r\x8c\xac\x87'
 
 
+def test_dump_compressed_string(keyspace):
+    short_string = 'a' * 20
+    long_string = 'a' * (1 << 14)
+    incompressible_string = 'abcdefghijklmnopqrstuvwxyz'
+    keyspace.set('short', short_string)
+    keyspace.set('long', long_string)
+    keyspace.set('incompressible', incompressible_string)
+    object_dumper = ObjectDumper(keyspace)
+
+    assert object_dumper.dump_string('short') == b'\x14' + short_string
+    compressed = lzf.compress(long_string)
+    assert object_dumper.dump_string('long') == (
+        b'\xc3' + object_dumper.dump_length(len(compressed)) + object_dumper.dump_length(len(long_string)) + compressed
+    )
+    assert object_dumper.dump_string('incompressible') == b'\x1a' + incompressible_string
+
+    payload = keyspace.dump('long')
+    keyspace.restore('restored', ttl=0, payload=payload, replace=False)
+    assert keyspace.get('restored') == long_string
+
+
 def test_dump_hash(keyspace):
     keyspace.hset('hash', 'field1', 'value1')
     keyspace.hset('hash', 'field2', 'value2')
@@ -118,3 +140,12 @@ def test_encval_strings(keyspace):
     enc_32bit = struct.pack('<Bi', (rdb.RDB_ENCVAL << 6) | rdb.RDB_ENC_INT32, int32)
     keyspace.set('int32', str(int32))
     assert object_dumper.dump_string('int32') == enc_32bit
+
+
+def test_int_encoding_only_for_canonical_integers(keyspace):
+    object_dumper = ObjectDumper(keyspace)
+    for string in ['\x0c6', ' 6', '6\n', '+6', '06', '-0', '1.0', '2147483648', '99999999999']:
+        keyspace.set('str', string)
+        assert object_dumper.dump_string('str') == struct.pack('>B', len(string)) + string
+    keyspace.set('str', '-2147483648')
+    assert object_dumper.dump_string('str') == struct.pack('<Bi', (rdb.RDB_ENCVAL << 6) | rdb.RDB_ENC_INT32, -2147483648)
@@ -1,5 +1,25 @@
+import random
+import struct
+
+import pytest
+
+from dredis import utils
 from dredis.utils import FLOAT_CODEC
 
+SPECIAL_FLOATS = [
+    float('-inf'), -1e308, -1.5, -5e-324, -0.0, 0.0, 5e-324, 2.2250738585072014e-308, 1.5, 1e308, float('+inf'),
+]
+
+
+def _random_floats(count):
+    # random bit patterns cover all exponents (excluding NaNs)
+    result = []
+    while len(result) < count:
+        f = struct.unpack('>d', struct.pack('>Q', random.getrandbits(64)))[0]
+        if f == f:
+            result.append(f)
+    return result
+
 
 def test_encoding_keeps_natural_order():
     floats = [1.5, -2.5, 0, 3.2, -2.0]
@@ -10,3 +30,37 @@ def test_decoding_should_be_the_opposite_of_encoding():
     floats = [1.5, -2.5, 0, 3.2, -2.0]
     encoded_floats = map(FLOAT_CODEC.encode, floats)
     assert map(FLOAT_CODEC.decode, encoded_floats) == floats
+
+
+def test_encoding_preserves_order_of_random_floats():
+    floats = _random_floats(1000) + SPECIAL_FLOATS
+    for a, b in zip(floats, floats[1:]):
+        if a < b:
+            assert FLOAT_CODEC.encode(a) < FLOAT_CODEC.encode(b)
+        elif a > b:
+            assert FLOAT_CODEC.encode(a) > FLOAT_CODEC.encode(b)
+    assert sorted(floats, key=FLOAT_CODEC.encode) == sorted(floats)
+
+
+@pytest.mark.parametrize('with_numpy', [True, False])
+def test_batch_encoding_and_decoding(monkeypatch, with_numpy):
+    if not with_numpy:
+        monkeypatch.setattr(utils, 'numpy', None)
+    elif utils.numpy is None:
+        pytest.skip('NumPy is not installed')
+
+    for count in [0, 1, FLOAT_CODEC.NUMPY_MIN_BATCH_SIZE, 1000]:
+        floats = _random_floats(count) + SPECIAL_FLOATS
+        encoded_floats = map(FLOAT_CODEC.encode, floats)
+        assert FLOAT_CODEC.encode_many(floats) == encoded_floats
+        assert FLOAT_CODEC.decode_many(encoded_floats) == map(FLOAT_CODEC.decode, encoded_floats)
+        assert map(repr, FLOAT_CODEC.decode_many(encoded_floats)) == map(repr, floats)
+
+
+def test_encode_next():
+    floats = sorted(_random_floats(100) + SPECIAL_FLOATS[:-1])
+    for f in floats:
+        assert FLOAT_CODEC.encode(f) < FLOAT_CODEC.encode_next(f)
+        assert FLOAT_CODEC.decode(FLOAT_CODEC.encode_next(f)) >= f
+    assert FLOAT_CODEC.encode_next(-0.0) == FLOAT_CODEC.encode(0.0)
+    assert FLOAT_CODEC.decode(FLOAT_CODEC.encode_next(0.0)) == 5e-324
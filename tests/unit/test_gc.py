@@ -0,0 +1,121 @@
+import time
+
+from dredis import gc
+from dredis.compaction import CompactionScheduler
+from dredis.db import DB_MANAGER, KEY_CODEC
+from dredis.gc import KeyGarbageCollector, KeyGarbageCollectorProcess, GC_STATS, CURSOR_METADATA, get_backlog
+from dredis.keyspace import Keyspace
+from dredis.stats import COMMAND_STATS
+
+
+def get_storage_keys(db):
+    return [db_key for db_key, _ in db.iterator() if not db_key.startswith(chr(KEY_CODEC.METADATA_TYPE))]
+
+
+def test_collection_resumes_from_the_cursor(keyspace):
+    db = DB_MANAGER.get_db('0')
+    keyspace.sadd('myset', *map(str, range(10)))
+    keyspace.hset_many('myhash', [('field', 'value')])
+    keyspace.delete('myset', 'myhash')
+    assert get_backlog() == (2, 11)
+
+    collector = KeyGarbageCollector(batch_size=4)
+    assert collector.collect() == 4
+    assert db.get(KEY_CODEC.encode_metadata(CURSOR_METADATA)) is not None
+    assert get_backlog() == (2, 11)
+
+    # keys written before the cursor are deleted by the next pass
+    keyspace.sadd('myset2', 'a')
+    keyspace.delete('myset2')
+
+    while collector.collect():
+        pass
+    assert get_storage_keys(db) == []
+    assert db.get(KEY_CODEC.encode_metadata(CURSOR_METADATA)) is None
+    assert get_backlog() == (0, 0)
+
+
+def test_batch_size_adapts_to_the_load(keyspace, monkeypatch):
+    keyspace.sadd('myset', *map(str, range(1000)))
+    keyspace.delete('myset')
+    collector = KeyGarbageCollector(batch_size=400)
+
+    monkeypatch.setattr(COMMAND_STATS, 'get_average_latency', lambda: 1.0)
+    assert collector.collect() == 400
+    assert GC_STATS.batch_size.value == 200
+    assert GC_STATS.interval.value == 0.5
+    assert collector.collect() == 200
+    assert collector.collect() == 100
+    assert GC_STATS.batch_size.value == gc.MIN_GC_BATCH_SIZE
+
+    monkeypatch.setattr(COMMAND_STATS, 'get_average_latency', lambda: 0.0)
+    assert collector.collect() == 100
+    assert GC_STATS.batch_size.value == 200
+    assert GC_STATS.interval.value == 0.05
+    assert collector.collect() == 200 + 1  # the remaining members and the marker
+    assert GC_STATS.interval.value == 0.5
+
+
+def test_info(keyspace, monkeypatch):
+    monkeypatch.setattr(GC_STATS.pending_markers, 'value', 0)
+    monkeypatch.setattr(GC_STATS.pending_keys, 'value', 0)
+    keyspace.sadd('myset', 'a', 'b')
+    keyspace.delete('myset')
+    # `INFO` doesn't count the backlog
+    assert dict(gc.get_info())['gc_pending_markers'] == 0
+
+    collector = KeyGarbageCollector(batch_size=1)
+    collector.collect()
+    info = dict(gc.get_info())
+    assert info['gc_pending_markers'] == 1
+    assert info['gc_pending_keys_estimate'] == 2
+
+    # the backlog isn't counted again until `BACKLOG_UPDATE_INTERVAL` passes
+    while collector.collect():
+        pass
+    assert dict(gc.get_info())['gc_pending_markers'] == 1
+    monkeypatch.setattr(gc, 'BACKLOG_UPDATE_INTERVAL', 0)
+    collector.collect()
+    assert dict(gc.get_info())['gc_pending_markers'] == 0
+
+
+def wait_for_collection(timeout=10):
+    deadline = time.time() + timeout
+    while get_backlog() != (0, 0):
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+
+def test_collection_in_a_separate_process(tmpdir):
+    root_dir = bytes(tmpdir)
+    process = KeyGarbageCollectorProcess(root_dir, {}, gc_interval=10)
+    process.start()
+    try:
+        DB_MANAGER.setup_dbs(root_dir, backend='lmdb', backend_options={})
+        process.start_collecting()
+        keyspace = Keyspace()
+        keyspace.sadd('myset', *map(str, range(100)))
+        keyspace.delete('myset')
+        wait_for_collection()
+        assert get_storage_keys(DB_MANAGER.get_db('0')) == []
+
+        # the process opens the db again after its directory is replaced
+        keyspace.flushdb()
+        keyspace.sadd('myset', 'a', 'b')
+        keyspace.delete('myset')
+        wait_for_collection()
+        assert get_storage_keys(DB_MANAGER.get_db('0')) == []
+        assert GC_STATS.deleted_keys.value >= 101 + 3
+
+        # and after the server replaces the files with a compacted copy
+        keyspace.set('str', 'value')
+        scheduler = CompactionScheduler()
+        scheduler.compact(0)
+        scheduler.finish_rebuild()
+        keyspace.sadd('myset', 'a', 'b')
+        keyspace.delete('myset')
+        wait_for_collection()
+        assert keyspace.get('str') == 'value'
+    finally:
+        process.terminate()
+        process.join()
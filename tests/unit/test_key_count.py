@@ -0,0 +1,64 @@
+from dredis.db import DB_MANAGER, KEY_CODEC, KEY_COUNT_METADATA, get_key_count, set_key_count
+from tests.unit.test_key_format import add_legacy_keys
+
+
+def test_key_count_is_updated_by_writes(keyspace):
+    db = DB_MANAGER.get_db('0')
+    assert get_key_count(db) == 0
+
+    keyspace.set('str', 'value')
+    keyspace.sadd('set', 'a')
+    keyspace.restore('set2', 0, keyspace.dump('set'), replace=False)
+    assert get_key_count(db) == 3
+
+    keyspace.delete('str', 'set', 'set2')
+    assert get_key_count(db) == 0
+
+
+def test_unknown_key_count_is_rebuilt(keyspace):
+    db = DB_MANAGER.get_db('0')
+    add_legacy_keys(db)
+    keyspace.set('str2', 'value')
+    db.delete(KEY_CODEC.encode_metadata(KEY_COUNT_METADATA))
+
+    keyspace.set('str3', 'value')
+    assert get_key_count(db) is None
+    # `DBSIZE` doesn't count the keys
+    assert keyspace.dbsize() == 0
+    assert get_key_count(db) is None
+
+    assert keyspace.check_key_count()
+    assert get_key_count(db) == 6
+    assert keyspace.dbsize() == 6
+    assert not keyspace.check_key_count()
+
+
+def test_suspect_key_count_is_rebuilt(keyspace):
+    db = DB_MANAGER.get_db('0')
+    keyspace.set('str', 'value')
+
+    set_key_count(db, 0)
+    assert keyspace.dbsize() == 0
+    assert keyspace.check_key_count()
+    assert keyspace.dbsize() == 1
+
+    set_key_count(db, 0)
+    keyspace.delete('str')
+    assert get_key_count(db) is None
+    assert keyspace.check_key_count()
+    assert keyspace.dbsize() == 0
+
+    set_key_count(db, 10)
+    assert keyspace.check_key_count()
+    assert keyspace.dbsize() == 0
+
+
+def test_keys_stored_with_several_types(keyspace):
+    keyspace.sadd('key', 'a')
+    keyspace.set('key', 'value')
+    keyspace.set('other', 'value')
+    assert keyspace.dbsize() == 3
+
+    keyspace.rename('other', 'key')
+    assert keyspace.dbsize() == 2
+    assert keyspace.dbsize() == keyspace.rebuild_key_count()
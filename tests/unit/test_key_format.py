@@ -0,0 +1,151 @@
+import uuid
+
+from dredis.converter import KeyFormatConverter
+from dredis.db import DB_MANAGER, KEY_CODEC, KEY_CODEC_V2, KEY_CODEC_V3
+from dredis.utils import encode_varint, decode_varint
+
+
+def add_legacy_keys(db):
+    codec = KEY_CODEC_V2
+    db.put(codec.encode_string('str'), 'test')
+
+    set_id = uuid.uuid4().bytes
+    db.put(codec.encode_set('set'), codec.encode_key_id_and_length('set', set_id, 2))
+    db.put(codec.encode_set_member(set_id, 'a'), '')
+    db.put(codec.encode_set_member(set_id, 'b'), '')
+
+    hash_id = uuid.uuid4().bytes
+    db.put(codec.encode_hash('hash'), codec.encode_key_id_and_length('hash', hash_id, 1))
+    db.put(codec.encode_hash_field(hash_id, 'field'), 'value')
+
+    # zsets created before dredis 2.6 used the key name as the key ID
+    db.put(codec.encode_zset('zset'), codec.encode_key_id_and_length('zset', 'zset', 2))
+    db.put(codec.encode_zset_value('zset', 'alice'), '100')
+    db.put(codec.encode_zset_score('zset', 'alice', 100), '')
+    db.put(codec.encode_zset_value('zset', 'bob'), '-1.5')
+    db.put(codec.encode_zset_score('zset', 'bob', -1.5), '')
+
+    DB_MANAGER.update_key_codecs('0')
+
+
+def assert_legacy_keys(keyspace):
+    assert sorted(keyspace.keys('*')) == ['hash', 'set', 'str', 'zset']
+    assert keyspace.get('str') == 'test'
+    assert keyspace.smembers('set') == {'a', 'b'}
+    assert keyspace.hgetall('hash') == ['field', 'value']
+    assert keyspace.zrange('zset', 0, -1, with_scores=True) == ['bob', -1.5, 'alice', 100]
+    assert keyspace.zscore('zset', 'alice') == '100'
+
+
+def test_varint():
+    for number in [0, 1, 16, 127, 128, 300, 2 ** 32]:
+        assert decode_varint(encode_varint(number)) == (number, len(encode_varint(number)))
+    assert encode_varint(16) == '\x10'
+
+
+def test_v3_keys_are_shorter_than_v2_keys():
+    key_id = uuid.uuid4().bytes
+    assert len(KEY_CODEC_V3.encode_zset_score(key_id, 'member', 1)) == \
+        len(KEY_CODEC_V2.encode_zset_score(key_id, 'member', 1)) - 3
+    assert len(KEY_CODEC_V3.encode_zset_value(key_id, 'member')) == \
+        len(KEY_CODEC_V2.encode_zset_value(key_id, 'member')) - 3
+    assert len(KEY_CODEC_V3.encode_string('str')) == len(KEY_CODEC_V2.encode_string('str')) - 4
+
+
+def test_v3_keys_with_shared_prefix_are_contiguous():
+    keys = ['user:1', 'user:10', 'user:2', 'users', 'user']
+    assert sorted(keys, key=KEY_CODEC_V3.encode_string) == sorted(keys)
+    # the key length used to come first
+    assert sorted(keys, key=KEY_CODEC_V2.encode_string) != sorted(keys)
+
+
+def test_v3_decode_key():
+    key_id = uuid.uuid4().bytes
+    assert KEY_CODEC_V3.decode_key(KEY_CODEC_V3.encode_string('str')) == (KEY_CODEC_V3.STRING_TYPE, 3, 'str')
+    assert KEY_CODEC_V3.decode_key(KEY_CODEC_V3.encode_hash_field(key_id, 'field')) == \
+        (KEY_CODEC_V3.HASH_FIELD_TYPE, 16, key_id + 'field')
+    db_key = KEY_CODEC_V3.encode_zset_score(key_id, 'member', -2.5)
+    assert KEY_CODEC_V3.decode_zset_score(db_key) == -2.5
+    assert KEY_CODEC_V3.decode_zset_value(db_key) == 'member'
+
+
+def test_new_keys_use_the_current_format(keyspace):
+    keyspace.set('str', 'test')
+    keyspace.sadd('set', 'a')
+
+    db = DB_MANAGER.get_db('0')
+    assert db.get(KEY_CODEC.encode_string('str')) == 'test'
+    assert db.get(KEY_CODEC.encode_set('set')) is not None
+    assert DB_MANAGER.get_key_codecs('0') == [KEY_CODEC]
+
+
+def test_legacy_keys_are_readable_and_writable(keyspace):
+    add_legacy_keys(DB_MANAGER.get_db('0'))
+    assert DB_MANAGER.get_key_codecs('0') == [KEY_CODEC, KEY_CODEC_V2]
+
+    assert_legacy_keys(keyspace)
+    assert keyspace.type('zset') == 'zset'
+
+    assert keyspace.zadd('zset', 0, 'carol') == 1
+    assert keyspace.zcard('zset') == 3
+    assert keyspace.sadd('set', 'c') == 1
+    assert keyspace.smembers('set') == {'a', 'b', 'c'}
+    keyspace.set('str', 'new value')
+    assert keyspace.get('str') == 'new value'
+    assert keyspace.delete('hash') == 1
+    assert keyspace.type('hash') == 'none'
+
+
+def test_scan_legacy_and_new_keys(keyspace):
+    add_legacy_keys(DB_MANAGER.get_db('0'))
+    keyspace.set('str2', 'test')
+    keyspace.sadd('set2', 'test')
+
+    assert sorted(keyspace.keys('s*')) == ['set', 'set2', 'str', 'str2']
+    found_keys = []
+    cursor = 0
+    while True:
+        cursor, keys = keyspace.scan(int(cursor), 'st*', 1)
+        found_keys.extend(keys)
+        if cursor == '0':
+            break
+    assert sorted(found_keys) == ['str', 'str2']
+    assert keyspace.scan(0, None, 10, 'set') == ['0', ['set', 'set2']]
+
+
+def test_rename_legacy_key_to_existing_key(keyspace):
+    add_legacy_keys(DB_MANAGER.get_db('0'))
+    keyspace.sadd('newset', 'x')
+
+    keyspace.rename('set', 'newset')
+
+    assert keyspace.smembers('newset') == {'a', 'b'}
+    assert keyspace.type('set') == 'none'
+
+
+def test_converter_converts_all_legacy_keys(keyspace):
+    db = DB_MANAGER.get_db('0')
+    add_legacy_keys(db)
+
+    assert KeyFormatConverter().convert() == 11
+
+    assert DB_MANAGER.get_key_codecs('0') == [KEY_CODEC]
+    assert_legacy_keys(keyspace)
+    for db_key, _ in db.iterator():
+        assert ord(db_key[0]) not in range(1, 9)
+
+
+def test_converter_resumes_from_the_last_converted_key(keyspace):
+    add_legacy_keys(DB_MANAGER.get_db('0'))
+    converter = KeyFormatConverter(batch_size=1)
+
+    # every step converts one key and its elements
+    assert converter.convert() == 1  # string
+    assert_legacy_keys(keyspace)
+    assert converter.convert() == 3  # set
+    assert converter.convert() == 2  # hash
+    assert converter.convert() == 5  # zset
+    assert DB_MANAGER.get_key_codecs('0') == [KEY_CODEC, KEY_CODEC_V2]
+    assert converter.convert() == 0
+    assert DB_MANAGER.get_key_codecs('0') == [KEY_CODEC]
+    assert_legacy_keys(keyspace)
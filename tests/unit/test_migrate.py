@@ -0,0 +1,148 @@
+import asyncore
+import socket
+import threading
+
+import pytest
+
+from dredis import migrate
+from dredis.commands import run_command
+from dredis.exceptions import DredisError, DredisSyntaxError, MigrateIOError
+from dredis.keyspace import Keyspace
+from dredis.migrate import MigrateConnectionPool
+from dredis.server import RedisServer
+
+
+@pytest.fixture
+def connection_pool(monkeypatch):
+    pool = MigrateConnectionPool()
+    monkeypatch.setattr(migrate, 'MIGRATE_CONNECTION_POOL', pool)
+    yield pool
+    pool.close_idle_connections()
+    for address in list(pool._connections):
+        pool.close(*address)
+
+
+@pytest.fixture
+def target_port(keyspace, connection_pool):
+    """
+    :return: the port of a server running in a thread, it shares the databases of `keyspace`,
+             thus the keys are migrated to another db
+    """
+    server = RedisServer('127.0.0.1', 0)
+    thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.01, 'use_poll': True})
+    thread.daemon = True
+    thread.start()
+    yield server.socket.getsockname()[1]
+    asyncore.close_all()
+    thread.join()
+
+
+def get_target_keyspace():
+    target_keyspace = Keyspace()
+    target_keyspace.select(1)
+    return target_keyspace
+
+
+def test_migrate_moves_keys(keyspace, target_port):
+    keyspace.set('str', 'value')
+    keyspace.sadd('set', 'a', 'b')
+    keyspace.hset('hash', 'field', 'value')
+    keyspace.zadd('zset', 1, 'member')
+
+    assert run_command(keyspace, 'MIGRATE', ('127.0.0.1', target_port, 'str', '1', '1000')) == 'OK'
+    assert run_command(keyspace, 'MIGRATE', ('127.0.0.1', target_port, '', '1', '1000', 'KEYS', 'set', 'hash', 'zset', 'missing')) == 'OK'
+
+    assert keyspace.keys('*') == set()
+    target_keyspace = get_target_keyspace()
+    assert target_keyspace.get('str') == 'value'
+    assert target_keyspace.smembers('set') == {'a', 'b'}
+    assert target_keyspace.hgetall('hash') == ['field', 'value']
+    assert target_keyspace.zrange('zset', 0, -1, with_scores=True) == ['member', 1.0]
+
+
+def test_migrate_copy_and_replace(keyspace, target_port):
+    keyspace.set('str', 'value')
+    target_keyspace = get_target_keyspace()
+    target_keyspace.set('str', 'old value')
+
+    with pytest.raises(DredisError) as exc:
+        keyspace.migrate('127.0.0.1', target_port, ['str'], 1, 1000, copy=True, replace=False)
+    assert str(exc.value) == 'ERR Target instance replied with error: BUSYKEY Target key name already exists'
+    assert target_keyspace.get('str') == 'old value'
+
+    run_command(keyspace, 'MIGRATE', ('127.0.0.1', target_port, 'str', '1', '1000', 'COPY', 'REPLACE'))
+    assert target_keyspace.get('str') == 'value'
+    assert keyspace.get('str') == 'value'
+
+
+def test_migrate_only_deletes_restored_keys(keyspace, target_port):
+    keyspace.set('str1', 'value1')
+    keyspace.set('str2', 'value2')
+    target_keyspace = get_target_keyspace()
+    target_keyspace.set('str1', 'old value')
+
+    with pytest.raises(DredisError):
+        keyspace.migrate('127.0.0.1', target_port, ['str1', 'str2'], 1, 1000, copy=False, replace=False)
+    assert keyspace.keys('*') == {'str1'}
+    assert target_keyspace.get('str2') == 'value2'
+
+
+def test_migrate_without_keys(keyspace, target_port):
+    assert run_command(keyspace, 'MIGRATE', ('127.0.0.1', target_port, 'missing', '1', '1000')) == 'NOKEY'
+
+
+def test_migrate_syntax(keyspace):
+    with pytest.raises(DredisSyntaxError):
+        run_command(keyspace, 'MIGRATE', ('127.0.0.1', '6379', 'key', '1', '1000', 'FOO'))
+    with pytest.raises(DredisError) as exc:
+        run_command(keyspace, 'MIGRATE', ('127.0.0.1', '6379', 'key', '1', '1000', 'KEYS', 'key'))
+    assert str(exc.value) == 'ERR When using MIGRATE KEYS option, the key argument must be set to the empty string'
+    with pytest.raises(DredisError) as exc:
+        run_command(keyspace, 'MIGRATE', ('127.0.0.1', '6379', 'key', 'one', '1000'))
+    assert str(exc.value) == 'ERR value is not an integer or out of range'
+
+
+def test_migrate_pipelines_and_streams_large_keys(keyspace, target_port, connection_pool, monkeypatch):
+    monkeypatch.setattr(migrate, 'MIGRATE_PIPELINE_SIZE', 1000)
+    monkeypatch.setattr(migrate, 'MIGRATE_MAX_MEMORY_PAYLOAD_SIZE', 1000)
+    members = [str(i) * 10 for i in range(1000)]
+    keyspace.sadd('large_set', *members)
+    keys = ['str{}'.format(i) for i in range(500)]
+    for key in keys:
+        keyspace.set(key, key)
+
+    keyspace.migrate('127.0.0.1', target_port, ['large_set'] + keys, 1, 1000, copy=False, replace=False)
+
+    target_keyspace = get_target_keyspace()
+    assert target_keyspace.smembers('large_set') == set(members)
+    assert target_keyspace.dbsize() == 501
+    assert keyspace.dbsize() == 0
+
+
+def test_migrate_reuses_connections(keyspace, target_port, connection_pool):
+    keyspace.set('str1', 'value1')
+    keyspace.set('str2', 'value2')
+
+    keyspace.migrate('127.0.0.1', target_port, ['str1'], 1, 1000, copy=False, replace=False)
+    connection, is_cached = connection_pool.get('127.0.0.1', target_port, 1)
+    assert is_cached
+    assert connection.db == 1
+    # a closed connection is reconnected once
+    connection.sock.shutdown(socket.SHUT_RDWR)
+    keyspace.migrate('127.0.0.1', target_port, ['str2'], 1, 1000, copy=False, replace=False)
+
+    assert get_target_keyspace().keys('*') == {'str1', 'str2'}
+    assert connection_pool.get('127.0.0.1', target_port, 1)[0] is not connection
+
+
+def test_migrate_connection_errors(keyspace, connection_pool):
+    keyspace.set('str', 'value')
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    closed_port = sock.getsockname()[1]
+    sock.close()
+
+    with pytest.raises(MigrateIOError) as exc:
+        keyspace.migrate('127.0.0.1', closed_port, ['str'], 1, 1000, copy=False, replace=False)
+    assert str(exc.value) == 'IOERR error or timeout connecting to the client'
+    assert keyspace.get('str') == 'value'
@@ -0,0 +1,25 @@
+import pytest
+
+from dredis.utils import compile_pattern
+
+
+@pytest.mark.parametrize('pattern, prefix', [
+    ('user:*', 'user:'),
+    ('user:1?', 'user:1'),
+    ('user:[12]', 'user:'),
+    ('user\\*', 'user'),
+    ('*', ''),
+    ('user', 'user'),
+    (None, ''),
+])
+def test_pattern_prefix(pattern, prefix):
+    assert compile_pattern(pattern)[0] == prefix
+
+
+def test_pattern_matching():
+    _, matches = compile_pattern('user:*:name')
+    assert matches('user:1:name')
+    assert matches('user::name')
+    assert not matches('user:1:name:x')
+    assert not matches('USER:1:name')
+    assert compile_pattern(None)[1]('anything')
@@ -0,0 +1,92 @@
+import glob
+
+import pytest
+
+from dredis import persistence, rdb
+from dredis.db import DB_MANAGER
+from dredis.exceptions import DredisError
+from dredis.keyspace import Keyspace, KeyspaceSnapshot
+from dredis.persistence import PersistenceStats
+
+
+@pytest.fixture
+def persistence_stats(monkeypatch, tmpdir):
+    stats = PersistenceStats()
+    monkeypatch.setattr(persistence, 'PERSISTENCE_STATS', stats)
+    # the RDB files are created in the current directory
+    monkeypatch.chdir(tmpdir)
+    return stats
+
+
+@pytest.fixture(params=['leveldb', 'lmdb', 'memory'])
+def keyspace(request, tmpdir):
+    DB_MANAGER.setup_dbs(bytes(tmpdir), backend=request.param, backend_options={})
+    return Keyspace()
+
+
+def load_rdb_files(tmpdir):
+    filenames = glob.glob(bytes(tmpdir.join('*.rdb')))
+    assert len(filenames) == 1
+    keyspace = Keyspace()
+    keyspace.flushall()
+    with open(filenames[0], 'rb') as f:
+        rdb.load_rdb(keyspace, f)
+    keyspace.select(0)
+    return keyspace
+
+
+def test_bgsave_dumps_a_snapshot(keyspace, persistence_stats, tmpdir):
+    keyspace.set('str', 'value')
+    keyspace.select(1)
+    keyspace.sadd('set', 'a', 'b')
+    keyspace.select(0)
+
+    def create_snapshot():
+        snapshot = KeyspaceSnapshot()
+        # the writes after the snapshot aren't saved
+        keyspace.set('str', 'new value')
+        keyspace.set('str2', 'value')
+        return snapshot
+
+    persistence.bgsave(create_snapshot).join()
+
+    assert persistence_stats.last_bgsave_status == 'ok'
+    assert persistence_stats.bgsave_start_time is None
+    loaded_keyspace = load_rdb_files(tmpdir)
+    assert loaded_keyspace.keys('*') == {'str'}
+    assert loaded_keyspace.get('str') == 'value'
+    loaded_keyspace.select(1)
+    assert loaded_keyspace.smembers('set') == {'a', 'b'}
+
+
+def test_bgsave_fails_if_a_db_is_flushed(keyspace, persistence_stats, tmpdir):
+    keyspace.set('str', 'value')
+
+    def create_snapshot():
+        snapshot = KeyspaceSnapshot()
+        keyspace.flushall()
+        return snapshot
+
+    persistence.bgsave(create_snapshot).join()
+
+    assert persistence_stats.last_bgsave_status == 'err'
+    assert tmpdir.listdir(lambda path: path.ext == '.rdb') == []
+
+
+def test_only_one_save_at_a_time(keyspace, persistence_stats):
+    persistence_stats.start_bgsave()
+    with pytest.raises(DredisError) as exc:
+        keyspace.bgsave()
+    assert str(exc.value) == 'ERR Background save already in progress'
+    with pytest.raises(DredisError) as exc:
+        keyspace.save()
+    assert str(exc.value) == 'ERR Background save already in progress'
+
+
+def test_lastsave(keyspace, persistence_stats, tmpdir):
+    persistence_stats.last_save_time = 0
+    keyspace.save()
+    assert keyspace.lastsave() > 0
+    info = dict(persistence.get_info())
+    assert info['rdb_last_save_time'] == keyspace.lastsave()
+    assert info['rdb_bgsave_in_progress'] == 0
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from dredis import rank_index
+from dredis.db import DB_MANAGER, KEY_CODEC
+from dredis.keyspace import ScoreRange
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(rank_index, 'MAX_BLOCK_SIZE', 4)
+    monkeypatch.setattr(rank_index, 'MIN_BLOCK_SIZE', 2)
+    monkeypatch.setattr(rank_index, 'BUILD_BLOCK_SIZE', 2)
+
+
+def assert_ranks(keyspace, zset):
+    expected = sorted(zset, key=lambda member: (zset[member], member))
+    for i, member in enumerate(expected):
+        assert keyspace.zrank('myzset', member) == i
+        assert keyspace.zrevrank('myzset', member) == len(expected) - 1 - i
+    for start in range(len(expected) + 1):
+        assert keyspace.zrange('myzset', start, start + 2, with_scores=False) == expected[start:start + 3]
+        assert keyspace.zrevrange('myzset', start, start + 2, with_scores=False) == expected[::-1][start:start + 3]
+
+
+def get_block_levels(keyspace):
+    _, key_id, _ = keyspace._get_zset_key_id_and_length('myzset')
+    prefix = KEY_CODEC.get_min_zset_rank(key_id)
+    return set(ord(db_key[len(prefix)]) for db_key in DB_MANAGER.get_db('0').iterator(prefix=prefix, include_value=False))
+
+
+def test_rank_index_with_random_updates(keyspace, small_blocks):
+    random.seed(42)
+    zset = {}
+    for _ in range(300):
+        member = 'member{}'.format(random.randint(0, 60))
+        if random.random() < 0.7:
+            score = random.choice([0, 1, 1.5, -2, random.randint(-10, 10)])
+            keyspace.zadd('myzset', score, member)
+            zset[member] = score
+        elif member in zset:
+            keyspace.zrem('myzset', member)
+            del zset[member]
+    assert len(get_block_levels(keyspace)) > 2
+    assert_ranks(keyspace, zset)
+
+    keyspace.zrem('myzset', *sorted(zset)[:-2])
+    assert get_block_levels(keyspace) == {0}
+    assert_ranks(keyspace, {m: zset[m] for m in sorted(zset)[-2:]})
+
+
+def test_rank_index_with_batched_updates(keyspace, small_blocks):
+    random.seed(7)
+    zset = {}
+    for _ in range(20):
+        elements = [(random.randint(-10, 10), 'member{}'.format(random.randint(0, 80))) for _ in range(15)]
+        assert keyspace.zadd_many('myzset', elements) == len(set(m for _, m in elements) - set(zset))
+        zset.update((member, score) for score, member in elements)
+        removed = random.sample(sorted(zset), 5)
+        keyspace.zrem('myzset', *removed)
+        for member in removed:
+            del zset[member]
+    assert len(get_block_levels(keyspace)) > 2
+    assert_ranks(keyspace, zset)
+
+
+def test_rank_index_is_built_for_zsets_without_index(keyspace, small_blocks):
+    zset = dict(('member{}'.format(i), i % 3) for i in range(20))
+    for member, score in zset.items():
+        keyspace.zadd('myzset', score, member)
+    _, key_id, _ = keyspace._get_zset_key_id_and_length('myzset')
+    db = DB_MANAGER.get_db('0')
+    for db_key in list(db.iterator(prefix=KEY_CODEC.get_min_zset_rank(key_id), include_value=False)):
+        db.delete(db_key)
+    assert_ranks(keyspace, zset)
+
+    keyspace.zadd('myzset', 1, 'new member')
+    zset['new member'] = 1
+    assert get_block_levels(keyspace) == {0, 1, 2, 3, 4}
+    assert_ranks(keyspace, zset)
+
+
+def test_rank_index_is_deleted_with_the_zset(keyspace):
+    keyspace.zadd('myzset', 1, 'member')
+    _, key_id, _ = keyspace._get_zset_key_id_and_length('myzset')
+    keyspace.delete('myzset')
+
+    db = DB_MANAGER.get_db('0')
+    assert db.get(KEY_CODEC.encode_deleted_zset_rank(key_id)) is not None
+
+
+def test_zcount_and_zrangebyscore_use_the_rank_index(keyspace, small_blocks):
+    random.seed(7)
+    zset = dict(('member{}'.format(i), random.choice([-1.5, 0, 1, 2, 3.5, 10])) for i in range(50))
+    for member, score in zset.items():
+        keyspace.zadd('myzset', score, member)
+    expected = sorted(zset, key=lambda member: (zset[member], member))
+
+    bounds = ['-inf', '+inf', '0', '(0', '1', '(1', '2.5', '(10', '10', '11']
+    for min_score in bounds:
+        for max_score in bounds:
+            score_range = ScoreRange(min_score, max_score)
+            members = [member for member in expected if score_range.check(zset[member])]
+            assert keyspace.zcount('myzset', min_score, max_score) == len(members)
+            for offset in [0, 1, 5, 49, 50]:
+                assert keyspace.zrangebyscore('myzset', min_score, max_score, offset=offset, count=3) == \
+                    members[offset:offset + 3]
+                assert keyspace.zrevrangebyscore('myzset', max_score, min_score, offset=offset, count=3) == \
+                    members[::-1][offset:offset + 3]
@@ -6,8 +6,10 @@ import pytest
 
 import dredis
 from dredis import rdb, crc64
+from dredis.db import DB_MANAGER
 from dredis.exceptions import DredisError
-from dredis.keyspace import Keyspace
+from dredis import keyspace as keyspace_module
+from dredis.keyspace import Keyspace, KeyspaceBulkLoader
 from tests.fixtures import reproduce_dump
 
 
@@ -84,6 +86,36 @@ def test_save_rdb_with_strings(keyspace):
     assert content == expected_rdb_content
 
 
+def test_save_rdb_with_multiple_dbs(keyspace, tmpdir):
+    expected_rdb_content = bytes(
+        'REDIS0007'  # "REDIS" + version
+        +
+        ('\xfa\ndredis-ver%c%s' % (len(dredis.__version__), dredis.__version__))  # aux field
+        +
+        '\xfe\x00'  # RDB_OPCODE_SELECTDB, db 0
+        '\x00\x04key1\x06value1'  # type, length of key, key, length of value, value
+        # empty dbs aren't written
+        '\xfe\x0f'  # RDB_OPCODE_SELECTDB, db 15
+        '\x00\x04key2\x06value2'  # type, length of key, key, length of value, value
+        '\xff'  # RDB_OPCODE_EOF
+    )
+    expected_rdb_content += crc64.checksum(expected_rdb_content)
+    keyspace.set('key1', 'value1')
+    keyspace.select(15)
+    keyspace.set('key2', 'value2')
+
+    filename = bytes(tmpdir.join('test-dump.rdb'))
+    rdb.dump_rdb(keyspace, filename)
+    content = open(filename, 'rb').read()
+    assert content == expected_rdb_content
+
+    DB_MANAGER.setup_dbs('', backend='memory', backend_options={})
+    rdb.load_rdb(keyspace, BytesIO(content))
+    assert keyspace.get('key2') == 'value2'
+    keyspace.select(0)
+    assert keyspace.keys('*') == {'key1'}
+
+
 def test_rdb_load(keyspace):
     rdb.load_rdb(keyspace, open(FIXTURE_DUMP, 'rb'))
 
@@ -104,3 +136,98 @@ def test_rdb_load(keyspace):
 
     for key in new_keyspace.keys('hash_*'):
         assert new_keyspace.hgetall(key) == keyspace.hgetall(key)
+
+
+def read_keys(keyspace):
+    result = {}
+    for key in keyspace.keys('*'):
+        key_type = keyspace.type(key)
+        if key_type == 'string':
+            result[key] = keyspace.get(key)
+        elif key_type == 'set':
+            result[key] = keyspace.smembers(key)
+        elif key_type == 'hash':
+            result[key] = sorted(keyspace.hgetall(key))
+        elif key_type == 'zset':
+            result[key] = keyspace.zrange(key, 0, -1, with_scores=True)
+            # the rank index is written by the loader
+            assert keyspace.zrange(key, 1, -1, with_scores=True) == result[key][2:]
+    return result
+
+
+# LMDB keys are limited to 511 bytes, the fixture has longer set members
+@pytest.mark.parametrize('backend', ['leveldb', 'memory'])
+def test_bulk_load(keyspace, backend, tmpdir, monkeypatch):
+    rdb.load_rdb(keyspace, open(FIXTURE_DUMP, 'rb'))
+    expected_keys = read_keys(keyspace)
+
+    DB_MANAGER.setup_dbs(bytes(tmpdir), backend=backend, backend_options={})
+    monkeypatch.setattr(keyspace_module, 'BULK_LOAD_BATCH_SIZE', 10)
+    with KeyspaceBulkLoader() as bulk_loader:
+        rdb.load_rdb(bulk_loader, open(FIXTURE_DUMP, 'rb'))
+
+    assert read_keys(keyspace) == expected_keys
+    assert keyspace.dbsize() == len(expected_keys)
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb', 'memory'])
+def test_bulk_load_replaces_existing_keys(backend, tmpdir):
+    DB_MANAGER.setup_dbs(bytes(tmpdir.join('dbs')), backend='memory', backend_options={})
+    rdb_keyspace = Keyspace()
+    rdb_keyspace.select(1)
+    rdb_keyspace.sadd('set', 'c')
+    rdb_keyspace.zadd('zset', 1, 'a')
+    rdb_keyspace.hset('hash', 'field', 'value')
+    filename = bytes(tmpdir.join('dump.rdb'))
+    rdb.dump_rdb(rdb_keyspace, filename)
+
+    DB_MANAGER.setup_dbs(bytes(tmpdir), backend=backend, backend_options={})
+    keyspace = Keyspace()
+    keyspace.sadd('set', 'a', 'b')
+    keyspace.select(1)
+    keyspace.sadd('set', 'a', 'b')
+    keyspace.set('other', 'value')
+    with KeyspaceBulkLoader() as bulk_loader:
+        rdb.load_rdb(bulk_loader, open(filename, 'rb'))
+
+    assert keyspace.smembers('set') == {'c'}
+    assert keyspace.zrange('zset', 0, -1, with_scores=True) == ['a', 1.0]
+    assert keyspace.hgetall('hash') == ['field', 'value']
+    assert keyspace.get('other') == 'value'
+    assert keyspace.dbsize() == 4
+    keyspace.select(0)
+    assert keyspace.smembers('set') == {'a', 'b'}
+    assert keyspace.dbsize() == 1
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+def test_bulk_load_deletes_existing_keys_in_the_batch(keyspace, backend, tmpdir):
+    DB_MANAGER.setup_dbs(bytes(tmpdir), backend=backend, backend_options={})
+    keyspace.sadd('set', 'a', 'b')
+    keyspace.set('other', 'value')
+
+    bulk_loader = KeyspaceBulkLoader()
+    bulk_loader.sadd('set', 'c')
+    # nothing is written before the batch is flushed
+    assert keyspace.smembers('set') == {'a', 'b'}
+    bulk_loader.flush()
+
+    assert keyspace.smembers('set') == {'c'}
+    assert keyspace.dbsize() == 2
+
+
+@pytest.mark.parametrize('backend', ['leveldb', 'lmdb'])
+def test_bulk_load_repeated_keys(keyspace, backend, tmpdir):
+    DB_MANAGER.setup_dbs(bytes(tmpdir), backend=backend, backend_options={})
+    with KeyspaceBulkLoader() as bulk_loader:
+        bulk_loader.sadd('set', 'a', 'b')
+        bulk_loader.set('string', 'value')
+        bulk_loader.sadd('set', 'c')
+        bulk_loader.zadd_many('zset', [(1, 'a'), (2, 'b')])
+        bulk_loader.zadd_many('zset', [(3, 'c')])
+
+    assert keyspace.smembers('set') == {'c'}
+    assert keyspace.zrange('zset', 0, -1, with_scores=True) == ['c', 3.0]
+    assert keyspace.zrank('zset', 'c') == 0
+    assert keyspace.dbsize() == 3
+    assert sorted(keyspace.keys('*')) == ['set', 'string', 'zset']
@@ -0,0 +1,107 @@
+from dredis import keyspace as keyspace_module
+from dredis.db import DB_MANAGER, get_scan_cursor_secret
+from dredis.keyspace import Keyspace, RecentScanPositions, ScanCursorCodec
+
+
+def no_positions(prefix):
+    return iter([])
+
+
+def test_cursor_encoding():
+    codec = ScanCursorCodec('secret', RecentScanPositions(max_size=10, max_position_length=100))
+    cursor = codec.encode('prefix', 'f\x00\xff')
+    assert isinstance(cursor, (int, long))
+    assert codec.decode('prefix', cursor, no_positions) == 'f\x00\xff'
+    assert codec.decode('prefix', codec.encode('prefix', ''), no_positions) == ''
+    # long positions are truncated
+    assert codec.decode('prefix', codec.encode('prefix', 'field\x00\xff'), no_positions) == 'field\x00\xff'
+
+
+def test_truncated_positions_are_looked_up_by_their_tag():
+    positions = ['field1', 'field2', 'field3']
+    cursor = ScanCursorCodec('secret').encode('prefix', 'field2')
+    codec = ScanCursorCodec('secret', RecentScanPositions(max_size=10, max_position_length=100))
+
+    assert codec.decode('prefix', cursor, lambda prefix: iter(p for p in positions if p.startswith(prefix))) == 'field2'
+    # the scan resumes from the beginning of the prefix if the position is gone
+    assert codec.decode('prefix', cursor, no_positions) == 'fiel'
+
+
+def test_invalid_cursors():
+    codec = ScanCursorCodec('secret')
+    cursor = codec.encode('prefix', 'fld')
+    assert codec.decode('other prefix', cursor, no_positions) is None
+    assert ScanCursorCodec('other secret').decode('prefix', cursor, no_positions) is None
+    assert codec.decode('prefix', cursor + 1, no_positions) is None
+    assert codec.decode('prefix', cursor ^ (1 << 20), no_positions) is None
+    assert codec.decode('prefix', 123, no_positions) is None
+    assert codec.decode('prefix', -1, no_positions) is None
+    assert codec.decode('prefix', 2 ** 64 + cursor, no_positions) is None
+    # truncated positions that aren't found resume from their prefix
+    truncated_cursor = codec.encode('prefix', 'field')
+    assert codec.decode('other prefix', truncated_cursor, lambda prefix: iter(['field'])) == 'fiel'
+
+
+def test_cursors_dont_depend_on_server_state(keyspace):
+    for i in range(10):
+        keyspace.hset('myhash', 'field{}'.format(i), 'value')
+        keyspace.sadd('myset', 'member{}'.format(i))
+    cursor, elements = keyspace.hscan('myhash', 0, None, 2)
+    assert elements == ['field0', 'value', 'field1', 'value']
+
+    # cursors used to be evicted after 8192 scans
+    for _ in range(10000):
+        keyspace.sscan('myset', 0, None, 1)
+    keyspace_module.RECENT_SCAN_POSITIONS.clear()
+
+    _, elements = Keyspace().hscan('myhash', int(cursor), None, 2)
+    assert elements == ['field2', 'value', 'field3', 'value']
+
+
+def test_cursors_are_only_valid_for_their_key(keyspace):
+    keyspace.hset('myhash', 'f0', 'value')
+    keyspace.hset('myhash', 'f1', 'value')
+    keyspace.sadd('myset', 'f0', 'f1')
+    cursor, _ = keyspace.hscan('myhash', 0, None, 1)
+    assert keyspace.sscan('myset', int(cursor), None, 2) == ['0', []]
+
+
+def test_cursors_fit_in_64_bits(keyspace):
+    long_prefix = 'x' * 1000
+    keys = set()
+    fields = set()
+    for i in range(50):
+        keyspace.set('{}:{}'.format(long_prefix, i), 'value')
+        keyspace.sadd('myset', '{}:{}'.format(long_prefix, i))
+        keys.add('{}:{}'.format(long_prefix, i))
+        fields.add('{}:{}'.format(long_prefix, i))
+
+    def scan_all(scan):
+        elements = set()
+        cursor = 0
+        while True:
+            cursor, new_elements = scan(cursor)
+            assert 0 <= int(cursor) < 2 ** 64
+            elements.update(new_elements)
+            # the positions are found by their tag after a restart
+            keyspace_module.RECENT_SCAN_POSITIONS.clear()
+            if cursor == '0':
+                return elements
+            cursor = int(cursor)
+
+    assert scan_all(lambda cursor: keyspace.scan(cursor, None, 3)) == keys | {'myset'}
+    assert scan_all(lambda cursor: keyspace.sscan('myset', cursor, None, 3)) == fields
+
+
+def test_scan_doesnt_write(keyspace):
+    secret = get_scan_cursor_secret(DB_MANAGER.get_db(0))
+    assert secret is not None
+    keyspace.flushdb()
+    assert get_scan_cursor_secret(DB_MANAGER.get_db(0)) not in (None, secret)
+
+    keyspace.set('key', 'value')
+    db = DB_MANAGER.get_db(0)
+    db_items = list(db.iterator())
+    keyspace.scan(0, None, 1)
+    keyspace.scan(0, 'k*', 10)
+    assert list(db.iterator()) == db_items
@@ -1,4 +1,5 @@
-from dredis.server import transmit, transform
+from dredis.db import DB_MANAGER, KEY_CODEC, KEY_COUNT_METADATA
+from dredis.server import check_key_counts, transmit, transform
 import mock
 
 
@@ -34,3 +35,14 @@ def test_transform_nested_array():
 
 def test_transform_error():
     assert transform(Exception('test')) == '-INTERNALERROR test\r\n'
+
+
+def test_check_key_counts(keyspace):
+    keyspace.select(3)
+    keyspace.set('key', 'value')
+    DB_MANAGER.get_db(3).delete(KEY_CODEC.encode_metadata(KEY_COUNT_METADATA))
+
+    check_key_counts(keyspace)
+    assert keyspace.dbsize() == 0
+    keyspace.select(3)
+    assert keyspace.dbsize() == 1
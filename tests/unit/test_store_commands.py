@@ -0,0 +1,43 @@
+from dredis import keyspace as keyspace_module
+
+
+def test_zunionstore_writes_in_batches(keyspace, monkeypatch):
+    monkeypatch.setattr(keyspace_module, 'STORE_BATCH_SIZE', 3)
+    keyspace.zadd('myzset1', 1, 'a')
+    keyspace.zadd('myzset1', 2, 'b')
+    keyspace.zadd('myzset1', 3, 'c')
+    keyspace.zadd('myzset2', 4, 'c')
+    keyspace.zadd('myzset2', 5, 'd')
+    keyspace.zadd('myzset2', 6, 'e')
+    keyspace.zadd('myzset2', float('inf'), 'f')
+    keyspace.zadd('myzset1', float('-inf'), 'f')
+
+    assert keyspace.zunionstore('myzset1', ['myzset1', 'myzset2'], [1, 1]) == 6
+    assert keyspace.zrange('myzset1', 0, -1, with_scores=True) == ['f', 0, 'a', 1, 'b', 2, 'd', 5, 'e', 6, 'c', 7]
+    assert keyspace.zrank('myzset1', 'c') == 5
+
+    assert keyspace.zunionstore('myzset3', ['myzset1', 'myzset2'], [2, 0], 'max') == 6
+    assert keyspace.zrange('myzset3', 0, -1, with_scores=True) == ['f', 0, 'a', 2, 'b', 4, 'd', 10, 'e', 12, 'c', 14]
+
+
+def test_set_store_commands_write_in_batches(keyspace, monkeypatch):
+    monkeypatch.setattr(keyspace_module, 'STORE_BATCH_SIZE', 2)
+    for member in 'abcde':
+        keyspace.sadd('myset1', member)
+    for member in 'bdfg':
+        keyspace.sadd('myset2', member)
+
+    assert keyspace.sunionstore('myset3', ['myset1', 'myset2']) == 7
+    assert keyspace.smembers('myset3') == set('abcdefg')
+    assert keyspace.sinterstore('myset3', ['myset3', 'myset2']) == 4
+    assert keyspace.smembers('myset3') == set('bdfg')
+    assert keyspace.sdiffstore('myset1', ['myset1', 'myset3']) == 3
+    assert keyspace.smembers('myset1') == set('ace')
+
+
+def test_sorted_iterators():
+    assert list(keyspace_module.iterate_sorted_union([[1, 3, 5], [], [1, 2, 3, 6]])) == [1, 2, 3, 5, 6]
+    assert list(keyspace_module.iterate_sorted_intersection([[1, 3, 5, 7], [0, 1, 5, 7, 8], [1, 2, 5, 7]])) == [1, 5, 7]
+    assert list(keyspace_module.iterate_sorted_intersection([[1, 3], []])) == []
+    assert list(keyspace_module.iterate_sorted_difference([1, 2, 3, 4, 5], [[2, 9], [0, 4]])) == [1, 3, 5]
+    assert list(keyspace_module.iterate_sorted_difference([1, 2], [])) == [1, 2]
@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+
+from dredis.db import DB_MANAGER, KEY_CODEC
+
+
+@pytest.mark.parametrize('score', [0, 1.5, -2.5, 1e300, float('-inf'), float('+inf')])
+def test_score_encoding(score):
+    assert KEY_CODEC.decode_score(KEY_CODEC.encode_score(score)) == score
+    assert len(KEY_CODEC.encode_score(score)) == 9
+
+
+def test_ascii_scores_are_still_supported():
+    assert KEY_CODEC.decode_score('10') == 10
+    assert KEY_CODEC.decode_score('-1.5') == -1.5
+    assert KEY_CODEC.decode_score('inf') == float('inf')
+
+
+def test_key_id_and_length_encoding():
+    key_id = uuid.uuid4().bytes
+    db_value = KEY_CODEC.encode_key_id_and_length('key', key_id, 1000)
+    assert len(db_value) == 16 + 1 + 8
+    assert KEY_CODEC.decode_key_id_and_length('key', db_value) == (key_id, 1000)
+
+
+def test_ascii_lengths_are_still_supported():
+    key_id = uuid.uuid4().bytes
+    assert KEY_CODEC.decode_key_id_and_length('key', key_id + '1000') == (key_id, 1000)
+    # older schema before uuid
+    assert KEY_CODEC.decode_key_id_and_length('key', '10') == ('key', 10)
+
+
+def test_zset_with_ascii_scores(keyspace):
+    key_id = uuid.uuid4().bytes
+    db = DB_MANAGER.get_db('0')
+    db.put(KEY_CODEC.encode_zset('zset'), key_id + '2')
+    db.put(KEY_CODEC.encode_zset_value(key_id, 'a'), '1')
+    db.put(KEY_CODEC.encode_zset_score(key_id, 'a', 1), '')
+    db.put(KEY_CODEC.encode_zset_value(key_id, 'b'), '2.5')
+    db.put(KEY_CODEC.encode_zset_score(key_id, 'b', 2.5), '')
+
+    assert keyspace.zcard('zset') == 2
+    assert keyspace.zscore('zset', 'b') == '2.5'
+    assert keyspace.zrank('zset', 'b') == 1
+    assert keyspace.zadd('zset', 3, 'a') == 0
+    assert keyspace.zrange('zset', 0, -1, with_scores=True) == ['b', 2.5, 'a', 3]
+    assert keyspace.zrem('zset', 'b') == 1
+    assert keyspace.zrange('zset', 0, -1, with_scores=True) == ['a', 3]
+    assert db.get(KEY_CODEC.encode_zset('zset')) == KEY_CODEC.encode_key_id_and_length('zset', key_id, 1)